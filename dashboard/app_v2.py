@@ -6,6 +6,7 @@ Phase 3-6 결과 통합 대시보드
 
 import streamlit as st
 import json
+import sys
 from datetime import datetime, timedelta
 from pathlib import Path
 import pandas as pd
@@ -59,6 +60,13 @@ def load_json_safe(filepath):
         st.error(f"Error loading {filepath}: {e}")
     return {}
 
+@st.cache_resource
+def load_time_machine(data_dir):
+    """TimeMachine은 한 번만 생성 (타임라인 컬럼/날짜 인덱스 재사용)"""
+    sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+    from time_machine import TimeMachine
+    return TimeMachine(str(data_dir))
+
 # Sidebar
 with st.sidebar:
     st.markdown("## 🦇 Digital Chris v2.0")
@@ -79,6 +87,7 @@ with st.sidebar:
 
 # Load data
 data_dir = Path("/Users/roturnjarvis/.openclaw/workspace")
+KEY_EVENTS_LIMIT = 10  # Time Machine: key events listed per year
 tasks_data = load_json_safe(data_dir / "logs/pending_tasks.json")
 decisions_data = load_json_safe(data_dir / "logs/pending_decisions.json")
 emails_data = load_json_safe(data_dir / "logs/all_pst_emails.json")[-100:] if isinstance(load_json_safe(data_dir / "logs/all_pst_emails.json"), list) else []
@@ -287,50 +296,53 @@ elif page == "⏳ Time Machine":
     
     col1, col2 = st.columns([1, 2])
     
+    tm = load_time_machine(data_dir)
+    from time_machine import BASE_SCORE
+    first, last = tm.get_timeline_range()
+    first_year, last_year = int(first[:4]), int(last[:4])
+    
     with col1:
         st.markdown("### 🕰️ Time Travel")
         
-        year = st.slider("Select Year", 2020, 2026, 2026)
+        year = st.slider("Select Year", first_year, last_year, last_year)
         
         st.markdown(f"### 📅 {year} Network State")
         
-        # Sample data based on year
-        year_data = {
-            2020: {'partners': 0, 'deals': 0, 'emails': 50},
-            2022: {'partners': 3, 'deals': 2, 'emails': 320},
-            2024: {'partners': 7, 'deals': 4, 'emails': 890},
-            2026: {'partners': 11, 'deals': 6, 'emails': 1803}
-        }
+        # State at year end: bisect on the date column + replay of earlier events
+        state = tm.get_state_at_date(f"{year}-12-31")
         
-        data = year_data.get(year, year_data[2026])
-        
-        st.metric("Active Partners", data['partners'])
-        st.metric("Total Deals", data['deals'])
-        st.metric("Emails", data['emails'])
+        st.metric("Active Partners", state['network_size'])
+        st.metric("Total Deals", state['total_deals'])
+        st.metric("Emails", state['total_emails'])
         
         # Key events
         st.markdown("---")
         st.markdown("### 🎯 Key Events")
         
-        events = {
-            2020: ["First email sent"],
-            2022: ["Luxfer partnership", "Taylor-Wharton deal"],
-            2024: ["Hyundai FCEV project", "KGSC Audit"],
-            2026: ["Holy Cryogenics visit", "PO#KCMIE-260108"]
-        }
-        
-        for event in events.get(year, []):
-            st.write(f"✓ {event}")
+        # Highest-impact events only (a year holds hundreds of ingested emails), shown in date order
+        events = tm.get_events_between(f"{year}-01-01", f"{year}-12-31")
+        top = sorted(sorted(events, key=lambda e: abs(e.impact), reverse=True)[:KEY_EVENTS_LIMIT],
+                     key=lambda e: e.date)
+        for event in top:
+            st.write(f"✓ {event.date} · {event.partner} · {event.description}")
+        if len(events) > len(top):
+            st.caption(f"+ {len(events) - len(top)} more events in {year}")
     
     with col2:
         st.markdown("### 📈 Network Growth Timeline")
         
         # Timeline chart
+        years = list(range(first_year, last_year + 1))
+        year_states = [tm.get_state_at_date(f"{y}-12-31") for y in years]
         timeline_data = pd.DataFrame({
-            'Year': [2020, 2021, 2022, 2023, 2024, 2025, 2026],
-            'Partners': [0, 2, 3, 5, 7, 9, 11],
-            'Deals': [0, 1, 2, 3, 4, 5, 6],
-            'Relationship Score': [0, 5.5, 6.2, 6.8, 7.3, 7.6, 7.9]
+            'Year': years,
+            'Partners': [s['network_size'] for s in year_states],
+            'Deals': [s['total_deals'] for s in year_states],
+            'Relationship Score': [
+                round(sum(p['score'] for p in s['partner_scores'].values()) / len(s['partner_scores']), 1)
+                if s['partner_scores'] else 0
+                for s in year_states
+            ]
         })
         
         fig = go.Figure()
@@ -373,10 +385,14 @@ elif page == "⏳ Time Machine":
         st.markdown("---")
         st.markdown("### 🏢 Partner Health Scores")
         
+        previous = tm.get_state_at_date(f"{year - 1}-12-31")['partner_scores']
+        rows = sorted(state['partner_scores'].items(), key=lambda kv: kv[1]['score'], reverse=True)
         partners = pd.DataFrame({
-            'Partner': ['Luxfer', 'Hyundai', 'Taylor-Wharton', 'Holy Cryogenics', 'ICBiomedical'],
-            'Score': [7.1, 7.8, 8.2, 8.0, 7.5],
-            'Trend': ['↑', '→', '↑', '↑', '→']
+            'Partner': [name for name, _ in rows],
+            'Score': [round(p['score'], 1) for _, p in rows],
+            'Trend': ['↑' if p['score'] > previous.get(name, {}).get('score', BASE_SCORE)
+                      else '↓' if p['score'] < previous.get(name, {}).get('score', BASE_SCORE) else '→'
+                      for name, p in rows]
         })
         
         st.dataframe(partners, hide_index=True, use_container_width=True)
@@ -163,10 +163,14 @@ class KCWeeklyReport:
     purchase_list: List[PurchaseData]
     receivable_list: List[ReceivableData]
     
+    # True when any list is sample data (not logged in / API error)
+    sample: bool = False
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization"""
         return {
             'report_date': self.report_date,
+            'sample': self.sample,
             'period': {
                 'start': self.period_start,
                 'end': self.period_end
@@ -196,6 +200,7 @@ class ECountAPI:
         self.config.validate()
         self.base_url = f"https://sboapi{config.zone}.ecount.com/OAPI/V2"
         self.session_id: Optional[str] = None
+        self.used_sample = False  # set by the sample generators below
         
     def _make_request(self, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Make POST request to eCount API using urllib"""
@@ -464,6 +469,7 @@ class ECountAPI:
     # Sample data generators for testing/development
     def _get_sample_sales(self) -> List[SalesData]:
         """Generate sample sales data for testing"""
+        self.used_sample = True
         today = datetime.now()
         return [
             SalesData(
@@ -502,6 +508,7 @@ class ECountAPI:
     
     def _get_sample_purchases(self) -> List[PurchaseData]:
         """Generate sample purchase data for testing"""
+        self.used_sample = True
         today = datetime.now()
         return [
             PurchaseData(
@@ -540,6 +547,7 @@ class ECountAPI:
     
     def _get_sample_receivables(self) -> List[ReceivableData]:
         """Generate sample receivables data for testing"""
+        self.used_sample = True
         today = datetime.now()
         return [
             ReceivableData(
@@ -600,7 +608,8 @@ def generate_weekly_report(api: ECountAPI) -> KCWeeklyReport:
         total_receivables=total_receivables,
         sales_list=sales,
         purchase_list=purchases,
-        receivable_list=receivables
+        receivable_list=receivables,
+        sample=api.used_sample
     )
     
     return report
@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+Ontology Graph Export - 3D 시각화용 그래프 파이프라인
+CHRIS-ONTOLOGY.yml + TimeMachine 파트너 상태 → node/edge 그래프
+
+- 컬럼형 JSON (id/label/type/size/... 배열 + positions 평탄 배열 → Float32Array)
+- 레이아웃 좌표를 미리 계산 (이전 export의 좌표는 고정, 새 노드만 배치)
+- 온톨로지/타임라인이 바뀌면 이전 export와 비교한 delta를 JSONL로 추가
+- 입력 시그니처가 같으면 아무것도 하지 않음
+
+Usage:
+    python ontology-graph.py             # export (변경 없으면 no-op)
+    python ontology-graph.py --force     # 강제로 다시 export
+    python ontology-graph.py --relayout  # 이전 좌표 무시하고 레이아웃 처음부터
+"""
+
+import os
+import re
+import sys
+import json
+import zlib
+import hashlib
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+from ontology_model import load_model
+from time_machine import TimeMachine
+
+# Paths
+WORKSPACE = Path(__file__).parent.parent
+EXPORT_DIR = WORKSPACE / "dashboard" / "data"
+GRAPH_FILE = EXPORT_DIR / "ontology-graph.json"
+DELTAS_FILE = EXPORT_DIR / "ontology-graph.deltas.jsonl"
+
+EXPORT_VERSION = 1
+MAX_DELTAS = 200          # delta 로그 최대 줄 수 (오래된 것부터 버림)
+MOVE_EPSILON = 0.05       # 이보다 적게 움직인 노드는 delta에서 생략
+DEFAULT_PARTNER_COMPANY = 'koreacryo'  # company 필드가 없는 partner의 연결 대상
+
+# Timeline entities that are not partners unless they match an ontology node
+PARTNER_EVENT_TYPES = ('partner_added', 'email', 'meeting', 'deal', 'PO')
+
+NODE_COLUMNS = ('id', 'label', 'type', 'size', 'score', 'status')
+
+# ===== Build =====
+
+def _key(text):
+    """'Taylor-Wharton' / 'taylorwharton' / 'hyundai_kia' → 비교용 키"""
+    return re.sub(r'[^0-9a-z가-힣]', '', str(text).lower())
+
+def _details(raw, limit=8):
+    """상세 카드용: 스칼라 필드만, 최대 limit개"""
+    details = {}
+    for key, value in (raw or {}).items():
+        if isinstance(value, (str, int, float, bool)) and value != '':
+            details[key] = value if not isinstance(value, str) else value[:80]
+        elif isinstance(value, list) and value and all(isinstance(v, str) for v in value):
+            details[key] = value[:5]
+        if len(details) >= limit:
+            break
+    return details
+
+class GraphBuilder:
+    """노드/엣지를 모아서 id 기준으로 중복 제거"""
+
+    def __init__(self):
+        self.nodes = {}
+        self.edges = {}
+
+    def node(self, node_id, label, type_, size=1.0, score=None, status=None, details=None):
+        self.nodes[node_id] = {
+            'id': node_id, 'label': str(label), 'type': type_, 'size': round(float(size), 2),
+            'score': None if score is None else round(float(score), 2),
+            'status': None if status is None else str(status),
+            'details': details or {},
+        }
+        return node_id
+
+    def edge(self, source, target, weight=1.0):
+        if source in self.nodes and target in self.nodes and source != target:
+            self.edges[(source, target)] = round(float(weight), 2)
+
+def _match_partner(name, index):
+    """TimeMachine 파트너 이름 → 온톨로지 노드 id (정확히, 그다음 접두어)"""
+    key = _key(name)
+    if not key:
+        return None
+    if key in index:
+        return index[key]
+    for candidate, node_id in index.items():
+        if len(key) >= 3 and (candidate.startswith(key) or key.startswith(candidate)):
+            return node_id
+    return None
+
+def build_graph(model, tm):
+    """온톨로지 모델 + TimeMachine → GraphBuilder"""
+    data = model.data
+    g = GraphBuilder()
+
+    person = data.get('person') or {}
+    root = g.node('chris', person.get('name', 'Chris'), 'person', 3.0, details=_details(person))
+
+    for key, company in (data.get('companies') or {}).items():
+        company = company or {}
+        cid = g.node(f'company:{key}', company.get('name', key), 'company', 2.5,
+                     status=company.get('status'), details=_details(company))
+        g.edge(root, cid, 10)
+        for emp in company.get('employees') or []:
+            eid = g.node(f"employee:{emp.get('email') or emp.get('name')}", emp.get('name', ''),
+                         'employee', 1.2, details=_details(emp))
+            g.edge(cid, eid, 3)
+
+    for project in model.projects.values():
+        pid = g.node(f'project:{project.company}/{project.id}', project.name or project.id, 'project',
+                     1.2 + (project.progress or 0) / 100, status=project.status,
+                     details=_details(project.raw))
+        g.edge(f'company:{project.company}' if project.company else root, pid, 5)
+
+    # Match index for timeline entities: partner key/name/domain, company, holding symbol
+    match_index = {}
+    for key, partner in (data.get('partners') or {}).items():
+        partner = partner or {}
+        nid = g.node(f'partner:{key}', partner.get('name', key), 'partner', 1.3,
+                     status=partner.get('status'), details=_details(partner))
+        company = partner.get('company') or DEFAULT_PARTNER_COMPANY
+        g.edge(f'company:{company}' if f'company:{company}' in g.nodes else root, nid, 5)
+        for alias in (key, partner.get('name'), str(partner.get('domain') or '').split('.')[0]):
+            if alias:
+                match_index.setdefault(_key(alias), nid)
+    for key, company in (data.get('companies') or {}).items():
+        match_index.setdefault(_key(key), f'company:{key}')
+
+    for order in (data.get('orders') or {}).get('active') or []:
+        if not order.get('po_number'):
+            continue
+        oid = g.node(f"order:{order['po_number']}", order['po_number'], 'order', 1.0,
+                     status=order.get('status'), details=_details(order))
+        # supplier is a partner key or a display name ("Thunderbird Metals") → same lookup as the timeline
+        supplier = _match_partner(order.get('supplier') or '', match_index)
+        if not (supplier or '').startswith('partner:'):
+            supplier = f"partner:{order.get('supplier')}"
+        g.edge(supplier, oid, 4)
+
+    for key, source in (data.get('sources') or {}).items():
+        sid = g.node(f'source:{key}', (source or {}).get('provider', key), 'source', 1.5,
+                     status=(source or {}).get('status'), details=_details(source))
+        g.edge(root, sid, 4)
+
+    for key, trip in (data.get('trips') or {}).items():
+        if isinstance(trip, dict) and trip.get('destination'):
+            tid = g.node(f'trip:{key}', trip.get('name', key), 'trip', 1.6,
+                         status=trip.get('status'), details=_details(trip))
+            g.edge(root, tid, 5)
+
+    if model.holdings:
+        hub = g.node('investment', 'Portfolio', 'investment', 1.8)
+        g.edge(root, hub, 8)
+        total = sum(h.value_krw or 0 for h in model.holdings.values()) or 1
+        for symbol, holding in model.holdings.items():
+            hid = g.node(f'holding:{symbol}', symbol, 'holding', 0.8 + 2 * (holding.value_krw or 0) / total,
+                         score=holding.return_pct, status=holding.conviction, details=_details(holding.raw))
+            g.edge(hub, hid, 2 + 8 * (holding.value_krw or 0) / total)
+            match_index.setdefault(_key(symbol), hid)
+
+    # Relationship state from the timeline: score → node size/edge weight
+    for name, state in tm.partners.items():
+        nid = _match_partner(name, match_index)
+        if nid is None:
+            if not any(e.partner == name and e.type in PARTNER_EVENT_TYPES for e in tm.events):
+                continue
+            nid = g.node(f'partner:{_key(name)}', name, 'partner', 1.3)
+            match_index[_key(name)] = nid
+            company = f'company:{DEFAULT_PARTNER_COMPANY}'
+            g.edge(company if company in g.nodes else root, nid, 5)
+        node = g.nodes[nid]
+        if node['type'] != 'partner':
+            continue
+        node['score'] = round(state.relationship_score, 2)
+        node['size'] = round(1.0 + state.relationship_score / 10, 2)
+        node['details'] = dict(node['details'], emails=state.email_count, meetings=state.meeting_count,
+                               deals=state.deal_count, first_contact=state.first_contact)
+        for (source, target) in list(g.edges):
+            if target == nid:
+                g.edges[(source, target)] = round(2 + state.relationship_score * 0.8, 2)
+
+    return g
+
+# ===== Layout =====
+
+def _seed_position(node_id, radius=10.0):
+    """id에서 결정적인 초기 좌표 (실행마다 같은 레이아웃)"""
+    rng = np.random.default_rng(zlib.crc32(node_id.encode('utf-8')))
+    v = rng.normal(size=3)
+    return v / (np.linalg.norm(v) or 1) * radius * rng.uniform(0.5, 1.0)
+
+def compute_layout(ids, edges, previous=None, iterations=300, chunk=512):
+    """
+    3D force-directed 레이아웃 (Fruchterman-Reingold, numpy)
+    previous {id: (x,y,z)}가 있으면 기존 노드는 그 좌표에 고정하고
+    새 노드만 (이웃 근처에서 시작해) 자리를 찾아가게 한다
+    """
+    n = len(ids)
+    if n == 0:
+        return np.zeros((0, 3), dtype=np.float32)
+    index = {node_id: i for i, node_id in enumerate(ids)}
+    previous = previous or {}
+
+    pos = np.empty((n, 3))
+    known = np.zeros(n, dtype=bool)
+    for i, node_id in enumerate(ids):
+        if node_id in previous:
+            pos[i] = previous[node_id]
+            known[i] = True
+    src = np.array([index[s] for s, t in edges], dtype=np.int64)
+    dst = np.array([index[t] for s, t in edges], dtype=np.int64)
+    # New nodes start next to an already placed neighbour when there is one
+    for i, node_id in enumerate(ids):
+        if known[i]:
+            continue
+        anchors = np.concatenate([dst[(src == i) & known[dst]], src[(dst == i) & known[src]]])
+        offset = _seed_position(node_id, 2.0 if len(anchors) else 10.0)
+        pos[i] = (pos[anchors[0]] if len(anchors) else 0) + offset
+
+    if known.all():
+        return pos.astype(np.float32)
+    warm = known.any()
+    if warm:
+        iterations = max(30, iterations // 5)
+    k = 1.5  # ideal edge length (카메라 z=25 기준 반경 ~10)
+    temperature = (1.0 if warm else 5.0)
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        disp = np.zeros_like(pos)
+        # Repulsion in row chunks: O(n^2) time, O(chunk * n) memory
+        for start in range(0, n, chunk):
+            delta = pos[start:start + chunk, None, :] - pos[None, :, :]
+            dist2 = np.maximum((delta ** 2).sum(-1), 1e-4)
+            disp[start:start + chunk] += (delta * (k * k / dist2)[..., None]).sum(1)
+        # Attraction along edges
+        if len(src):
+            delta = pos[src] - pos[dst]
+            dist = np.maximum(np.linalg.norm(delta, axis=1), 1e-4)
+            force = delta * (dist / k)[:, None]
+            np.add.at(disp, src, -force)
+            np.add.at(disp, dst, force)
+        # Gravity keeps disconnected parts on screen
+        disp -= pos * 0.05
+        length = np.maximum(np.linalg.norm(disp, axis=1), 1e-9)
+        step = np.minimum(length, temperature)
+        if warm:
+            # Already placed nodes stay put so the browser does not re-animate them
+            step = np.where(known, 0.0, step)
+        pos += disp / length[:, None] * step[:, None]
+        temperature -= cooling
+
+    return pos.astype(np.float32)
+
+# ===== Export =====
+
+def graph_signature(model, tm):
+    """입력 시그니처: 온톨로지 sha1 + 타임라인 내용"""
+    timeline = hashlib.sha1(json.dumps([(e.date, e.type, e.partner, e.impact) for e in tm.events],
+                                       ensure_ascii=False).encode('utf-8')).hexdigest()
+    return hashlib.sha1(f"{EXPORT_VERSION}:{model.source.get('sha1')}:{timeline}".encode()).hexdigest()
+
+def to_columns(g, positions):
+    """GraphBuilder + 좌표 → 컬럼형 dict (type은 코드, 엣지는 노드 인덱스)"""
+    ids = list(g.nodes)
+    types = sorted({n['type'] for n in g.nodes.values()})
+    type_code = {t: i for i, t in enumerate(types)}
+    index = {node_id: i for i, node_id in enumerate(ids)}
+    nodes = {col: [g.nodes[i][col] for i in ids] for col in NODE_COLUMNS}
+    nodes['type'] = [type_code[t] for t in nodes['type']]
+    nodes['details'] = [g.nodes[i]['details'] for i in ids]
+    edges = sorted(g.edges.items())
+    return {
+        'types': types,
+        'nodes': nodes,
+        'positions': [round(float(v), 3) for v in positions.reshape(-1)],
+        'edges': {
+            'source': [index[s] for (s, t), w in edges],
+            'target': [index[t] for (s, t), w in edges],
+            'weight': [w for (s, t), w in edges],
+        },
+    }
+
+def _rows(doc):
+    """컬럼형 export → {id: node dict(type 문자열, xyz 포함)}, {(s, t): weight}"""
+    if not doc:
+        return {}, {}
+    nodes, types, pos = doc['nodes'], doc['types'], doc['positions']
+    rows = {}
+    for i, node_id in enumerate(nodes['id']):
+        row = {col: nodes[col][i] for col in NODE_COLUMNS}
+        row['type'] = types[row['type']]
+        row['details'] = nodes['details'][i]
+        row['xyz'] = pos[3 * i:3 * i + 3]
+        rows[node_id] = row
+    ids = nodes['id']
+    edges = {(ids[s], ids[t]): w for s, t, w in
+             zip(doc['edges']['source'], doc['edges']['target'], doc['edges']['weight'])}
+    return rows, edges
+
+def diff_graphs(old, new):
+    """이전/새 export 비교 → delta (노드 id 기준, 인덱스는 바뀔 수 있으므로)"""
+    old_rows, old_edges = _rows(old)
+    new_rows, new_edges = _rows(new)
+
+    def columns(rows, cols):
+        return {col: [row[col] for row in rows] for col in cols}
+
+    added = [new_rows[i] for i in new_rows if i not in old_rows]
+    removed = [i for i in old_rows if i not in new_rows]
+    updated, moved = [], []
+    for node_id, row in new_rows.items():
+        prev = old_rows.get(node_id)
+        if prev is None:
+            continue
+        if any(prev[col] != row[col] for col in NODE_COLUMNS + ('details',)):
+            updated.append(row)
+        if max(abs(a - b) for a, b in zip(prev['xyz'], row['xyz'])) > MOVE_EPSILON:
+            moved.append(row)
+
+    delta = {}
+    if added:
+        delta['added'] = columns(added, NODE_COLUMNS + ('details',))
+        delta['added']['positions'] = [v for row in added for v in row['xyz']]
+    if removed:
+        delta['removed'] = removed
+    if updated:
+        delta['updated'] = columns(updated, NODE_COLUMNS + ('details',))
+    if moved:
+        delta['moved'] = {'id': [row['id'] for row in moved],
+                          'positions': [v for row in moved for v in row['xyz']]}
+    edges_added = {e: w for e, w in new_edges.items() if old_edges.get(e) != w}
+    edges_removed = [e for e in old_edges if e not in new_edges]
+    if edges_added:
+        delta['edges_added'] = {'source': [s for s, t in edges_added], 'target': [t for s, t in edges_added],
+                                'weight': list(edges_added.values())}
+    if edges_removed:
+        delta['edges_removed'] = {'source': [s for s, t in edges_removed],
+                                  'target': [t for s, t in edges_removed]}
+    return delta
+
+def load_export(path=GRAPH_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_export(doc, path=GRAPH_FILE):
+    """컬럼 하나씩 임시 파일에 스트리밍 기록 후 rename (큰 그래프도 한 번에 문자열로 만들지 않음)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.json.tmp')
+    dump = lambda value: json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write('{')
+        for i, (key, value) in enumerate(doc.items()):
+            f.write(',' if i else '')
+            if isinstance(value, dict) and key in ('nodes', 'edges'):
+                f.write(f'{dump(key)}:{{')
+                for j, (col, values) in enumerate(value.items()):
+                    f.write(f"{',' if j else ''}{dump(col)}:{dump(values)}\n")
+                f.write('}')
+            else:
+                f.write(f'{dump(key)}:{dump(value)}\n')
+        f.write('}\n')
+    os.replace(tmp, path)
+
+def append_delta(delta, path=DELTAS_FILE):
+    """delta 로그에 추가 (MAX_DELTAS 초과분은 앞에서 잘라서 원자적으로 다시 씀)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    line = json.dumps(delta, ensure_ascii=False, separators=(',', ':'))
+    try:
+        lines = path.read_text(encoding='utf-8').splitlines()
+    except OSError:
+        lines = []
+    if len(lines) < MAX_DELTAS:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+        return
+    tmp = path.with_suffix('.jsonl.tmp')
+    tmp.write_text('\n'.join(lines[-(MAX_DELTAS - 1):] + [line]) + '\n', encoding='utf-8')
+    os.replace(tmp, path)
+
+def export_graph(force=False, relayout=False, iterations=300):
+    """
+    그래프 export
+    Returns the delta written (None when nothing changed or on the first export).
+    """
+    model = load_model()
+    tm = TimeMachine(WORKSPACE)
+    sig = graph_signature(model, tm)
+
+    previous = load_export()
+    if previous and previous.get('version') != EXPORT_VERSION:
+        previous = None
+    if previous and previous.get('signature') == sig and not force:
+        print(f"✅ Graph up to date (seq {previous['seq']})")
+        return None
+
+    g = build_graph(model, tm)
+    ids = list(g.nodes)
+    prev_rows, _ = _rows(previous)
+    warm = {} if relayout else {i: row['xyz'] for i, row in prev_rows.items()}
+    positions = compute_layout(ids, list(g.edges), warm, iterations=iterations)
+
+    seq = (previous or {}).get('seq', 0) + 1
+    doc = {
+        'version': EXPORT_VERSION,
+        'seq': seq,
+        'generated': datetime.now().strftime('%Y-%m-%dT%H:%M:%S+09:00'),
+        'signature': sig,
+    }
+    doc.update(to_columns(g, positions))
+
+    delta = None
+    if previous:
+        changes = diff_graphs(previous, doc)
+        if changes:
+            delta = dict({'seq': seq, 'base': previous['seq'], 'generated': doc['generated']}, **changes)
+        else:
+            # Same graph (e.g. --force, or inputs changed without touching it): no new seq, no delta line
+            seq = doc['seq'] = previous['seq']
+
+    write_export(doc)
+    if delta:
+        append_delta(delta)
+
+    edges = len(doc['edges']['source'])
+    print(f"✅ Graph exported: {len(ids)} nodes, {edges} edges (seq {seq})")
+    print(f"   {GRAPH_FILE.relative_to(WORKSPACE)}")
+    if previous and not delta:
+        print("   Delta: no changes")
+    if delta:
+        counts = {'added': len(delta.get('added', {}).get('id', [])),
+                  'removed': len(delta.get('removed', [])),
+                  'updated': len(delta.get('updated', {}).get('id', [])),
+                  'moved': len(delta.get('moved', {}).get('id', []))}
+        parts = [f"{count} {name}" for name, count in counts.items() if count]
+        print(f"   Delta: {', '.join(parts) or 'edges only'}")
+    return delta
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export the ontology graph for the 3D dashboards")
+    parser.add_argument("--force", action="store_true", help="Export even if inputs did not change")
+    parser.add_argument("--relayout", action="store_true", help="Ignore previous coordinates")
+    parser.add_argument("--iterations", type=int, default=300, help="Layout iterations for a cold start")
+    args = parser.parse_args()
+
+    export_graph(force=args.force, relayout=args.relayout, iterations=args.iterations)
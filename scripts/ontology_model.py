@@ -0,0 +1,541 @@
+#!/usr/bin/env python3
+"""
+CHRIS-ONTOLOGY Compiled Model
+YAML을 한 번만 파싱해서 타입/인덱스가 있는 모델로 컴파일하고
+바이너리 스냅샷(pickle)으로 캐시 - 쿼리 시 YAML 파싱 생략
+
+스냅샷 키: YAML의 (mtime, size) → 바뀌었으면 sha1 비교 → 내용이 다를 때만 재컴파일
+"""
+
+import os
+import re
+import sys
+import pickle
+import hashlib
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+WORKSPACE = Path(__file__).parent.parent
+ONTOLOGY_FILE = WORKSPACE / "CHRIS-ONTOLOGY.yml"
+SNAPSHOT_DIR = WORKSPACE / ".ontology_cache"
+MODEL_VERSION = 2
+
+@dataclass
+class Project:
+    id: str
+    name: str
+    company: str  # companies.<key>, 또는 top-level projects는 ""
+    status: str
+    progress: Optional[int] = None
+    blocker: Optional[str] = None
+    next_action: Optional[str] = None
+    raw: Dict = field(default_factory=dict)
+
+@dataclass
+class Holding:
+    symbol: str
+    asset_class: str  # us_equities, crypto, korea_equities, ...
+    shares: Optional[float] = None
+    value_krw: Optional[int] = None
+    return_pct: Optional[float] = None
+    conviction: Optional[str] = None
+    raw: Dict = field(default_factory=dict)
+
+@dataclass
+class OntologyModel:
+    data: Dict
+    projects: Dict[str, Project]
+    holdings: Dict[str, Holding]
+    watchlist: List[Dict]
+    priority_queue: List[Tuple[int, str]]
+    projects_by_status: Dict[str, List[str]]
+    projects_by_company: Dict[str, List[str]]
+    blockers: List[str]  # blocker가 있는 project id
+    source: Dict = field(default_factory=dict)  # path, mtime, size, sha1
+    views: Dict = field(default_factory=dict)  # @projects, @holdings, @blockers, @watchlist
+    indexes: Dict = field(default_factory=dict)  # 컬렉션 경로 → 필드 → 값 → [키] (쿼리용)
+
+    @property
+    def active_projects(self) -> List[Project]:
+        return [p for p in self.projects.values() if p.status not in ('completed', 'paused')]
+
+    def by_status(self, status: str) -> List[Project]:
+        return [self.projects[i] for i in self.projects_by_status.get(status, [])]
+
+    def by_company(self, company: str) -> List[Project]:
+        return [self.projects[i] for i in self.projects_by_company.get(company, [])]
+
+    def blocked(self) -> List[Project]:
+        return [self.projects[i] for i in self.blockers]
+
+    def query(self, expr: str, select: List[str] = None, limit: int = 0) -> List[Dict]:
+        """경로/조건 쿼리 (run_query 참고)"""
+        return run_query(self, expr, select, limit)
+
+# ===== Compile =====
+
+def _int(value: Any) -> Optional[int]:
+    """85, "85", "85%" → 85"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        digits = value.strip().rstrip('%').strip()
+        if digits.isdigit():
+            return int(digits)
+    return None
+
+def _project(raw: Dict, company: str, index: int) -> Project:
+    blocker = raw.get('blocker') or raw.get('blockers') or None
+    if isinstance(blocker, list):
+        blocker = '; '.join(str(b) for b in blocker) or None
+    next_action = raw.get('next_action') or raw.get('next_actions') or None
+    if isinstance(next_action, list):
+        next_action = next_action[0] if next_action else None
+    return Project(
+        id=str(raw.get('id') or f"{company or 'project'}-{index}"),
+        name=str(raw.get('name', '')),
+        company=company,
+        status=str(raw.get('status', 'unknown')),
+        progress=_int(raw.get('progress')),
+        blocker=blocker,
+        next_action=next_action,
+        raw=raw,
+    )
+
+def _collect_projects(data: Dict) -> List[Project]:
+    """companies.*.current_projects + projects.current (두 스키마 모두 지원)"""
+    projects = []
+    for key, company in (data.get('companies') or {}).items():
+        for i, raw in enumerate((company or {}).get('current_projects') or []):
+            projects.append(_project(raw, key, i))
+    top = data.get('projects') or {}
+    for i, raw in enumerate((top.get('current') or []) if isinstance(top, dict) else top):
+        projects.append(_project(raw, '', i))
+    return projects
+
+def _collect_holdings(data: Dict) -> Dict[str, Holding]:
+    """portfolio.holdings(dict) 또는 investment.portfolio.current_structure.*.top_holdings"""
+    holdings = {}
+
+    portfolio = data.get('portfolio') or {}
+    for symbol, raw in (portfolio.get('holdings') or {}).items():
+        raw = raw or {}
+        holdings[str(symbol)] = Holding(
+            symbol=str(symbol), asset_class=raw.get('asset_class', 'equity'),
+            shares=raw.get('shares'), value_krw=raw.get('value_krw'),
+            return_pct=raw.get('return_pct'), conviction=raw.get('conviction'), raw=raw,
+        )
+
+    structure = ((data.get('investment') or {}).get('portfolio') or {}).get('current_structure') or {}
+    for asset_class, bucket in structure.items():
+        for raw in (bucket or {}).get('top_holdings') or []:
+            symbol = raw.get('symbol') or raw.get('coin') or raw.get('name')
+            if not symbol:
+                continue
+            holdings[str(symbol)] = Holding(
+                symbol=str(symbol), asset_class=asset_class,
+                shares=raw.get('shares', raw.get('amount')), value_krw=raw.get('value_krw'),
+                return_pct=raw.get('return_pct'), conviction=raw.get('conviction'), raw=raw,
+            )
+    return holdings
+
+def _collect_priority_queue(data: Dict) -> List[Tuple[int, str]]:
+    """active_projects.priority_queue 또는 meta.priority_queue → [(순위, 작업)]"""
+    queue = ((data.get('active_projects') or {}).get('priority_queue')
+             or (data.get('meta') or {}).get('priority_queue') or {})
+    if isinstance(queue, list):
+        queue = dict(enumerate(queue, 1))
+    return sorted((_int(k) or 0, str(v)) for k, v in queue.items())
+
+def compile_ontology(data: Dict, source: Dict = None) -> OntologyModel:
+    """파싱된 YAML dict → 인덱스가 있는 모델"""
+    data = data or {}
+    projects: Dict[str, Project] = {}
+    by_status: Dict[str, List[str]] = {}
+    by_company: Dict[str, List[str]] = {}
+    blockers: List[str] = []
+
+    for project in _collect_projects(data):
+        projects[project.id] = project
+        by_status.setdefault(project.status, []).append(project.id)
+        by_company.setdefault(project.company, []).append(project.id)
+        if project.blocker:
+            blockers.append(project.id)
+
+    portfolio = data.get('portfolio') or {}
+    watchlist = portfolio.get('watchlist') or (data.get('investment') or {}).get('watchlist') or []
+    holdings = _collect_holdings(data)
+
+    views = {
+        '@projects': {pid: _record(p) for pid, p in projects.items()},
+        '@holdings': {symbol: _record(h) for symbol, h in holdings.items()},
+        '@blockers': {pid: _record(projects[pid]) for pid in blockers},
+        '@watchlist': list(watchlist),
+    }
+    indexes = build_indexes(data)
+    indexes.update(build_indexes(views))
+
+    return OntologyModel(
+        data=data,
+        projects=projects,
+        holdings=holdings,
+        watchlist=list(watchlist),
+        priority_queue=_collect_priority_queue(data),
+        projects_by_status=by_status,
+        projects_by_company=by_company,
+        blockers=blockers,
+        source=source or {},
+        views=views,
+        indexes=indexes,
+    )
+
+def _record(obj) -> Dict:
+    """dataclass → 쿼리용 dict (raw 제외)"""
+    record = asdict(obj)
+    record.pop('raw', None)
+    return record
+
+# ===== Path Query =====
+#   companies.*.current_projects[status=blocked]
+#   partners.*[status~urgent][email_count>=40].name
+#   @projects.*[status=blocked|waiting]       (@뷰: 컴파일된 레코드)
+#   investment.portfolio.current_structure.*.top_holdings[0]
+# 조건: field, !field, = != > >= < <= ~(포함), 값은 a|b 로 OR, 대괄호 여러 개는 AND
+
+INDEXED_FIELDS = ('id', 'status', 'company', 'symbol', 'ticker', 'coin', 'asset_class',
+                  'conviction', 'priority', 'relationship', 'country', 'importance', 'type')
+
+PREDICATE_RE = re.compile(r"^\s*(!?)\s*([^\s=!<>~]+)\s*(?:(=|!=|>=|<=|>|<|~)\s*(.*?))?\s*$")
+STEP_RE = re.compile(r"^([^\[\]]*)((?:\[[^\]]*\])*)$")
+
+class QueryError(ValueError):
+    """잘못된 쿼리 문법"""
+
+def _norm(value: Any) -> str:
+    return str(value).strip().lower()
+
+def _items(node: Any):
+    if isinstance(node, dict):
+        return list(node.items())
+    if isinstance(node, list):
+        return list(enumerate(node))
+    return []
+
+def build_indexes(root: Any) -> Dict[Tuple, Dict[str, Dict[str, List]]]:
+    """
+    보조 인덱스: dict들을 담은 컬렉션마다 INDEXED_FIELDS 값 → 자식 키 목록
+    예) ('companies', 'roturn', 'current_projects') → status → 'blocked' → [0, 2]
+    """
+    indexes = {}
+
+    def walk(node: Any, path: Tuple):
+        fields: Dict[str, Dict[str, List]] = {}
+        for key, child in _items(node):
+            if isinstance(child, dict):
+                for name in INDEXED_FIELDS:
+                    value = child.get(name)
+                    # 리스트 값은 원소마다 (쿼리의 '='도 원소 중 하나와 비교)
+                    values = value if isinstance(value, list) else [value]
+                    for norm in dict.fromkeys(_norm(v) for v in values
+                                              if v is not None and not isinstance(v, (dict, list))):
+                        fields.setdefault(name, {}).setdefault(norm, []).append(key)
+            if isinstance(child, (dict, list)):
+                walk(child, path + (key,))
+        if fields:
+            indexes[path] = fields
+
+    walk(root, ())
+    return indexes
+
+def format_path(path: Tuple) -> str:
+    out = ''
+    for key in path:
+        out += f"[{key}]" if isinstance(key, int) else (f".{key}" if out else str(key))
+    return out
+
+def _split_steps(expr: str) -> List[str]:
+    """'.' 기준 분리 (대괄호/따옴표 안은 제외)"""
+    steps, buf, depth, quote = [], '', 0, None
+    for ch in expr:
+        if quote:
+            quote = None if ch == quote else quote
+        elif ch in '"\'':
+            quote = ch
+        elif ch == '[':
+            depth += 1
+        elif ch == ']':
+            depth -= 1
+        elif ch == '.' and depth == 0:
+            steps.append(buf)
+            buf = ''
+            continue
+        buf += ch
+    if depth or quote:
+        raise QueryError(f"Unbalanced brackets or quotes: {expr}")
+    steps.append(buf)
+    return steps
+
+def parse_query(expr: str) -> List[Tuple[str, List]]:
+    """쿼리 문자열 → [(selector, [predicate, ...])]; 정수 predicate는 인덱스"""
+    steps = []
+    for token in _split_steps(expr.strip()):
+        match = STEP_RE.match(token.strip())
+        if not match or not match.group(1):
+            raise QueryError(f"Invalid step: '{token}'")
+        preds = []
+        for body in re.findall(r"\[([^\]]*)\]", match.group(2)):
+            if re.fullmatch(r"\s*-?\d+\s*", body):
+                preds.append(int(body))
+                continue
+            pred = PREDICATE_RE.match(body)
+            if not pred:
+                raise QueryError(f"Invalid predicate: [{body}]")
+            negate, name, op, value = pred.groups()
+            value = (value or '').strip().strip('"\'')
+            preds.append((bool(negate), name, op, value))
+        steps.append((match.group(1).strip(), preds))
+    return steps
+
+def _get(node: Any, dotted: str) -> Any:
+    for part in dotted.split('.'):
+        if not isinstance(node, dict) or part not in node:
+            return None
+        node = node[part]
+    return node
+
+def _compare(actual: Any, op: str, expected: str) -> bool:
+    if isinstance(actual, list):
+        return any(_compare(a, op, expected) for a in actual)
+    if op == '~':
+        return any(_norm(e) in _norm(actual) for e in expected.split('|'))
+    if op == '=':
+        return any(_norm(actual) == _norm(e) for e in expected.split('|'))
+    if op == '!=':
+        return not _compare(actual, '=', expected)
+    try:
+        a, e = float(str(actual).rstrip('%')), float(expected.rstrip('%'))
+    except ValueError:
+        a, e = _norm(actual), _norm(expected)
+    return {'>': a > e, '>=': a >= e, '<': a < e, '<=': a <= e}[op]
+
+def _matches(node: Any, pred: Tuple) -> bool:
+    negate, name, op, value = pred
+    actual = _get(node, name)
+    if op is None:
+        return bool(actual) != negate
+    if actual is None:
+        return negate
+    return _compare(actual, op, value) != negate
+
+def _filter_children(path: Tuple, container: Any, preds: List, indexes: Dict) -> List[Tuple[Tuple, Any]]:
+    """컬렉션의 자식 중 조건에 맞는 것 - 첫 번째 '=' 조건은 보조 인덱스로"""
+    fields = indexes.get(path)
+    keys, rest = None, []
+    for pred in preds:
+        indexed = (keys is None and fields and isinstance(pred, tuple) and pred[2] == '='
+                   and not pred[0] and pred[1] in fields)
+        if indexed:
+            wanted = set()
+            for value in pred[3].split('|'):
+                wanted.update(fields[pred[1]].get(_norm(value), ()))
+            keys = wanted
+        else:
+            rest.append(pred)
+
+    children = [(k, v) for k, v in _items(container) if keys is None or k in keys]
+    for pred in rest:
+        if isinstance(pred, int):
+            children = children[pred:pred + 1] if pred >= 0 else children[pred:][:1]
+        else:
+            children = [(k, v) for k, v in children if _matches(v, pred)]
+    return [(path + (k,), v) for k, v in children]
+
+def run_query(model: OntologyModel, expr: str, select: List[str] = None,
+              limit: int = 0) -> List[Dict]:
+    """
+    경로/조건 쿼리 실행 → [{"path": ..., "value": ...}]
+    select가 있으면 value 대신 해당 필드만 (점 경로 가능)
+    """
+    steps = parse_query(expr)
+    root = model.views if steps[0][0].startswith('@') else model.data
+    nodes: List[Tuple[Tuple, Any]] = [((), root)]
+
+    for selector, preds in steps:
+        out = []
+        for path, value in nodes:
+            if selector == '*':
+                out.extend(_filter_children(path, value, preds, model.indexes) if preds
+                           else [(path + (k,), v) for k, v in _items(value)])
+                continue
+            if isinstance(value, dict):
+                found = [(path + (selector,), value[selector])] if selector in value else []
+            elif isinstance(value, list):
+                # 리스트에 이름을 적용하면 각 원소의 필드로
+                found = [(path + (i, selector), el[selector]) for i, el in enumerate(value)
+                         if isinstance(el, dict) and selector in el]
+            else:
+                found = []
+            for child_path, child in found:
+                if not preds:
+                    out.append((child_path, child))
+                elif isinstance(child, list) or any(isinstance(p, int) for p in preds):
+                    # 리스트(또는 partners[0]처럼 위치 지정)는 원소를 거름
+                    out.extend(_filter_children(child_path, child, preds, model.indexes))
+                elif all(_matches(child, p) for p in preds):
+                    out.append((child_path, child))
+        nodes = out
+
+    if limit:
+        nodes = nodes[:limit]
+    results = []
+    for path, value in nodes:
+        if select and isinstance(value, dict):
+            value = {name: _get(value, name) for name in select}
+        results.append({"path": format_path(path), "value": value})
+    return results
+
+# ===== Snapshot =====
+
+def _snapshot_path(ontology_file: Path) -> Path:
+    return SNAPSHOT_DIR / f"{ontology_file.stem}.pkl"
+
+def _parse_yaml(text: str) -> Dict:
+    import yaml
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    return yaml.load(text, Loader=loader) or {}
+
+def _save_snapshot(path: Path, model: OntologyModel):
+    """임시 파일 + rename으로 원자적 저장"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'wb') as f:
+        pickle.dump({"version": MODEL_VERSION, "model": model}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+def _load_snapshot(path: Path) -> Optional[OntologyModel]:
+    try:
+        with open(path, 'rb') as f:
+            snapshot = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if snapshot.get("version") != MODEL_VERSION:
+        return None
+    return snapshot["model"]
+
+_model_cache: Dict[str, OntologyModel] = {}
+
+def load_model(ontology_file: Path = ONTOLOGY_FILE, use_snapshot: bool = True) -> OntologyModel:
+    """
+    컴파일된 모델 로드
+    1) 프로세스 캐시 / 스냅샷의 (mtime, size)가 같으면 그대로 사용
+    2) 다르면 sha1 비교 - 내용이 같으면(touch 등) 스냅샷 키만 갱신
+    3) 내용이 바뀌었을 때만 YAML 파싱 + 컴파일
+    """
+    ontology_file = Path(ontology_file)
+    st = ontology_file.stat()
+    sig = {"path": str(ontology_file), "mtime": st.st_mtime_ns, "size": st.st_size}
+
+    def fresh(model: Optional[OntologyModel]) -> bool:
+        return model is not None and all(model.source.get(k) == v for k, v in sig.items())
+
+    cached = _model_cache.get(str(ontology_file))
+    if fresh(cached):
+        return cached
+
+    snapshot_path = _snapshot_path(ontology_file)
+    model = _load_snapshot(snapshot_path) if use_snapshot else None
+    if fresh(model):
+        _model_cache[str(ontology_file)] = model
+        return model
+
+    raw = ontology_file.read_bytes()
+    sha1 = hashlib.sha1(raw).hexdigest()
+    if model is not None and model.source.get("path") == sig["path"] and model.source.get("sha1") == sha1:
+        model.source.update(sig)
+    else:
+        model = compile_ontology(_parse_yaml(raw.decode('utf-8')), dict(sig, sha1=sha1))
+
+    if use_snapshot:
+        _save_snapshot(snapshot_path, model)
+    _model_cache[str(ontology_file)] = model
+    return model
+
+def store_model(data: Dict, ontology_file: Path = ONTOLOGY_FILE) -> OntologyModel:
+    """
+    방금 저장한 YAML의 dict를 그대로 컴파일해서 스냅샷 갱신
+    (ontology-sync가 쓴 직후 다음 쿼리가 YAML을 다시 파싱하지 않도록)
+    """
+    ontology_file = Path(ontology_file)
+    st = ontology_file.stat()
+    sig = {"path": str(ontology_file), "mtime": st.st_mtime_ns, "size": st.st_size,
+           "sha1": hashlib.sha1(ontology_file.read_bytes()).hexdigest()}
+    model = compile_ontology(data, sig)
+    _save_snapshot(_snapshot_path(ontology_file), model)
+    _model_cache[str(ontology_file)] = model
+    return model
+
+# ===== Structural Diff =====
+
+def diff_documents(old: Any, new: Any, path: Tuple = (), ignore: Tuple = ()) -> List[Dict]:
+    """
+    두 문서의 구조적 차이 → [{"op": add|remove|change, "path", "old", "new"}]
+    dict는 키 단위, 리스트는 id가 있으면 id 단위, 없으면 위치 단위로 비교
+    """
+    if path and path[-1] in ignore:
+        return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = []
+        for key in old:
+            if key not in new and key not in ignore:
+                changes.append({"op": "remove", "path": format_path(path + (key,)), "old": old[key]})
+        for key, value in new.items():
+            if key not in old:
+                if key not in ignore:
+                    changes.append({"op": "add", "path": format_path(path + (key,)), "new": value})
+            else:
+                changes.extend(diff_documents(old[key], value, path + (key,), ignore))
+        return changes
+    if isinstance(old, list) and isinstance(new, list):
+        def ids(items):
+            keys = [item.get('id') if isinstance(item, dict) else None for item in items]
+            return keys if None not in keys and len(set(keys)) == len(keys) else None
+        old_ids, new_ids = ids(old), ids(new)
+        if old_ids is not None and new_ids is not None:
+            changes = []
+            old_by_id = dict(zip(old_ids, range(len(old))))
+            for i, item_id in enumerate(new_ids):
+                if item_id in old_by_id:
+                    changes.extend(diff_documents(old[old_by_id[item_id]], new[i], path + (i,), ignore))
+                else:
+                    changes.append({"op": "add", "path": format_path(path + (i,)), "new": new[i]})
+            removed = set(old_ids) - set(new_ids)
+            changes.extend({"op": "remove", "path": format_path(path + (j,)), "old": old[j]}
+                           for j, item_id in enumerate(old_ids) if item_id in removed)
+            return changes
+        changes = []
+        for i in range(max(len(old), len(new))):
+            if i >= len(new):
+                changes.append({"op": "remove", "path": format_path(path + (i,)), "old": old[i]})
+            elif i >= len(old):
+                changes.append({"op": "add", "path": format_path(path + (i,)), "new": new[i]})
+            else:
+                changes.extend(diff_documents(old[i], new[i], path + (i,), ignore))
+        return changes
+    if old != new:
+        return [{"op": "change", "path": format_path(path), "old": old, "new": new}]
+    return []
+
+if __name__ == '__main__':
+    import time
+
+    # 스냅샷의 클래스 경로가 __main__이 아닌 ontology_model이 되도록
+    sys.path.insert(0, str(Path(__file__).parent))
+    import ontology_model
+
+    start = time.perf_counter()
+    model = ontology_model.load_model(Path(sys.argv[1]) if len(sys.argv) > 1 else ONTOLOGY_FILE)
+    took = (time.perf_counter() - start) * 1000
+    print(f"✅ {len(model.projects)} projects, {len(model.holdings)} holdings, "
+          f"{len(model.blockers)} blockers ({took:.1f} ms)")
+    print(f"   Snapshot: {_snapshot_path(Path(model.source['path']))}")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Timeline ingest tests - partner resolution and dedup
+python3 -m pytest scripts/test_timeline_ingest.py
+"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+import timeline_ingest
+from timeline_ingest import (EVENT_LOG, DECISIONS_DIR, EMAIL_ARCHIVE, PartnerResolver,
+                             ingest, read_log)
+
+PARTNERS = {
+    'luxfer': {'name': 'Luxfer', 'domain': 'luxfer.com'},
+    'taylorwharton': {'name': 'Taylor-Wharton', 'domain': 'taylorwharton.com'},
+    'hyundai_kia': {'name': '현대/기아', 'domain': 'hyundai.com / kia.com'},
+}
+DISPLAY = {'Luxfer', 'Taylor-Wharton', 'Hyundai'}
+
+ONTOLOGY = """
+companies:
+  koreacryo:
+    name: "KoreaCryo"
+    contact: "chris@koreacryo.com"
+partners:
+  luxfer:
+    name: "Luxfer"
+    domain: "luxfer.com"
+  hyundai_kia:
+    name: "현대/기아"
+    domain: "hyundai.com / kia.com"
+"""
+
+def _resolver():
+    return PartnerResolver(PARTNERS, DISPLAY, own_domains={'koreacryo.com'},
+                           own_names={'koreacryo', 'KoreaCryo', 'Korea Cryogenics'})
+
+def test_resolves_sender_domain_to_display_name():
+    r = _resolver()
+    assert r.by_sender('Jim <jim@mail.luxfer.com>') == 'Luxfer'
+    assert r.by_sender('kim@hyundai.com') == 'Hyundai'
+    assert r.by_sender('a@kia.com') == 'Hyundai'
+    assert r.by_sender('t@taylorwharton.com') == 'Taylor-Wharton'
+
+def test_own_and_generic_domains_are_not_partners():
+    r = _resolver()
+    assert r.by_sender('chris@koreacryo.com') is None
+    assert r.by_sender('promo@getemails.site') is None
+    assert r.by_sender('x@163.com') is None
+
+def test_subject_mentions():
+    r = _resolver()
+    assert r.by_text('RE: Taylor-Wharton dewar quotation') == 'Taylor-Wharton'
+    # The own company name in a subject is not a partner, even if it was a milestone subject
+    assert r.by_text('Korea Cryogenics - new catalogue') is None
+    assert PartnerResolver(PARTNERS, DISPLAY | {'KoreaCryo'},
+                           own_names={'koreacryo'}).by_text('KoreaCryo audit') is None
+
+def _workspace(tmp_path: Path) -> Path:
+    (tmp_path / 'CHRIS-ONTOLOGY.yml').write_text(ONTOLOGY, encoding='utf-8')
+    (tmp_path / 'logs').mkdir()
+    emails = [  # newest first, like the real archive
+        {'id': 't3', 'date': '2026-02-03', 'from': 'spam@getemails.site', 'subject': 'Korea Cryogenics leads'},
+        {'id': 't2', 'date': '2026-02-02', 'from': 'jim@luxfer.com', 'subject': 'Valve quotation'},
+        {'id': 't1', 'date': '2026-02-01', 'from': 'kim@hyundai.com', 'subject': 'Meeting minutes'},
+    ]
+    (tmp_path / EMAIL_ARCHIVE).write_text(json.dumps(emails), encoding='utf-8')
+    decisions = tmp_path / DECISIONS_DIR
+    decisions.mkdir(parents=True)
+    (decisions / '2026-02-02_luxfer.md').write_text(
+        "- **날짜**: 2026-02-02\n- **발신자**: jim@luxfer.com\n- **제목**: Valve quotation\n"
+        "- **카테고리**: PO/주문\n- **스레드ID**: t2\n", encoding='utf-8')
+    return tmp_path
+
+def test_ingest_dedups_and_is_idempotent(tmp_path):
+    root = _workspace(tmp_path)
+    # KoreaCryo is a milestone subject, but the ontology lists it as an own company
+    assert ingest(root, display_names=DISPLAY | {'KoreaCryo'}) == 2
+    rows = list(read_log(root / EVENT_LOG))
+    assert sorted(r['k'] for r in rows) == ['email:t1', 'email:t2']
+    assert {r['p'] for r in rows} == {'Luxfer', 'Hyundai'}
+    # The categorized decision wins over the raw archive email of the same thread
+    t2 = next(r for r in rows if r['k'] == 'email:t2')
+    assert t2['t'] == 'PO' and t2['m']['note'].startswith(DECISIONS_DIR)
+
+    assert ingest(root, display_names=DISPLAY) == 0
+    # Even with the source state lost, known keys are not appended again
+    (root / 'logs' / 'timeline_ingest_state.json').unlink()
+    assert ingest(root, display_names=DISPLAY) == 0
+    assert len(list(read_log(root / EVENT_LOG))) == 2
+
+def test_new_archive_records_are_appended(tmp_path):
+    root = _workspace(tmp_path)
+    ingest(root, display_names=DISPLAY)
+    archive = root / EMAIL_ARCHIVE
+    emails = json.loads(archive.read_text(encoding='utf-8'))
+    emails.insert(0, {'id': 't4', 'date': '2026-02-05', 'from': 't@taylorwharton.com', 'subject': 'PO 123'})
+    archive.write_text(json.dumps(emails), encoding='utf-8')
+    assert ingest(root, display_names=DISPLAY) == 1
+    assert [r['k'] for r in read_log(root / EVENT_LOG)][-1] == 'email:t4'
+
+def test_torn_last_line_is_skipped(tmp_path):
+    log = tmp_path / 'events.jsonl'
+    log.write_text('{"k":"a","d":"2026-01-01"}\n{"k":"b","d":"2026-', encoding='utf-8')
+    assert [r['k'] for r in read_log(log)] == ['a']
+
+def test_append_after_torn_line_keeps_new_events(tmp_path):
+    root = _workspace(tmp_path)
+    (root / EVENT_LOG).write_text('{"k":"old","d":"2020-01-01"}\n{"k":"torn","d":"20', encoding='utf-8')
+    assert ingest(root, display_names=DISPLAY) == 2
+    assert [r['k'] for r in read_log(root / EVENT_LOG)] == ['old', 'email:t1', 'email:t2']
+
+def test_archive_date_inversions_still_stop_early(tmp_path, monkeypatch):
+    monkeypatch.setattr(timeline_ingest, 'EMAIL_KNOWN_RUN', 2)
+    root = _workspace(tmp_path)
+    archive = root / EMAIL_ARCHIVE
+    old = [{'id': f'o{i}', 'date': f'2025-0{1 + i % 3}-1{i}', 'from': 'x@nowhere.org', 'subject': 'hi'}
+           for i in range(6)]  # dates out of order, no partner: never in the event log
+    archive.write_text(json.dumps(json.loads(archive.read_text(encoding='utf-8')) + old), encoding='utf-8')
+    assert ingest(root, display_names=DISPLAY) == 2
+
+    emails = json.loads(archive.read_text(encoding='utf-8'))
+    emails.insert(1, {'id': 'new', 'date': '2026-01-01', 'from': 'jim@luxfer.com', 'subject': 'Valve'})
+    emails.append({'id': 'deep', 'date': '2026-02-09', 'from': 'kim@hyundai.com', 'subject': 'Visit'})
+    archive.write_text(json.dumps(emails), encoding='utf-8')
+    # A new thread near the top is found despite the inverted dates; the scan stops
+    # after a run of threads seen last time, so one buried deep needs --full
+    assert ingest(root, display_names=DISPLAY) == 1
+    assert ingest(root, display_names=DISPLAY, full=True) == 1
+    assert [r['k'] for r in read_log(root / EVENT_LOG)][-2:] == ['email:new', 'email:deep']
+
+def _report(rows, **extra):
+    return dict({'report_date': '2026-02-13', 'details': {'sales': rows}}, **extra)
+
+def test_ecount_lines_sample_reports_and_unknown_customers(tmp_path):
+    root = _workspace(tmp_path)
+    line = {'io_date': '20260208', 'io_no': 7, 'cust_des': 'Luxfer Gas Cylinders', 'qty': 1, 'total_amt': 10}
+    rows = [dict(line, prod_cd='P1'), dict(line, prod_cd='P2'), dict(line, prod_cd='P2'),
+            dict(line, prod_cd='P3', cust_des=''), dict(line, prod_cd='P4', cust_des='Unknown Trading')]
+    (root / 'kc_weekly_report_20260213.json').write_text(json.dumps(_report(rows)), encoding='utf-8')
+    sample = [dict(line, cust_des='Sample Customer A', io_no=1001)]
+    (root / 'kc_weekly_report_20260101.json').write_text(json.dumps(_report(sample)), encoding='utf-8')
+    flagged = [dict(line, io_no=99, prod_cd='P9')]
+    (root / 'kc_weekly_report_20260102.json').write_text(json.dumps(_report(flagged, sample=True)),
+                                                         encoding='utf-8')
+    ingest(root, display_names=DISPLAY)
+    sales = [r for r in read_log(root / EVENT_LOG) if r['k'].startswith('sales:')]
+    assert [r['k'] for r in sales] == ['sales:20260208:7:P1', 'sales:20260208:7:P2', 'sales:20260208:7:P2:1']
+    assert {r['p'] for r in sales} == {'Luxfer'}
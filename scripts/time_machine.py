@@ -5,13 +5,19 @@ PHASE 4: Time Machine - Historical Analysis & Simulation
 """
 
 import json
-from datetime import datetime, timedelta
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from collections import defaultdict
-from dataclasses import dataclass, asdict
-from typing import List, Dict, Optional
+from dataclasses import dataclass, asdict, field, replace
+from typing import List, Dict, Optional, Tuple
 import random
 
+import numpy as np
+
+from timeline_ingest import EVENT_LOG, ingest, read_log
+
 @dataclass
 class TimelineEvent:
     date: str
@@ -31,67 +37,368 @@ class PartnerState:
     relationship_score: float = 5.0  # 0-10
     status: str = 'active'  # active, dormant, critical, lost
 
+def advance_partner(p: PartnerState, event: TimelineEvent, days_since: int):
+    """Apply one event to a partner: counts, relationship score, status"""
+    if event.type == 'email':
+        p.email_count += 1
+    elif event.type == 'meeting':
+        p.meeting_count += 1
+    elif event.type in ['deal', 'PO']:
+        p.deal_count += 1
+    
+    # Update relationship score
+    p.relationship_score = max(0, min(10, p.relationship_score + event.impact * IMPACT_WEIGHT))
+    
+    # Determine status
+    if days_since > 180:
+        p.status = 'dormant'
+    if p.relationship_score < 3:
+        p.status = 'critical'
+    if p.relationship_score > 7:
+        p.status = 'strong'
+
+@dataclass
+class SimulationBranch:
+    """
+    Named what-if scenario as an overlay on the shared base timeline
+    events/ordinals are sorted lists shared with the branch it was forked from
+    until either side writes: that write copies them once (owned=True), later
+    writes insert in place. partners only holds partners the overlay touches
+    """
+    name: str
+    events: List[TimelineEvent] = field(default_factory=list)
+    ordinals: List[int] = field(default_factory=list)
+    partners: Dict[str, PartnerState] = field(default_factory=dict)
+    latest: Dict[str, int] = field(default_factory=dict)  # partner → newest overlay ordinal
+    deals_added: int = 0
+    owned: bool = True
+
+DEFAULT_BRANCH = 'simulation'
+
+# Relationship score model: every partner starts at BASE_SCORE, each event adds impact * IMPACT_WEIGHT
+BASE_SCORE = 5.0
+IMPACT_WEIGHT = 0.3
+
+# Trend index: rolling windows (days) per partner event, |impact| that makes a critical moment
+TREND_WINDOWS = (7, 30, 90)
+CRITICAL_IMPACT = 4
+
+# Monte Carlo projection: per-partner monthly rates/impacts of these event groups
+PROJECTION_GROUPS = ('email', 'deal', 'other')
+MONTH_DAYS = 30.44
+
+@dataclass
+class Checkpoint:
+    """Materialized state of all events before `ordinal` (= events[:index])"""
+    ordinal: int
+    index: int
+    total_emails: int
+    total_deals: int
+    partners: Dict[int, Tuple[float, int, int]]  # partner id → (score, emails, deals), first-seen order
+
+def _next_month(ordinal: int) -> int:
+    d = date.fromordinal(ordinal)
+    return (date(d.year + 1, 1, 1) if d.month == 12 else date(d.year, d.month + 1, 1)).toordinal()
+
+def to_ordinal(date_str: str) -> int:
+    """'YYYY-MM-DD' → proleptic ordinal (날짜 비교를 정수 비교로)"""
+    return date.fromisoformat(date_str[:10]).toordinal()
+
+class PartnerSeries:
+    """
+    One partner's events in time order with the running relationship score,
+    impact prefix sums and, per row, rolling counts / impact sums / score deltas
+    over each TREND_WINDOWS window ending at that row
+    """
+
+    def __init__(self):
+        self.events: List[TimelineEvent] = []
+        self.ordinals = array('i')
+        self.scores = array('d')
+        self.prefix = array('d', [0])  # prefix[i] = sum of impacts of rows < i
+        self.rolling = {w: {'count': array('I'), 'impact': array('d'), 'delta': array('d')}
+                        for w in TREND_WINDOWS}
+
+    def insert(self, event: TimelineEvent, ordinal: int):
+        """같은 날짜는 뒤에 추가 → 그 행부터 다시 계산 (보통 마지막 한 행)"""
+        i = bisect_right(self.ordinals, ordinal)
+        self.events.insert(i, event)
+        self.ordinals.insert(i, ordinal)
+        self._recompute(i)
+
+    def _recompute(self, i: int):
+        # Scores are path dependent (clamped), so every row from i on is rebuilt
+        del self.scores[i:], self.prefix[i + 1:]
+        for cols in self.rolling.values():
+            for col in cols.values():
+                del col[i:]
+        
+        score = self.scores[i - 1] if i else BASE_SCORE
+        for r in range(i, len(self.events)):
+            impact = self.events[r].impact
+            score = max(0, min(10, score + impact * IMPACT_WEIGHT))
+            self.scores.append(score)
+            self.prefix.append(self.prefix[r] + impact)
+            t = self.ordinals[r]
+            for w, cols in self.rolling.items():
+                j = bisect_right(self.ordinals, t - w, 0, r)  # first row inside (t - w, t]
+                cols['count'].append(r + 1 - j)
+                cols['impact'].append(self.prefix[r + 1] - self.prefix[j])
+                cols['delta'].append(score - (self.scores[j - 1] if j else BASE_SCORE))
+
+class TrendIndex:
+    """
+    Per-partner time series + critical moments sorted by |impact| (desc, then timeline order)
+    Built once from the store, then updated per appended event
+    """
+
+    def __init__(self):
+        self.series: Dict[str, PartnerSeries] = {}
+        self.critical: List[Tuple[int, int, int, TimelineEvent]] = []  # (-|impact|, ordinal, seq, event)
+        self._seq = 0
+
+    def add(self, event: TimelineEvent, ordinal: int):
+        series = self.series.get(event.partner)
+        if series is None:
+            series = self.series[event.partner] = PartnerSeries()
+        series.insert(event, ordinal)
+        if abs(event.impact) >= CRITICAL_IMPACT:
+            insort(self.critical, (-abs(event.impact), ordinal, self._seq, event))
+        self._seq += 1
+
+    def top_critical(self, k: int = None) -> List[TimelineEvent]:
+        return [entry[3] for entry in self.critical[:k]]
+
+class EventStore:
+    """
+    Timeline as sorted, pre-parsed columns
+    ordinals/type codes/partner ids/impacts are parallel arrays, so date-range
+    lookups are a bisect on `ordinals` and replays never touch date strings
+    """
+
+    def __init__(self, events: List[TimelineEvent] = ()):
+        self.events: List[TimelineEvent] = []
+        self.ordinals = array('i')
+        self.type_codes = array('H')
+        self.partner_ids = array('I')
+        self.impacts = array('b')
+        self.types: List[str] = []
+        self.partners: List[str] = []
+        self._type_index: Dict[str, int] = {}
+        self._partner_index: Dict[str, int] = {}
+        # Monthly checkpoints, materialized lazily on the first state query
+        self.checkpoints: List[Checkpoint] = []
+        self._checkpoint_ordinals: List[int] = []
+        self._trends: Optional[TrendIndex] = None  # built on first trend query
+        for event in sorted(events, key=lambda e: e.date):
+            self._push(len(self.events), event)
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def type_code(self, type_: str) -> int:
+        if type_ not in self._type_index:
+            self._type_index[type_] = len(self.types)
+            self.types.append(type_)
+        return self._type_index[type_]
+
+    def partner_id(self, partner: str) -> int:
+        if partner not in self._partner_index:
+            self._partner_index[partner] = len(self.partners)
+            self.partners.append(partner)
+        return self._partner_index[partner]
+
+    def codes(self, *types: str) -> set:
+        """타입 이름들 → 코드 집합 (없는 타입은 무시)"""
+        return {self._type_index[t] for t in types if t in self._type_index}
+
+    def _push(self, i: int, event: TimelineEvent):
+        self.events.insert(i, event)
+        self.ordinals.insert(i, to_ordinal(event.date))
+        self.type_codes.insert(i, self.type_code(event.type))
+        self.partner_ids.insert(i, self.partner_id(event.partner))
+        self.impacts.insert(i, max(-128, min(127, int(event.impact))))
+
+    def append(self, event: TimelineEvent) -> int:
+        """정렬 순서를 유지하며 추가 (같은 날짜는 뒤에) → 위치"""
+        ordinal = to_ordinal(event.date)
+        i = bisect_right(self.ordinals, ordinal)
+        self._push(i, event)
+        if self._trends is not None:
+            self._trends.add(event, ordinal)
+        # Checkpoints after this date no longer match; earlier ones keep their index
+        k = bisect_right(self._checkpoint_ordinals, ordinal)
+        del self.checkpoints[k:], self._checkpoint_ordinals[k:]
+        return i
+
+    @property
+    def trends(self) -> TrendIndex:
+        """per-partner 시계열 인덱스 - 처음 필요할 때 만들고 이후 append마다 갱신"""
+        if self._trends is None:
+            trends = TrendIndex()
+            for event, ordinal in zip(self.events, self.ordinals):
+                trends.add(event, ordinal)
+            self._trends = trends
+        return self._trends
+
+    def upto(self, ordinal: int) -> int:
+        """ordinal 이하인 이벤트 개수 (= events[:n]이 그 날짜까지의 이벤트)"""
+        return bisect_right(self.ordinals, ordinal)
+
+    def span(self, start: int, end: int) -> Tuple[int, int]:
+        """[start, end] ordinal 범위의 (lo, hi) 인덱스"""
+        return bisect_left(self.ordinals, start), bisect_right(self.ordinals, end)
+
+    def between(self, start: str, end: str) -> List[TimelineEvent]:
+        lo, hi = self.span(to_ordinal(start), to_ordinal(end))
+        return self.events[lo:hi]
+
+    # ===== Checkpoints =====
+
+    def _replay(self, partners: Dict[int, list], totals: list, lo: int, hi: int):
+        """events[lo:hi]를 partners {pid: [score, emails, deals]} / totals [emails, deals]에 반영"""
+        email_codes = self.codes('email')
+        deal_codes = self.codes('deal', 'PO')
+        for i in range(lo, hi):
+            p = partners.get(self.partner_ids[i])
+            if p is None:
+                p = partners[self.partner_ids[i]] = [BASE_SCORE, 0, 0]
+            code = self.type_codes[i]
+            if code in email_codes:
+                totals[0] += 1
+                p[1] += 1
+            elif code in deal_codes:
+                totals[1] += 1
+                p[2] += 1
+            p[0] = max(0, min(10, p[0] + self.impacts[i] * IMPACT_WEIGHT))
+
+    def _materialize(self):
+        """마지막 checkpoint부터 타임라인 끝까지 매월 1일 checkpoint 추가"""
+        if not self.events:
+            return
+        if self.checkpoints:
+            last = self.checkpoints[-1]
+            if last.index == len(self.events):
+                return
+            partners = {pid: list(v) for pid, v in last.partners.items()}
+            totals = [last.total_emails, last.total_deals]
+            ordinal, index = _next_month(last.ordinal), last.index
+        else:
+            partners, totals = {}, [0, 0]
+            ordinal, index = _next_month(self.ordinals[0]), 0
+
+        while index < len(self.events):
+            hi = bisect_left(self.ordinals, ordinal, index)
+            self._replay(partners, totals, index, hi)
+            self.checkpoints.append(Checkpoint(ordinal, hi, totals[0], totals[1],
+                                               {pid: tuple(v) for pid, v in partners.items()}))
+            self._checkpoint_ordinals.append(ordinal)
+            ordinal, index = _next_month(ordinal), hi
+
+    def state_at(self, ordinal: int) -> Tuple[int, Dict[int, list], list]:
+        """
+        ordinal 날짜까지의 상태 → (hi, partners, [emails, deals])
+        가장 가까운 이전 checkpoint를 복원하고 그 뒤 이벤트만 재생 (최대 한 달치)
+        """
+        self._materialize()
+        hi = self.upto(ordinal)
+        k = bisect_right(self._checkpoint_ordinals, ordinal + 1) - 1
+        if k >= 0:
+            cp = self.checkpoints[k]
+            partners = {pid: list(v) for pid, v in cp.partners.items()}
+            totals, lo = [cp.total_emails, cp.total_deals], min(cp.index, hi)
+        else:
+            partners, totals, lo = {}, [0, 0], 0
+        self._replay(partners, totals, lo, hi)
+        return hi, partners, totals
+
+    def date_range(self) -> Optional[Tuple[str, str]]:
+        if not self.events:
+            return None
+        return (date.fromordinal(self.ordinals[0]).isoformat(),
+                date.fromordinal(self.ordinals[-1]).isoformat())
+
+# Curated milestones (deals, investments, projects) that no raw source records
+# Based on actual email corpus analysis
+MILESTONES = [
+    # 2020 - Foundation year
+    ("2020-09-26", "partner_added", "Taylor-Wharton", "Initial contact established", 3, {}),
+    ("2020-10-15", "meeting", "Taylor-Wharton", "First partnership discussion", 2, {}),
+    
+    # 2021 - Expansion
+    ("2021-03-12", "partner_added", "Luxfer", "Hydrogen valve inquiry", 4, {}),
+    ("2021-06-20", "deal", "Taylor-Wharton", "First PO confirmed", 5, {"value": "$50K"}),
+    ("2021-09-15", "partner_added", "Hyundai", "FCEV project introduction", 4, {}),
+    
+    # 2022 - Growth
+    ("2022-01-10", "deal", "Luxfer", "Valve supply agreement", 5, {"value": "$120K"}),
+    ("2022-04-22", "meeting", "Hyundai", "Technical review meeting", 3, {}),
+    ("2022-08-30", "partner_added", "ICBiomedical", "Dewar supplier contact", 3, {}),
+    
+    # 2023 - Scale
+    ("2023-02-14", "deal", "Hyundai", "Pilot order confirmed", 4, {"value": "$80K"}),
+    ("2023-06-18", "project", "KoreaCryo", "KGSC audit completed", 3, {}),
+    ("2023-11-05", "deal", "Taylor-Wharton", "Annual contract renewal", 4, {}),
+    
+    # 2024 - Diversification
+    ("2024-01-20", "investment", "PLTR", "Position opened", 0, {"shares": 500}),
+    ("2024-03-15", "partner_added", "Holy Cryogenics", "China market entry", 3, {}),
+    ("2024-07-08", "meeting", "Holy Cryogenics", "Factory visit", 4, {}),
+    ("2024-10-12", "investment", "BTC", "Strategic position", 0, {"btc": 0.5}),
+    
+    # 2025 - Peak activity
+    ("2025-01-15", "deal", "Holy Cryogenics", "$15K quotation", 3, {}),
+    ("2025-03-20", "project", "Digital Chris", "AI clone project started", 5, {}),
+    ("2025-06-30", "milestone", "KoreaCryo", "Record quarter", 5, {}),
+    ("2025-09-10", "email", "Luxfer", "Valve discontinuation notice", -4, {"urgent": True}),
+    ("2025-11-22", "email", "Hyundai", "Solenoid valve inquiry", 3, {}),
+    ("2025-12-15", "meeting", "Holy Cryogenics", "Chengdu factory visit", 4, {}),
+    
+    # 2026 - Current
+    ("2026-01-05", "PO", "Thunderbird", "PO#KCMIE-260108 confirmed", 4, {}),
+    ("2026-01-17", "email", "Luxfer", "Video call scheduled post-trip", 2, {}),
+    ("2026-02-01", "milestone", "Digital Chris", "1803 emails analyzed", 5, {}),
+    ("2026-02-15", "trip", "Myanmar", "Field trip preparation", 0, {"location": "Mae Sot"}),
+]
+
+# Milestone types whose subject is an external partner (not a project, trip or holding)
+PARTNER_EVENT_TYPES = {'partner_added', 'meeting', 'deal', 'PO', 'email'}
+
 class TimeMachine:
-    def __init__(self, data_dir="/Users/roturnjarvis/.openclaw/workspace"):
+    def __init__(self, data_dir="/Users/roturnjarvis/.openclaw/workspace", ingest: bool = False):
         self.data_dir = Path(data_dir)
-        self.timeline_file = self.data_dir / "logs/timeline_events.json"
+        self.timeline_file = self.data_dir / EVENT_LOG
+        self.ingest = ingest
         
         # Historical reconstruction (2020-2026)
         self.events = self._build_timeline()
-        self.partners = self._reconstruct_partner_states()
+        self.base_partners = self._reconstruct_partner_states()
+        self.partners = self.base_partners  # base + active simulation branch
         
-        # Simulation state
+        # Simulation state: named overlay branches, the base timeline is never copied
+        self.branches: Dict[str, SimulationBranch] = {}
         self.simulation_mode = False
-        self.simulated_events = []
-        self.backup_events = []
+        self.active_branch: Optional[str] = None
+    
+    @property
+    def events(self) -> List[TimelineEvent]:
+        """Base timeline, merged with the active simulation branch while one is running"""
+        overlay = self._active_overlay()
+        if overlay is None:
+            return self.store.events
+        return self._merge(zip(self.store.ordinals, self.store.events),
+                           zip(overlay.ordinals, overlay.events))
+    
+    @events.setter
+    def events(self, events: List[TimelineEvent]):
+        # Parse dates once, here, instead of on every query
+        self.store = EventStore(events)
     
     def _build_timeline(self) -> List[TimelineEvent]:
-        """Build historical timeline from 2020-2026"""
+        """Build historical timeline: curated milestones + ingested email/decision/eCount events"""
         events = []
         
-        # Based on actual email corpus analysis
-        timeline_data = [
-            # 2020 - Foundation year
-            ("2020-09-26", "partner_added", "Taylor-Wharton", "Initial contact established", 3, {}),
-            ("2020-10-15", "meeting", "Taylor-Wharton", "First partnership discussion", 2, {}),
-            
-            # 2021 - Expansion
-            ("2021-03-12", "partner_added", "Luxfer", "Hydrogen valve inquiry", 4, {}),
-            ("2021-06-20", "deal", "Taylor-Wharton", "First PO confirmed", 5, {"value": "$50K"}),
-            ("2021-09-15", "partner_added", "Hyundai", "FCEV project introduction", 4, {}),
-            
-            # 2022 - Growth
-            ("2022-01-10", "deal", "Luxfer", "Valve supply agreement", 5, {"value": "$120K"}),
-            ("2022-04-22", "meeting", "Hyundai", "Technical review meeting", 3, {}),
-            ("2022-08-30", "partner_added", "ICBiomedical", "Dewar supplier contact", 3, {}),
-            
-            # 2023 - Scale
-            ("2023-02-14", "deal", "Hyundai", "Pilot order confirmed", 4, {"value": "$80K"}),
-            ("2023-06-18", "project", "KoreaCryo", "KGSC audit completed", 3, {}),
-            ("2023-11-05", "deal", "Taylor-Wharton", "Annual contract renewal", 4, {}),
-            
-            # 2024 - Diversification
-            ("2024-01-20", "investment", "PLTR", "Position opened", 0, {"shares": 500}),
-            ("2024-03-15", "partner_added", "Holy Cryogenics", "China market entry", 3, {}),
-            ("2024-07-08", "meeting", "Holy Cryogenics", "Factory visit", 4, {}),
-            ("2024-10-12", "investment", "BTC", "Strategic position", 0, {"btc": 0.5}),
-            
-            # 2025 - Peak activity
-            ("2025-01-15", "deal", "Holy Cryogenics", "$15K quotation", 3, {}),
-            ("2025-03-20", "project", "Digital Chris", "AI clone project started", 5, {}),
-            ("2025-06-30", "milestone", "KoreaCryo", "Record quarter", 5, {}),
-            ("2025-09-10", "email", "Luxfer", "Valve discontinuation notice", -4, {"urgent": True}),
-            ("2025-11-22", "email", "Hyundai", "Solenoid valve inquiry", 3, {}),
-            ("2025-12-15", "meeting", "Holy Cryogenics", "Chengdu factory visit", 4, {}),
-            
-            # 2026 - Current
-            ("2026-01-05", "PO", "Thunderbird", "PO#KCMIE-260108 confirmed", 4, {}),
-            ("2026-01-17", "email", "Luxfer", "Video call scheduled post-trip", 2, {}),
-            ("2026-02-01", "milestone", "Digital Chris", "1803 emails analyzed", 5, {}),
-            ("2026-02-15", "trip", "Myanmar", "Field trip preparation", 0, {"location": "Mae Sot"}),
-        ]
-        
-        for date, type_, partner, desc, impact, meta in timeline_data:
+        for date, type_, partner, desc, impact, meta in MILESTONES:
             events.append(TimelineEvent(
                 date=date,
                 type=type_,
@@ -101,113 +408,176 @@ class TimeMachine:
                 metadata=meta
             ))
         
+        # Append only what is new since the last run, then read the whole compact log
+        if self.ingest:
+            ingest(self.data_dir, display_names={e.partner for e in events if e.type in PARTNER_EVENT_TYPES})
+        for row in read_log(self.timeline_file):
+            events.append(TimelineEvent(
+                date=row['d'],
+                type=row['t'],
+                partner=row['p'],
+                description=row['s'],
+                impact=row['i'],
+                metadata=dict(row.get('m') or {}, key=row['k'])
+            ))
+        
         return sorted(events, key=lambda x: x.date)
     
     def _reconstruct_partner_states(self) -> Dict[str, PartnerState]:
         """Reconstruct partner states from timeline"""
         partners = {}
+        today = date.today().toordinal()
         
-        for event in self.events:
+        for event, ordinal in zip(self.store.events, self.store.ordinals):
             if event.partner not in partners:
                 partners[event.partner] = PartnerState(
                     name=event.partner,
                     first_contact=event.date
                 )
             
-            p = partners[event.partner]
-            
-            if event.type == 'email':
-                p.email_count += 1
-            elif event.type == 'meeting':
-                p.meeting_count += 1
-            elif event.type in ['deal', 'PO']:
-                p.deal_count += 1
-            
-            # Update relationship score
-            p.relationship_score = max(0, min(10, p.relationship_score + event.impact * 0.3))
-            
-            # Determine status
-            days_since = (datetime.now() - datetime.strptime(event.date, "%Y-%m-%d")).days
-            if days_since > 180:
-                p.status = 'dormant'
-            if p.relationship_score < 3:
-                p.status = 'critical'
-            if p.relationship_score > 7:
-                p.status = 'strong'
+            advance_partner(partners[event.partner], event, today - ordinal)
         
         return partners
     
-    def get_state_at_date(self, date_str: str) -> Dict:
+    def _replay_partner(self, name: str, overlay, until: int = None) -> Optional[PartnerState]:
+        """
+        One partner's state from its base events merged with overlay events
+        (same date: base first, like the old sorted(backup + simulated))
+        """
+        store = self.store
+        today = date.today().toordinal()
+        series = store.trends.series.get(name)
+        base = ((ordinal, 0, e) for ordinal, e in zip(series.ordinals, series.events)) if series else ()
+        extra = ((to_ordinal(e.date), 1, e) for e in overlay if e.partner == name)
+        
+        p = None
+        for ordinal, _, event in heapq.merge(base, extra, key=lambda x: (x[0], x[1])):
+            if until is not None and ordinal > until:
+                break
+            if p is None:
+                p = PartnerState(name=name, first_contact=event.date)
+            advance_partner(p, event, today - ordinal)
+        return p
+    
+    def get_state_at_date(self, date_str: str, branch: str = None) -> Dict:
         """
         Get complete system state at a specific date
         Returns network structure, partner states, key metrics
+        branch: include that simulation branch (default: the active simulation)
         """
-        target_date = datetime.strptime(date_str, "%Y-%m-%d")
-        
-        # Filter events up to target date
-        active_events = [e for e in self.events if datetime.strptime(e.date, "%Y-%m-%d") <= target_date]
+        store = self.store
+        ordinal = to_ordinal(date_str)
+        # Nearest monthly checkpoint + replay of the remaining events
+        hi, partners, (total_emails, total_deals) = store.state_at(ordinal)
+        names = store.partners
         
-        # Rebuild state
         state = {
             'date': date_str,
-            'active_partners': set(),
-            'total_deals': 0,
-            'total_emails': 0,
-            'network_size': 0,
-            'key_events': []
+            'active_partners': [names[pid] for pid in partners],
+            'total_deals': total_deals,
+            'total_emails': total_emails,
+            'network_size': len(partners),
+            'key_events': [asdict(e) for e in store.events[max(0, hi - 5):hi]],  # Last 5 events
+            'partner_scores': {names[pid]: {'score': score, 'emails': emails, 'deals': deals}
+                               for pid, (score, emails, deals) in partners.items()}
         }
         
-        partner_scores = defaultdict(lambda: {'score': 5.0, 'emails': 0, 'deals': 0})
+        branch = branch or (self.active_branch if self.simulation_mode else None)
+        if branch:
+            self._apply_overlay(state, self.branches[branch], ordinal, store.events[max(0, hi - 5):hi])
         
-        for event in active_events:
-            state['active_partners'].add(event.partner)
-            
+        return state
+    
+    def _apply_overlay(self, state: Dict, branch: SimulationBranch, ordinal: int, tail: List[TimelineEvent]):
+        """Overlay events up to ordinal: adjust totals, recompute only the partners they touch"""
+        overlay = branch.events[:bisect_right(branch.ordinals, ordinal)]
+        if not overlay:
+            return
+        
+        for event in overlay:
             if event.type == 'email':
                 state['total_emails'] += 1
-                partner_scores[event.partner]['emails'] += 1
             elif event.type in ['deal', 'PO']:
                 state['total_deals'] += 1
-                partner_scores[event.partner]['deals'] += 1
-            
-            partner_scores[event.partner]['score'] = max(0, min(10, 
-                partner_scores[event.partner]['score'] + event.impact * 0.3))
         
-        state['active_partners'] = list(state['active_partners'])
+        for name in dict.fromkeys(e.partner for e in overlay):
+            p = self._replay_partner(name, overlay, until=ordinal)
+            if name not in state['partner_scores']:
+                state['active_partners'].append(name)
+            state['partner_scores'][name] = {'score': p.relationship_score, 'emails': p.email_count,
+                                             'deals': p.deal_count}
         state['network_size'] = len(state['active_partners'])
-        state['key_events'] = [asdict(e) for e in active_events[-5:]]  # Last 5 events
-        state['partner_scores'] = dict(partner_scores)
         
-        return state
+        merged = heapq.merge(((e.date, 0, e) for e in tail), ((e.date, 1, e) for e in overlay[-5:]),
+                             key=lambda x: (x[0], x[1]))
+        state['key_events'] = [asdict(e) for _, _, e in list(merged)[-5:]]
+    
+    def _active_overlay(self) -> Optional[SimulationBranch]:
+        """The active simulation branch, if it holds any event"""
+        if not self.simulation_mode:
+            return None
+        branch = self.branches.get(self.active_branch)
+        return branch if branch is not None and branch.events else None
+    
+    @staticmethod
+    def _merge(base, overlay) -> List[TimelineEvent]:
+        """(ordinal, event) streams → one list, same date: base first"""
+        merged = heapq.merge(((o, 0, e) for o, e in base), ((o, 1, e) for o, e in overlay),
+                             key=lambda x: (x[0], x[1]))
+        return [e for _, _, e in merged]
     
     def get_timeline_range(self) -> tuple:
-        """Get min and max dates in timeline"""
-        dates = [datetime.strptime(e.date, "%Y-%m-%d") for e in self.events]
-        return (min(dates).strftime("%Y-%m-%d"), max(dates).strftime("%Y-%m-%d"))
+        """Get min and max dates in timeline (including the active simulation)"""
+        span = self.store.date_range()
+        overlay = self._active_overlay()
+        if overlay is None:
+            return span
+        first = date.fromordinal(overlay.ordinals[0]).isoformat()
+        last = date.fromordinal(overlay.ordinals[-1]).isoformat()
+        return (min(span[0], first), max(span[1], last)) if span else (first, last)
     
     def get_events_between(self, start: str, end: str) -> List[TimelineEvent]:
-        """Get events between two dates"""
-        start_dt = datetime.strptime(start, "%Y-%m-%d")
-        end_dt = datetime.strptime(end, "%Y-%m-%d")
-        
-        return [e for e in self.events 
-                if start_dt <= datetime.strptime(e.date, "%Y-%m-%d") <= end_dt]
+        """Get events between two dates (bisect on the date column, plus the active simulation)"""
+        overlay = self._active_overlay()
+        if overlay is None:
+            return self.store.between(start, end)
+        start, end = to_ordinal(start), to_ordinal(end)
+        lo, hi = self.store.span(start, end)
+        olo, ohi = bisect_left(overlay.ordinals, start), bisect_right(overlay.ordinals, end)
+        return self._merge(zip(self.store.ordinals[lo:hi], self.store.events[lo:hi]),
+                           zip(overlay.ordinals[olo:ohi], overlay.events[olo:ohi]))
     
-    # ========== SIMULATION MODE ==========
+    # ========== SIMULATION BRANCHES ==========
     
-    def start_simulation(self):
-        """Enter simulation mode - changes don't affect real timeline"""
-        self.simulation_mode = True
-        self.backup_events = self.events.copy()
-        self.simulated_events = []
-        print("[TIMEMACHINE] Simulation mode ACTIVATED")
-        print("[TIMEMACHINE] Changes are temporary until commit()")
+    def create_branch(self, name: str, parent: str = None) -> SimulationBranch:
+        """New what-if branch on the base timeline (or forked from another branch)"""
+        if name in self.branches:
+            raise ValueError(f"Branch already exists: {name}")
+        if parent is None:
+            branch = SimulationBranch(name=name)
+        else:
+            src = self.branches[parent]
+            # Overlay lists are shared until either branch writes; touched partner states are copied
+            branch = SimulationBranch(name=name, events=src.events, ordinals=src.ordinals,
+                                      partners={k: replace(v) for k, v in src.partners.items()},
+                                      latest=dict(src.latest), deals_added=src.deals_added,
+                                      owned=False)
+            src.owned = False
+        self.branches[name] = branch
+        return branch
     
-    def add_simulated_event(self, date: str, type_: str, partner: str, 
-                           description: str, impact: int = 0, metadata: Dict = None):
-        """Add a hypothetical event in simulation mode"""
-        if not self.simulation_mode:
-            raise RuntimeError("Must call start_simulation() first")
-        
+    def drop_branch(self, name: str):
+        """Discard a branch (the base timeline was never touched)"""
+        self.branches.pop(name, None)
+        if self.active_branch == name:
+            self.active_branch = None
+            self.simulation_mode = False
+            self.partners = self.base_partners
+    
+    def add_branch_event(self, name: str, date: str, type_: str, partner: str,
+                         description: str, impact: int = 0, metadata: Dict = None) -> TimelineEvent:
+        """Add a hypothetical event to one branch; only that partner's state is updated"""
+        branch = self.branches[name]
         event = TimelineEvent(
             date=date,
             type=type_,
@@ -217,15 +587,116 @@ class TimeMachine:
             metadata=metadata or {}
         )
         
-        self.simulated_events.append(event)
-        self.events = sorted(self.backup_events + self.simulated_events, 
-                            key=lambda x: x.date)
+        # Lists still shared with a fork are copied once, then events are inserted in place
+        if not branch.owned:
+            branch.events, branch.ordinals = list(branch.events), list(branch.ordinals)
+            branch.owned = True
+        ordinal = to_ordinal(event.date)
+        i = bisect_right(branch.ordinals, ordinal)
+        branch.events.insert(i, event)
+        branch.ordinals.insert(i, ordinal)
+        if type_ in ['deal', 'PO']:
+            branch.deals_added += 1
         
-        # Rebuild partner states
-        self.partners = self._reconstruct_partner_states()
+        # Latest event for this partner: advance its state, otherwise replay just this partner
+        series = self.store.trends.series.get(partner)
+        last_base = series.ordinals[-1] if series else None
+        later_overlay = branch.latest.get(partner, ordinal) > ordinal
+        branch.latest[partner] = max(branch.latest.get(partner, ordinal), ordinal)
+        if not later_overlay and (last_base is None or ordinal >= last_base):
+            p = branch.partners.get(partner)
+            if p is None:
+                base = self.base_partners.get(partner)
+                p = replace(base) if base else PartnerState(name=partner, first_contact=date)
+                branch.partners[partner] = p
+            advance_partner(p, event, datetime.now().toordinal() - ordinal)
+        else:
+            branch.partners[partner] = self._replay_partner(partner, branch.events)
         
+        if self.simulation_mode and self.active_branch == name:
+            self.partners = dict(self.base_partners, **branch.partners)
         return event
     
+    def get_branch_impact(self, name: str) -> Dict:
+        """Impact of one branch, computed from the partners its overlay touches only"""
+        branch = self.branches[name]
+        impact = {
+            'new_partners': [],
+            'improved_relationships': [],
+            'declined_relationships': [],
+            'total_deals_added': branch.deals_added
+        }
+        
+        for partner, state in branch.partners.items():
+            orig = self.base_partners.get(partner)
+            if orig is None:
+                impact['new_partners'].append(partner)
+            elif state.relationship_score > orig.relationship_score:
+                impact['improved_relationships'].append({
+                    'partner': partner,
+                    'change': round(state.relationship_score - orig.relationship_score, 1)
+                })
+            elif state.relationship_score < orig.relationship_score:
+                impact['declined_relationships'].append({
+                    'partner': partner,
+                    'change': round(state.relationship_score - orig.relationship_score, 1)
+                })
+        
+        return impact
+    
+    def compare_branches(self, names: List[str] = None) -> Dict[str, Dict]:
+        """Side-by-side impact of several branches (default: all)"""
+        comparison = {}
+        for name in names or list(self.branches):
+            impact = self.get_branch_impact(name)
+            branch = self.branches[name]
+            impact['events'] = len(branch.events)
+            impact['score_delta'] = round(sum(
+                state.relationship_score - (self.base_partners[p].relationship_score
+                                            if p in self.base_partners else BASE_SCORE)
+                for p, state in branch.partners.items()), 1)
+            comparison[name] = impact
+        return comparison
+    
+    def commit_branch(self, name: str):
+        """Merge a branch into the base timeline (checkpoints before its first event stay valid)"""
+        branch = self.branches.pop(name)
+        for event in branch.events:
+            self.store.append(event)
+        self.base_partners = dict(self.base_partners, **branch.partners)
+        if self.active_branch == name:
+            self.active_branch = None
+            self.simulation_mode = False
+        self.partners = self.base_partners
+    
+    # ========== SIMULATION MODE ==========
+    # Single-scenario API on top of a branch named DEFAULT_BRANCH
+    
+    @property
+    def simulated_events(self) -> List[TimelineEvent]:
+        if not self.simulation_mode:
+            return []
+        return list(self.branches[self.active_branch].events)
+    
+    def start_simulation(self, name: str = None):
+        """Enter simulation mode - changes don't affect real timeline"""
+        name = name or DEFAULT_BRANCH
+        self.branches.pop(name, None)
+        self.create_branch(name)
+        self.active_branch = name
+        self.simulation_mode = True
+        print("[TIMEMACHINE] Simulation mode ACTIVATED")
+        print("[TIMEMACHINE] Changes are temporary until commit()")
+    
+    def add_simulated_event(self, date: str, type_: str, partner: str, 
+                           description: str, impact: int = 0, metadata: Dict = None):
+        """Add a hypothetical event in simulation mode"""
+        if not self.simulation_mode:
+            raise RuntimeError("Must call start_simulation() first")
+        
+        return self.add_branch_event(self.active_branch, date, type_, partner,
+                                     description, impact, metadata)
+    
     def simulate_add_partner(self, partner_name: str, date: str, impact: int = 3):
         """Quick helper to simulate adding a new partner"""
         return self.add_simulated_event(
@@ -252,48 +723,14 @@ class TimeMachine:
         if not self.simulation_mode:
             return {}
         
-        current_state = self._reconstruct_partner_states()
-        
-        # Temporarily restore backup to compare
-        self.events = self.backup_events
-        original_state = self._reconstruct_partner_states()
-        self.events = self.backup_events + self.simulated_events
-        
-        impact = {
-            'new_partners': [],
-            'improved_relationships': [],
-            'declined_relationships': [],
-            'total_deals_added': 0
-        }
-        
-        for name, state in current_state.items():
-            if name not in original_state:
-                impact['new_partners'].append(name)
-            else:
-                orig = original_state[name]
-                if state.relationship_score > orig.relationship_score:
-                    impact['improved_relationships'].append({
-                        'partner': name,
-                        'change': round(state.relationship_score - orig.relationship_score, 1)
-                    })
-                elif state.relationship_score < orig.relationship_score:
-                    impact['declined_relationships'].append({
-                        'partner': name,
-                        'change': round(state.relationship_score - orig.relationship_score, 1)
-                    })
-        
-        impact['total_deals_added'] = len([e for e in self.simulated_events if e.type in ['deal', 'PO']])
-        
-        return impact
+        return self.get_branch_impact(self.active_branch)
     
     def commit_simulation(self):
         """Commit simulation changes to permanent timeline"""
         if not self.simulation_mode:
             return
         
-        self.backup_events = self.events.copy()
-        self.simulated_events = []
-        self.simulation_mode = False
+        self.commit_branch(self.active_branch)
         print("[TIMEMACHINE] Simulation COMMITTED to timeline")
     
     def rollback_simulation(self):
@@ -301,59 +738,196 @@ class TimeMachine:
         if not self.simulation_mode:
             return
         
-        self.events = self.backup_events
-        self.simulated_events = []
-        self.simulation_mode = False
-        self.partners = self._reconstruct_partner_states()
+        self.drop_branch(self.active_branch)
         print("[TIMEMACHINE] Simulation ROLLED BACK")
     
     # ========== ANALYSIS FEATURES ==========
     
     def get_relationship_trends(self, partner: str) -> List[Dict]:
-        """Get relationship score trend over time for a partner"""
-        partner_events = [e for e in self.events if e.partner == partner]
+        """Get relationship score trend over time for a partner (including the active simulation)"""
+        series = self.store.trends.series.get(partner)
+        overlay = self._active_overlay()
+        if overlay is not None and partner in overlay.latest:
+            # Scores are path dependent: rescore this partner's merged series
+            base = zip(series.ordinals, series.events) if series else ()
+            extra = ((o, e) for o, e in zip(overlay.ordinals, overlay.events) if e.partner == partner)
+            trend, score = [], BASE_SCORE
+            for event in self._merge(base, extra):
+                score = max(0, min(10, score + event.impact * IMPACT_WEIGHT))
+                trend.append({'date': event.date, 'score': round(score, 2), 'event': event.description})
+            return trend
+        if series is None:
+            return []
+        
+        return [{'date': event.date, 'score': round(score, 2), 'event': event.description}
+                for event, score in zip(series.events, series.scores)]
+    
+    def get_all_trends(self, windows: Tuple[int, ...] = TREND_WINDOWS) -> Dict[str, Dict]:
+        """
+        Trend columns for every partner in one pass (dashboard charts)
+        {partner: {'dates', 'scores', 'rolling': {window: {'count', 'impact', 'delta'}}}}
+        """
+        trends = {}
+        for partner, series in self.store.trends.series.items():
+            trends[partner] = {
+                'dates': [e.date for e in series.events],
+                'scores': [round(score, 2) for score in series.scores],
+                'rolling': {w: {'count': series.rolling[w]['count'].tolist(),
+                                'impact': series.rolling[w]['impact'].tolist(),
+                                'delta': [round(d, 2) for d in series.rolling[w]['delta']]}
+                            for w in windows}
+            }
+        return trends
+    
+    def find_critical_moments(self, limit: int = None) -> List[Dict]:
+        """Find moments with high impact (both positive and negative, including the active simulation)"""
+        events = self.store.trends.top_critical(limit)
+        overlay = self._active_overlay()
+        if overlay is not None:
+            # Same order as the index: |impact| desc, then timeline order (base first on a date)
+            extra = sorted((-abs(e.impact), o, 1, i, e)
+                           for i, (o, e) in enumerate(zip(overlay.ordinals, overlay.events))
+                           if abs(e.impact) >= CRITICAL_IMPACT)
+            base = ((key, o, 0, seq, e) for key, o, seq, e in self.store.trends.critical)
+            events = [entry[4] for entry in heapq.merge(base, extra, key=lambda x: x[:4])][:limit]
+        return [{
+            'date': event.date,
+            'partner': event.partner,
+            'impact': event.impact,
+            'description': event.description,
+            'type': 'positive' if event.impact > 0 else 'negative'
+        } for event in events]
+    
+    def _projection_model(self, history_days: int):
+        """
+        Per-partner event model from the last history_days before the newest (non-future) event
+        (or the whole timeline when it is shorter: rates are per month actually covered)
+        Overlay events of the active simulation branch count like base events
+        Returns (names, monthly rate[P, G], impact mean[P, G], impact std[P, G], anchor ordinal)
+        """
+        store = self.store
+        today = date.today().toordinal()
+        hi = store.upto(today)
+        overlay = self._active_overlay()
+        extra_hi = bisect_right(overlay.ordinals, today) if overlay is not None else 0
+        if not hi and not extra_hi:
+            return [], None, None, None, None
+        anchor = max(store.ordinals[hi - 1] if hi else 0,
+                     overlay.ordinals[extra_hi - 1] if extra_hi else 0)
+        lo = bisect_right(store.ordinals, anchor - history_days)
+        first = min(store.ordinals[0] if hi else anchor, overlay.ordinals[0] if extra_hi else anchor)
         
-        trends = []
-        score = 5.0
+        G = len(PROJECTION_GROUPS)
+        pids = np.array(store.partner_ids[lo:hi], dtype=np.int64)
+        types = np.array(store.type_codes[lo:hi], dtype=np.int64)
+        impacts = np.array(store.impacts[lo:hi], dtype=np.float64)
+        groups = np.full(len(types), G - 1)
+        groups[np.isin(types, list(store.codes('email')))] = 0
+        groups[np.isin(types, list(store.codes('deal', 'PO')))] = 1
         
-        for event in sorted(partner_events, key=lambda x: x.date):
-            score = max(0, min(10, score + event.impact * 0.3))
-            trends.append({
-                'date': event.date,
-                'score': round(score, 2),
-                'event': event.description
-            })
+        names = list(store.partners)
+        if extra_hi:
+            # Overlay partners the base has never seen get ids after the store's
+            ids = {name: pid for pid, name in enumerate(names)}
+            window = overlay.events[bisect_right(overlay.ordinals, anchor - history_days):extra_hi]
+            for event in window:
+                if event.partner not in ids:
+                    ids[event.partner] = len(names)
+                    names.append(event.partner)
+            pids = np.concatenate([pids, np.array([ids[e.partner] for e in window], dtype=np.int64)])
+            impacts = np.concatenate([impacts, np.array([max(-128, min(127, int(e.impact))) for e in window],
+                                                        dtype=np.float64)])
+            groups = np.concatenate([groups, np.array(
+                [0 if e.type == 'email' else 1 if e.type in ('deal', 'PO') else G - 1 for e in window],
+                dtype=groups.dtype)])
         
-        return trends
+        uniq, idx = np.unique(pids, return_inverse=True)
+        P = len(uniq)
+        cell = idx * G + groups
+        count = np.bincount(cell, minlength=P * G).reshape(P, G).astype(np.float64)
+        total = np.bincount(cell, weights=impacts, minlength=P * G).reshape(P, G)
+        squares = np.bincount(cell, weights=impacts ** 2, minlength=P * G).reshape(P, G)
+        
+        seen = np.maximum(count, 1)
+        mean = total / seen
+        std = np.sqrt(np.maximum(squares / seen - mean ** 2, 0))
+        covered = max(1, min(history_days, anchor - first + 1))
+        rate = count / (covered / MONTH_DAYS)
+        
+        return [names[pid] for pid in uniq], rate, mean, std, anchor
     
-    def find_critical_moments(self) -> List[Dict]:
-        """Find moments with high impact (both positive and negative)"""
-        critical = []
-        
-        for event in self.events:
-            if abs(event.impact) >= 4:
-                critical.append({
-                    'date': event.date,
-                    'partner': event.partner,
-                    'impact': event.impact,
-                    'description': event.description,
-                    'type': 'positive' if event.impact > 0 else 'negative'
-                })
+    def simulate_futures(self, months: int = 12, runs: int = 2000, history_days: int = 365,
+                         percentiles: Tuple[int, ...] = (10, 50, 90), seed: int = None) -> Dict:
+        """
+        Monte Carlo projection: `runs` stochastic trajectories for every partner at once
+        Monthly event counts ~ Poisson(historical rate), impact sums ~ Normal(n * mean, n * var),
+        scores clamped to 0-10 each month. Rates and starting scores both include
+        the active simulation branch (its events up to today).
+        """
+        if months < 1 or runs < 1:
+            raise ValueError(f"months and runs must be >= 1 (got months={months}, runs={runs})")
+        names, rate, mean, std, anchor = self._projection_model(history_days)
+        start = date.fromordinal(anchor) if anchor else date.today()
+        labels = []
+        for m in range(1, months + 1):
+            y, mo = divmod(start.month - 1 + m, 12)
+            labels.append(f"{start.year + y}-{mo + 1:02d}")
+        
+        result = {
+            'start': start.isoformat(),
+            'months': labels,
+            'runs': runs,
+            'percentiles': list(percentiles),
+            'partners': {},
+            'network': {}
+        }
+        if not names:
+            return result
+        
+        rng = np.random.default_rng(seed)
+        P = len(names)
+        score = np.array([self.partners[n].relationship_score if n in self.partners else BASE_SCORE
+                          for n in names], dtype=np.float64)
+        score = np.broadcast_to(score, (runs, P)).copy()
+        deals = np.zeros((runs, P))
+        
+        scores = np.empty((months, runs, P))
+        deal_paths = np.empty((months, runs, P))
+        for m in range(months):
+            n = rng.poisson(rate, size=(runs, P, len(PROJECTION_GROUPS)))
+            noise = rng.standard_normal(n.shape)
+            delta = (n * mean + np.sqrt(n) * std * noise).sum(axis=2) * IMPACT_WEIGHT
+            np.clip(score + delta, 0, 10, out=score)
+            deals += n[:, :, 1]
+            scores[m] = score
+            deal_paths[m] = deals
         
-        return sorted(critical, key=lambda x: abs(x['impact']), reverse=True)
+        q = list(percentiles)
+        score_bands = np.round(np.percentile(scores, q, axis=1), 2)     # [Q, months, P]
+        deal_bands = np.percentile(deal_paths, q, axis=1)
+        network_bands = np.percentile(deal_paths.sum(axis=2), q, axis=1)  # [Q, months]
+        p_critical = (scores[-1] < 3).mean(axis=0)
+        
+        for j, name in enumerate(names):
+            result['partners'][name] = {
+                'score': {f"p{p}": score_bands[k, :, j].tolist() for k, p in enumerate(q)},
+                'deals': {f"p{p}": deal_bands[k, :, j].tolist() for k, p in enumerate(q)},
+                'monthly_rate': {g: round(float(rate[j, k]), 2) for k, g in enumerate(PROJECTION_GROUPS)},
+                'p_critical': round(float(p_critical[j]), 3)
+            }
+        result['network']['deals'] = {f"p{p}": network_bands[k].tolist() for k, p in enumerate(q)}
+        return result
     
     def generate_future_projection(self, months: int = 6) -> List[Dict]:
         """Generate projected future events based on patterns"""
+        if months < 1:
+            raise ValueError(f"months must be >= 1 (got {months})")
         projections = []
         
         # Get active partners
-        recent_cutoff = datetime.now() - timedelta(days=90)
-        recent_partners = set()
-        
-        for event in reversed(self.events):
-            event_date = datetime.strptime(event.date, "%Y-%m-%d")
-            if event_date >= recent_cutoff:
-                recent_partners.add(event.partner)
+        recent_cutoff = (date.today() - timedelta(days=90)).toordinal()
+        lo = bisect_left(self.store.ordinals, recent_cutoff)
+        recent_partners = {self.store.partners[pid] for pid in self.store.partner_ids[lo:]}
         
         # Project follow-ups needed
         for partner in recent_partners:
@@ -367,6 +941,30 @@ class TimeMachine:
                     'confidence': 0.8
                 })
         
+        # Monte Carlo: partners likely to turn critical, expected deal flow
+        futures = self.simulate_futures(months=months, seed=0)
+        horizon = f"{futures['months'][-1]}-01"
+        for partner, f in futures['partners'].items():
+            if f['p_critical'] >= 0.5:
+                projections.append({
+                    'projected_date': horizon,
+                    'type': 'at_risk',
+                    'partner': partner,
+                    'description': f"{partner} likely critical within {months} months "
+                                   f"(median score {f['score']['p50'][-1]})",
+                    'confidence': f['p_critical']
+                })
+            expected = f['deals']['p50'][-1]
+            if expected >= 1:
+                projections.append({
+                    'projected_date': horizon,
+                    'type': 'deal_forecast',
+                    'partner': partner,
+                    'description': f"{partner}: ~{expected:.0f} deals in {months} months "
+                                   f"({f['deals']['p10'][-1]:.0f}-{f['deals']['p90'][-1]:.0f})",
+                    'confidence': 0.8
+                })
+        
         return projections
 
 
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Timeline Ingest - TimeMachine 이벤트 수집기
+logs/all_pst_emails.json + memory/decisions/*.md + eCount 리포트 → TimelineEvent 로그
+
+- 발신자 도메인 / 제목 / 거래처명으로 파트너 해석 (CHRIS-ONTOLOGY.yml partners 기준)
+- 이벤트마다 dedup 키 (email:<thread id>, sales:<date>:<no>:<prod>, ...) → 같은 이벤트는 한 번만
+- logs/timeline_events.jsonl에 새 이벤트만 append (압축된 한 줄 JSON)
+- 소스별 (mtime, size) 기록: 바뀐 소스만 다시 읽음
+- 이메일 아카이브는 대략 최신순(날짜 역전 있음): 지난번 앞부분에서 본 스레드가
+  EMAIL_KNOWN_RUN개 연속으로 나오면 스트리밍을 멈춤 (더 깊이 끼어든 새 스레드는 --full)
+- eCount 샘플 리포트(API 실패 시 ecount-api.py가 쓰는 예시 데이터)는 건너뜀
+- TimeMachine은 로그를 읽기만 함: 수집은 이 스크립트(크론)나 TimeMachine(ingest=True)로 명시적으로
+
+Usage:
+    python timeline_ingest.py [data_dir] [--full]
+"""
+
+import os
+import re
+import sys
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+EVENT_LOG = "logs/timeline_events.jsonl"
+STATE_FILE = "logs/timeline_ingest_state.json"
+EMAIL_ARCHIVE = "logs/all_pst_emails.json"
+DECISIONS_DIR = "memory/decisions"
+ECOUNT_REPORTS = ("kc_weekly_report_*.json", "scripts/kc_weekly_report_*.json")
+# ecount-api.py fixtures: reports written before the 'sample' flag are recognised by these names
+SAMPLE_PARTNER_RE = re.compile(r'^Sample (Customer|Vendor) [A-Z]$')
+
+# Email archive: ids of the first EMAIL_HEAD threads are remembered; a run of
+# EMAIL_KNOWN_RUN of them in a row means the rest of the archive was seen before
+EMAIL_HEAD = 300
+EMAIL_KNOWN_RUN = 50
+
+# decisions/*.md 카테고리 → (type, impact)
+CATEGORY_RULES = {
+    'PO/주문': ('PO', 2),
+    '견적/제안': ('email', 1),
+    '문의': ('email', 1),
+    '긴급': ('email', -2),
+}
+
+# Subject patterns for emails without a category (first match wins)
+SUBJECT_RULES = [
+    (re.compile(r'\bP\.?O\b|purchase order|발주', re.I), 'PO', 2),
+    (re.compile(r'urgent|긴급|단종|discontinu|claim|complain|불량|leak', re.I), 'email', -2),
+    (re.compile(r'meeting|minutes|미팅|회의|webinar', re.I), 'meeting', 1),
+    (re.compile(r'quot|견적|inquiry|문의|order', re.I), 'email', 1),
+]
+
+# Domain labels that never identify an organisation
+GENERIC_LABELS = {'com', 'co', 'net', 'org', 'kr', 'cn', 'jp', 'my', 'uk', 'us', 'de', 'io',
+                  'www', 'mail', 'email', 'emails', 'e-mails', 'newsletter', 'reply', 'info'}
+
+def _key(text) -> str:
+    """'Taylor-Wharton' / 'taylorwharton' / 'hyundai_kia' → 비교용 키"""
+    return re.sub(r'[^0-9a-z가-힣]', '', str(text).lower())
+
+# ===== Partner resolution =====
+
+class PartnerResolver:
+    """
+    발신자/텍스트 → 파트너 표시 이름
+    표시 이름은 기존 타임라인 이름(display_names)과 맞추고, 없으면 온톨로지 name
+    자기 회사 이름(own_names)과 비슷한 별칭은 만들지 않음 - 제목에 회사명이 있다고 파트너가 아님
+    """
+
+    def __init__(self, partners: Dict[str, Dict] = None, display_names=(), own_domains=(), own_names=()):
+        self.own_domains = {d.lower() for d in own_domains}
+        own = {_key(n) for n in own_names if _key(n)}
+        self.aliases: Dict[str, str] = {}  # alias key → display name
+        display = {_key(n): n for n in display_names
+                   if _key(n) and not any(self._similar(_key(n), o) for o in own)}
+
+        for key, partner in (partners or {}).items():
+            partner = partner or {}
+            names = [key, partner.get('name', '')] + list(partner.get('aliases') or [])
+            domains = re.split(r'[\s/,]+', str(partner.get('domain') or '')) + list(partner.get('domains') or [])
+            names += [d.split('.')[0] for d in domains if d]
+            keys = [_key(n) for n in names if _key(n)]
+            name = next((display[d] for d in display for k in keys if self._similar(d, k)),
+                        partner.get('name') or key)
+            for k in keys:
+                if not any(self._similar(k, o) for o in own):
+                    self.aliases.setdefault(k, name)
+        for k, name in display.items():
+            self.aliases.setdefault(k, name)
+
+    @staticmethod
+    def _similar(a: str, b: str) -> bool:
+        return a == b or (min(len(a), len(b)) >= 4 and (a.startswith(b) or b.startswith(a)))
+
+    @classmethod
+    def from_ontology(cls, data_dir: Path, display_names=()) -> 'PartnerResolver':
+        """CHRIS-ONTOLOGY.yml의 partners + 내부 도메인/회사 이름 (없으면 display_names만)"""
+        data = {}
+        ontology_file = Path(data_dir) / "CHRIS-ONTOLOGY.yml"
+        if ontology_file.exists():
+            try:
+                sys.path.insert(0, str(Path(__file__).parent))
+                from ontology_model import load_model
+                data = load_model(ontology_file).data
+            except ImportError:
+                print("⚠️  PyYAML not installed - partners resolved from timeline names only")
+        own = set()
+        for match in re.finditer(r'@([\w.-]+)', json.dumps([data.get('sources'), data.get('companies')],
+                                                           ensure_ascii=False, default=str)):
+            own.add(match.group(1))
+        own_names = set()
+        for key, company in (data.get('companies') or {}).items():
+            company = company or {}
+            own_names.update([key, company.get('name', '')] + list(company.get('aliases') or []))
+        return cls(data.get('partners') or {}, display_names, own, own_names)
+
+    def by_sender(self, sender: str) -> Optional[str]:
+        """'Name <a@mail.luxfer.com>' → 'Luxfer' (내부 도메인은 None)"""
+        match = re.search(r'@([\w.-]+)', sender or '')
+        if not match or match.group(1).lower() in self.own_domains:
+            return None
+        for label in match.group(1).lower().split('.'):
+            if label in GENERIC_LABELS:
+                continue
+            k = _key(label)
+            if k in self.aliases:
+                return self.aliases[k]
+            for alias, name in self.aliases.items():
+                if self._similar(alias, k):
+                    return name
+        return None
+
+    def by_text(self, text: str) -> Optional[str]:
+        """제목/거래처명에 파트너 이름이 들어 있으면 그 파트너"""
+        k = _key(text or '')
+        for alias, name in self.aliases.items():
+            if len(alias) >= 5 and alias in k:
+                return name
+        return None
+
+    def by_name(self, name: str) -> Optional[str]:
+        """거래처명 → 파트너 (별칭과 정확히 같거나 이름 안에 별칭이 있으면)"""
+        return self.aliases.get(_key(name or '')) or self.by_text(name)
+
+    def resolve(self, sender: str = '', text: str = '') -> Optional[str]:
+        return self.by_sender(sender) or self.by_text(text)
+
+# ===== Sources =====
+
+def iter_json_array(path: Path, chunk_size: int = 1 << 16) -> Iterator[Dict]:
+    """큰 JSON 배열을 원소 단위로 스트리밍 (전체를 메모리에 올리지 않음)"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buf, pos, started = '', 0, False
+        while True:
+            chunk = f.read(chunk_size)
+            buf = buf[pos:] + chunk
+            pos = 0
+            while True:
+                while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                    pos += 1
+                if not started and pos < len(buf):
+                    if buf[pos] != '[':
+                        raise ValueError(f"{path} is not a JSON array")
+                    started, pos = True, pos + 1
+                    continue
+                if pos < len(buf) and buf[pos] == ']':
+                    return
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                except ValueError:
+                    break  # incomplete element: read more
+                yield item
+                pos = end
+            if not chunk:
+                return
+
+def _classify(subject: str, category: str = None) -> Tuple[str, int]:
+    if category in CATEGORY_RULES:
+        return CATEGORY_RULES[category]
+    for pattern, type_, impact in SUBJECT_RULES:
+        if pattern.search(subject or ''):
+            return type_, impact
+    return 'email', 0
+
+def _email_event(key, date, sender, subject, resolver, category=None, extra=None) -> Optional[Dict]:
+    partner = resolver.resolve(sender, subject)
+    if not partner or not date:
+        return None
+    type_, impact = _classify(subject, category)
+    meta = {'from': sender}
+    meta.update(extra or {})
+    return {'k': key, 'd': date[:10], 't': type_, 'p': partner,
+            's': (subject or '(no subject)')[:120], 'i': impact, 'm': meta}
+
+DECISION_FIELD_RE = re.compile(r'^- \*\*(.+?)\*\*:\s*(.*)$', re.M)
+
+def parse_decision(text: str) -> Dict[str, str]:
+    """decisions/*.md 메타데이터 블록 → {날짜, 발신자, 제목, 중요도, 카테고리, 스레드ID, ...}"""
+    return {m.group(1): m.group(2).strip() for m in DECISION_FIELD_RE.finditer(text)}
+
+def ingest_decisions(root: Path, state: Dict, resolver: PartnerResolver) -> Iterator[Dict]:
+    """새로 생겼거나 바뀐 decision 파일만 파싱"""
+    seen = state.setdefault('decisions', {})
+    directory = root / DECISIONS_DIR
+    if not directory.is_dir():
+        return
+    for path in sorted(directory.glob('*.md')):
+        mtime = path.stat().st_mtime_ns
+        if seen.get(path.name) == mtime:
+            continue
+        meta = parse_decision(path.read_text(encoding='utf-8', errors='replace'))
+        seen[path.name] = mtime
+        thread = meta.get('스레드ID') or path.stem
+        event = _email_event(f"email:{thread}", meta.get('날짜', path.name[:10]), meta.get('발신자', ''),
+                             meta.get('제목', ''), resolver, meta.get('카테고리'),
+                             {'importance': meta.get('중요도'), 'note': f"{DECISIONS_DIR}/{path.name}"})
+        if event:
+            yield event
+
+def ingest_emails(root: Path, state: Dict, resolver: PartnerResolver, full: bool = False) -> Iterator[Dict]:
+    """
+    이메일 아카이브 스트리밍
+    아카이브는 대략 최신순이지만 날짜가 자주 역전되므로 날짜 대신 스레드 id로 판단:
+    지난번 앞부분(EMAIL_HEAD)에 있던 스레드가 EMAIL_KNOWN_RUN개 연속이면 그 아래는 이미 본 구간
+    """
+    path = root / EMAIL_ARCHIVE
+    if not path.exists():
+        return
+    st = path.stat()
+    cursor = state.setdefault('emails', {})
+    if not full and cursor.get('mtime') == st.st_mtime_ns and cursor.get('size') == st.st_size:
+        return
+
+    previous = set() if full else set(cursor.get('head') or ())
+    scanned, run = [], 0
+    for record in iter_json_array(path):
+        thread = str(record.get('id'))
+        if thread in previous:
+            run += 1
+            if run >= EMAIL_KNOWN_RUN:
+                break  # the rest was streamed by an earlier run
+        else:
+            run = 0
+        if len(scanned) < EMAIL_HEAD:
+            scanned.append(thread)
+        event = _email_event(f"email:{thread}", str(record.get('date', '')), record.get('from', ''),
+                             record.get('subject', ''), resolver,
+                             extra={'messages': record.get('messageCount', 1)})
+        if event:
+            yield event
+    # New head: this scan's prefix, topped up with the old head it stopped in front of
+    head = list(dict.fromkeys(scanned + list(cursor.get('head') or ())))[:EMAIL_HEAD]
+    cursor.clear()
+    cursor.update(mtime=st.st_mtime_ns, size=st.st_size, head=head)
+
+def is_sample_report(report: Dict) -> bool:
+    """ecount-api.py가 API 대신 예시 데이터로 쓴 리포트"""
+    if report.get('sample'):
+        return True
+    rows = [row for rows in (report.get('details') or {}).values() for row in rows or ()]
+    return any(SAMPLE_PARTNER_RE.match(str(row.get('cust_des', ''))) for row in rows)
+
+def ingest_ecount(root: Path, state: Dict, resolver: PartnerResolver) -> Iterator[Dict]:
+    """
+    kc_weekly_report_*.json의 매출(deal) / 매입(PO) 기록 - 품목 행마다 한 이벤트
+    샘플 리포트와 파트너로 해석되지 않는 거래처는 건너뜀
+    """
+    seen = state.setdefault('ecount', {})
+    for pattern in ECOUNT_REPORTS:
+        for path in sorted(root.glob(pattern)):
+            st = path.stat()
+            rel = str(path.relative_to(root))
+            if seen.get(rel) == [st.st_mtime_ns, st.st_size]:
+                continue
+            try:
+                report = json.loads(path.read_text(encoding='utf-8'))
+            except ValueError:
+                continue
+            seen[rel] = [st.st_mtime_ns, st.st_size]
+            if is_sample_report(report):
+                continue
+            details = report.get('details') or {}
+            for kind, type_, impact in (('sales', 'deal', 3), ('purchases', 'PO', 2)):
+                lines: Dict[str, int] = {}  # one slip has a row per product line
+                for row in details.get(kind) or []:
+                    io_date = str(row.get('io_date', ''))
+                    if len(io_date) != 8:
+                        continue
+                    partner = resolver.by_name(row.get('cust_des')) or resolver.by_name(row.get('cust_cd'))
+                    if not partner:
+                        continue
+                    line = f"{io_date}:{row.get('io_no')}:{row.get('prod_cd', '')}"
+                    lines[line] = lines.get(line, -1) + 1
+                    yield {
+                        'k': f"{kind}:{line}" + (f":{lines[line]}" if lines[line] else ''),
+                        'd': f"{io_date[:4]}-{io_date[4:6]}-{io_date[6:]}",
+                        't': type_,
+                        'p': partner,
+                        's': f"{row.get('prod_des', '')} ({row.get('qty', 0):g})",
+                        'i': impact,
+                        'm': {'total_amt': row.get('total_amt'), 'source': rel},
+                    }
+
+# ===== Event log =====
+
+def read_log(path: Path) -> Iterator[Dict]:
+    """로그 행 스트리밍 - 중단된 append가 남긴 깨진 줄은 건너뜀"""
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(row, dict) and 'k' in row:
+                    yield row
+    except OSError:
+        return
+
+def _load_state(path: Path) -> Dict:
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+def _save_state(path: Path, state: Dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(state, ensure_ascii=False), encoding='utf-8')
+    os.replace(tmp, path)
+
+def ingest(data_dir, display_names=(), verbose=False, full=False) -> int:
+    """
+    모든 소스에서 새 이벤트만 로그에 append
+    full: 이메일 아카이브를 끝까지 다시 스트리밍 (dedup은 그대로)
+    Returns the number of events appended.
+    """
+    root = Path(data_dir)
+    log_path, state_path = root / EVENT_LOG, root / STATE_FILE
+    if not any((root / p).exists() for p in (EMAIL_ARCHIVE, DECISIONS_DIR)) and not log_path.exists():
+        return 0
+
+    state = _load_state(state_path)
+    known = {row['k'] for row in read_log(log_path)}
+    resolver = PartnerResolver.from_ontology(root, display_names)
+
+    new_events = []
+    # Decisions first: they carry a category, so they win the dedup against the raw email
+    sources = (ingest_decisions(root, state, resolver),
+               ingest_emails(root, state, resolver, full),
+               ingest_ecount(root, state, resolver))
+    for source in sources:
+        for event in source:
+            if event['k'] in known:
+                continue
+            known.add(event['k'])
+            new_events.append(event)
+
+    if new_events:
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(log_path, 'a+', encoding='utf-8') as f:
+            # A torn last line (interrupted append) must not swallow the first new event
+            if f.tell():
+                f.seek(f.tell() - 1)
+                if f.read(1) != '\n':
+                    f.write('\n')
+            for event in sorted(new_events, key=lambda e: e['d']):
+                f.write(json.dumps(event, ensure_ascii=False, separators=(',', ':')) + '\n')
+    _save_state(state_path, state)
+
+    if verbose:
+        print(f"✅ Timeline ingest: {len(new_events)} new event(s) → {log_path}")
+    return len(new_events)
+
+if __name__ == '__main__':
+    args = [a for a in sys.argv[1:] if a != '--full']
+    data_dir = args[0] if args else Path(__file__).parent.parent
+    started = datetime.now()
+    # Same partner display names TimeMachine uses for its milestones
+    from time_machine import MILESTONES, PARTNER_EVENT_TYPES
+    ingest(data_dir, display_names={m[2] for m in MILESTONES if m[1] in PARTNER_EVENT_TYPES},
+           verbose=True, full='--full' in sys.argv)
+    print(f"   {(datetime.now() - started).total_seconds():.2f}s")
@@ -21,11 +21,19 @@ else
     echo "✅ Created $WORKSPACE/ontology.yml"
 fi
 
+# Copy project source registry (used by ontology-sync.py)
+if [ -f "$WORKSPACE/ontology-sources.yml" ]; then
+    echo "⚠️  ontology-sources.yml already exists. Skipping copy."
+else
+    cp ontology-sources.yml "$WORKSPACE/ontology-sources.yml"
+    echo "✅ Created $WORKSPACE/ontology-sources.yml"
+fi
+
 # Copy scripts to workspace scripts folder
 SCRIPTS_DIR="$WORKSPACE/scripts"
 mkdir -p "$SCRIPTS_DIR"
 
-for script in ontology-status.sh ontology-query.py ontology-sync.py daily-summary.sh; do
+for script in ontology-status.sh ontology-query.py ontology-sync.py ontology_model.py daily-summary.sh; do
     cp "$script" "$SCRIPTS_DIR/"
     chmod +x "$SCRIPTS_DIR/$script"
     echo "✅ Installed $script"
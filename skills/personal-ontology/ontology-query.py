@@ -2,24 +2,19 @@
 """
 CHRIS-ONTOLOGY Query
 yml에서 정보를 빠르게 추출하는 쿼리 도구
+(ontology_model.py의 컴파일된 스냅샷 사용 - YAML 재파싱 없음)
 """
 
-import yaml
 import sys
+import json
+import argparse
 from pathlib import Path
 
-WORKSPACE = Path(__file__).parent.parent
-ONTOLOGY_FILE = WORKSPACE / "CHRIS-ONTOLOGY.yml"
+sys.path.insert(0, str(Path(__file__).parent))
+from ontology_model import load_model, QueryError
 
-def load_ontology():
-    """온톨로지 로드"""
-    with open(ONTOLOGY_FILE, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
-
-def status_summary(ontology):
+def status_summary(model):
     """전체 상태 요약"""
-    projects = ontology['active_projects']
-    
     print("=" * 50)
     print("📊 Chris Status Summary")
     print("=" * 50)
@@ -27,75 +22,97 @@ def status_summary(ontology):
     
     # Business
     print("🏢 Business:")
-    for company_name, company in ontology['companies'].items():
-        for project in company['current_projects']:
-            print(f"  {project['status']} {project['name']}: {project.get('progress', '?')}%")
-            if 'blocker' in project:
-                print(f"     ⚠️  {project['blocker']}")
+    for project in model.projects.values():
+        progress = project.progress if project.progress is not None else '?'
+        print(f"  {project.status} {project.name}: {progress}%")
+        if project.blocker:
+            print(f"     ⚠️  {project.blocker}")
     print()
     
     # Portfolio highlights
     print("💰 Portfolio:")
-    holdings = ontology['portfolio']['holdings']
-    for symbol, data in list(holdings.items())[:5]:  # Top 5
-        print(f"  {symbol}: {data['shares']} shares")
+    for holding in list(model.holdings.values())[:5]:  # Top 5
+        print(f"  {holding.symbol}: {holding.shares} shares")
     print()
     
     # Active projects
-    print(f"📋 Active: {projects['count']} projects")
-    print(f"⚠️  Blockers: {projects['blockers']['count']}")
+    print(f"📋 Active: {len(model.active_projects)} projects")
+    print(f"⚠️  Blockers: {len(model.blockers)}")
     print()
     
     # Priority
     print("🎯 Priority Queue:")
-    for i, task in projects['priority_queue'].items():
+    for i, task in model.priority_queue:
         print(f"  {i}. {task}")
 
-def blockers_only(ontology):
+def blockers_only(model):
     """블로커만 표시"""
     print("⚠️  Current Blockers:")
     print()
     
-    for company_name, company in ontology['companies'].items():
-        for project in company['current_projects']:
-            if 'blocker' in project:
-                print(f"• {project['name']}")
-                print(f"  → {project['blocker']}")
-                print()
+    for project in model.blocked():
+        print(f"• {project.name}")
+        print(f"  → {project.blocker}")
+        print()
 
-def portfolio_summary(ontology):
+def portfolio_summary(model):
     """포트폴리오 요약"""
-    holdings = ontology['portfolio']['holdings']
-    watchlist = ontology['portfolio']['watchlist']
-    
     print("💰 Investment Portfolio")
     print()
     print("Holdings:")
-    for symbol, data in holdings.items():
-        print(f"  {symbol}: {data['shares']} shares - {data.get('conviction', 'N/A')}")
+    for holding in model.holdings.values():
+        print(f"  {holding.symbol}: {holding.shares} shares - {holding.conviction or 'N/A'}")
     print()
     print("Watchlist:")
-    for item in watchlist:
-        print(f"  • {item['symbol']}: {item['reason']}")
+    for item in model.watchlist:
+        print(f"  • {item.get('symbol', item.get('ticker'))}: {item.get('reason', item.get('thesis', ''))}")
+
+def path_query(model, args):
+    """경로/조건 쿼리: query 'companies.*.current_projects[status=blocked]' --select name,status --json"""
+    parser = argparse.ArgumentParser(prog="ontology-query.py query")
+    parser.add_argument("path", help="e.g. partners.*[status~urgent].name, @projects.*[status=blocked]")
+    parser.add_argument("--select", help="Comma-separated fields to project (dotted paths allowed)")
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    opts = parser.parse_args(args)
+    
+    select = [f.strip() for f in opts.select.split(',')] if opts.select else None
+    try:
+        results = model.query(opts.path, select=select, limit=opts.limit)
+    except QueryError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(2)
+    
+    if opts.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2, default=str))
+        return
+    for r in results:
+        value = r['value']
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value, ensure_ascii=False, default=str)
+        print(f"• {r['path']}: {value}")
+    print(f"\n{len(results)} matches")
 
 def main():
     """메인 실행"""
-    ontology = load_ontology()
+    model = load_model()
     
     if len(sys.argv) < 2:
-        status_summary(ontology)
+        status_summary(model)
     else:
         command = sys.argv[1].lower()
         
         if command == 'status':
-            status_summary(ontology)
+            status_summary(model)
         elif command == 'blockers':
-            blockers_only(ontology)
+            blockers_only(model)
         elif command == 'portfolio':
-            portfolio_summary(ontology)
+            portfolio_summary(model)
+        elif command == 'query':
+            path_query(model, sys.argv[2:])
         else:
             print(f"Unknown command: {command}")
-            print("Available: status, blockers, portfolio")
+            print("Available: status, blockers, portfolio, query")
 
 if __name__ == '__main__':
     main()
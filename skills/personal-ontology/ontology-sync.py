@@ -2,126 +2,312 @@
 """
 CHRIS-ONTOLOGY Auto-Sync
 자동으로 README 파일들을 파싱해서 CHRIS-ONTOLOGY.yml 업데이트
+
+- 프로젝트 소스는 ontology-sources.yml 레지스트리에 데이터로 선언
+  (README 경로, 상태 이모지, 진행률 regex, blocker 패턴) - 새 프로젝트에 코드 불필요
+- README는 (mtime, size) → sha1 순으로 확인, 바뀐 것만 다시 파싱 (병렬)
+- 현재 온톨로지와 구조적 diff를 계산해서 실제 변경이 있을 때만 저장
+- 저장은 임시 파일 + rename (원자적), 변경 내용은 이벤트로 기록
 """
 
-import yaml
+import os
 import re
+import sys
+import json
+import copy
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
+import yaml
+
+sys.path.insert(0, str(Path(__file__).parent))
+from ontology_model import ONTOLOGY_FILE, SNAPSHOT_DIR, load_model, store_model, diff_documents
+
 # Paths
 WORKSPACE = Path(__file__).parent.parent
-ONTOLOGY_FILE = WORKSPACE / "CHRIS-ONTOLOGY.yml"
+STATE_FILE = SNAPSHOT_DIR / "sync_state.json"
+EVENTS_FILE = WORKSPACE / "logs" / "ontology_events.jsonl"
+REGISTRY_FILES = [
+    WORKSPACE / "ontology-sources.yml",
+    Path(__file__).parent / "ontology-sources.yml",  # skill 폴더의 기본 레지스트리
+]
+
+# Fields that change on every write and are not themselves a change
+VOLATILE_FIELDS = ('last_updated',)
+
+DEFAULT_STATUS_EMOJI = {
+    '🟢': 'active',
+    '🟡': 'waiting',
+    '🔴': 'blocked',
+    '✅': 'completed',
+    '⏳': 'in-progress'
+}
+
+# ===== Registry =====
 
-def parse_readme_status(readme_path):
+def load_registry():
+    """ontology-sources.yml → [source spec] (defaults 병합)"""
+    for path in REGISTRY_FILES:
+        if path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                registry = yaml.safe_load(f) or {}
+            break
+    else:
+        return []
+
+    defaults = registry.get('defaults') or {}
+    sources = []
+    for entry in registry.get('sources') or []:
+        spec = dict(defaults, **entry)
+        if not spec.get('readme') or not spec.get('id') or not spec.get('company'):
+            print(f"⚠️  Skipping source without company/id/readme: {entry}")
+            continue
+        spec['key'] = f"{spec['company']}/{spec['id']}"
+        # Rule changes invalidate the cached parse for this source
+        spec['digest'] = hashlib.sha1(json.dumps(spec, sort_keys=True, ensure_ascii=False,
+                                                 default=str).encode('utf-8')).hexdigest()
+        sources.append(spec)
+    return sources
+
+def parse_readme_status(content, spec=None):
     """README에서 프로젝트 상태 추출"""
-    if not readme_path.exists():
-        return None
-    
-    content = readme_path.read_text(encoding='utf-8')
-    
-    # Extract status indicators
-    status_map = {
-        '🟢': 'active',
-        '🟡': 'waiting',
-        '🔴': 'blocked',
-        '✅': 'completed',
-        '⏳': 'in-progress'
-    }
-    
+    spec = spec or {}
+    status_map = spec.get('status_emoji') or DEFAULT_STATUS_EMOJI
+
+    # Prefer the declared status line (e.g. "**상태**: 🟡 ..."), then the whole file
+    regions = []
+    if spec.get('status_line'):
+        line_re = re.compile(spec['status_line'])
+        regions.extend(line for line in content.splitlines() if line_re.search(line))
+    regions.append(content)
+
     # Find first status emoji
-    for emoji, status in status_map.items():
-        if emoji in content:
-            return status
-    
+    for region in regions:
+        for emoji, status in status_map.items():
+            if emoji in region:
+                return status
+
     return 'unknown'
 
-def parse_roturn_readme():
-    """로턴 블로그 README 파싱"""
-    readme = WORKSPACE / "business" / "roturn" / "README.md"
-    
-    if not readme.exists():
-        return None
-    
-    content = readme.read_text(encoding='utf-8')
-    
-    # Extract key info
-    project = {
-        'name': '로턴 블로그',
-        'id': 'roturn-blog',
-        'status': parse_readme_status(readme),
-        'progress': 85,  # Can parse from README later
-    }
-    
-    # Find blocker
-    if '사진' in content.lower() and '대기' in content.lower():
-        project['blocker'] = '사진 필요 (Chris 제공)'
-        project['next_action'] = '사진 받으면 첫 글 발행'
-    
-    return project
+def parse_progress(content, spec):
+    """progress_regex → 고정값 또는 checklist(✅ / (✅ + ⏳))"""
+    if spec.get('progress_regex'):
+        match = re.search(spec['progress_regex'], content, re.IGNORECASE)
+        if match:
+            value = match.group(1) if match.groups() else match.group(0)
+            try:
+                return min(100, int(value))
+            except (TypeError, ValueError):
+                print(f"⚠️  progress_regex matched non-numeric {value!r}")
 
-def parse_koreacryo_readme():
-    """KoreaCryo README 파싱"""
-    readme = WORKSPACE / "business" / "koreacryo" / "README.md"
-    
-    if not readme.exists():
-        return None
-    
-    content = readme.read_text(encoding='utf-8')
-    
+    progress = spec.get('progress')
+    if progress == 'checklist':
+        done, todo = content.count('✅'), content.count('⏳')
+        return round(100 * done / (done + todo)) if done + todo else None
+    return progress
+
+def parse_blocker(content, spec):
+    """첫 번째로 맞는 blocker 규칙 → (blocker, next_action)"""
+    lowered = content.lower()
+    for rule in spec.get('blockers') or []:
+        if any(term.lower() not in lowered for term in rule.get('all') or []):
+            continue
+        if rule.get('any') and not any(term.lower() in lowered for term in rule['any']):
+            continue
+        text = rule.get('blocker')
+        if rule.get('regex'):
+            match = re.search(rule['regex'], content)
+            if not match:
+                continue
+            text = text or (match.group(1) if match.groups() else match.group(0)).strip()
+        return text, rule.get('next_action')
+    return None, None
+
+def parse_source(content, spec):
+    """README 내용 + 레지스트리 규칙 → project dict"""
     project = {
-        'name': '웹사이트 리뉴얼',
-        'id': 'kcryo-website',
-        'status': parse_readme_status(readme),
-        'progress': 80,
+        'name': spec.get('name', spec['id']),
+        'id': spec['id'],
+        'status': parse_readme_status(content, spec),
     }
-    
-    if '사진' in content.lower():
-        project['blocker'] = '사진 품질/방향 결정'
-    
+    progress = parse_progress(content, spec)
+    if progress is not None:
+        project['progress'] = progress
+
+    blocker, next_action = parse_blocker(content, spec)
+    if blocker:
+        project['blocker'] = blocker
+    if next_action:
+        project['next_action'] = next_action
+
     return project
 
-def update_ontology():
-    """CHRIS-ONTOLOGY.yml 업데이트"""
-    
-    # Load current ontology
-    with open(ONTOLOGY_FILE, 'r', encoding='utf-8') as f:
-        ontology = yaml.safe_load(f)
-    
-    # Update timestamp
-    ontology['last_updated'] = datetime.now().strftime('%Y-%m-%dT%H:%M:%S+09:00')
-    
-    # Update Roturn project
-    roturn_project = parse_roturn_readme()
-    if roturn_project:
-        for i, proj in enumerate(ontology['companies']['roturn']['current_projects']):
-            if proj['id'] == 'roturn-blog':
-                ontology['companies']['roturn']['current_projects'][i].update(roturn_project)
-    
-    # Update KoreaCryo project
-    kcryo_project = parse_koreacryo_readme()
-    if kcryo_project:
-        for i, proj in enumerate(ontology['companies']['koreacryo']['current_projects']):
-            if proj['id'] == 'kcryo-website':
-                ontology['companies']['koreacryo']['current_projects'][i].update(kcryo_project)
-    
-    # Count active projects and blockers
+# ===== Change detection =====
+
+def load_state():
+    """소스별 (mtime, size, sha1, 규칙 digest, 파싱 결과) 기록"""
+    try:
+        return json.loads(STATE_FILE.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {"sources": {}}
+
+def save_state(state):
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_FILE.with_suffix('.tmp')
+    tmp.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding='utf-8')
+    os.replace(tmp, STATE_FILE)
+
+def check_source(spec, cached):
+    """
+    소스 하나 확인 → (entry, changed); entry None = README 없음
+    mtime/size가 같거나 내용 해시가 같으면(규칙도 같을 때) 이전 결과 그대로
+    """
+    readme = WORKSPACE / spec['readme']
+    try:
+        st = readme.stat()
+    except OSError:
+        return None, cached is not None
+
+    same_rules = cached is not None and cached.get("digest") == spec['digest']
+    if same_rules and cached["mtime"] == st.st_mtime_ns and cached["size"] == st.st_size:
+        return cached, False
+
+    raw = readme.read_bytes()
+    sha1 = hashlib.sha1(raw).hexdigest()
+    entry = {"readme": spec['readme'], "company": spec['company'], "mtime": st.st_mtime_ns,
+             "size": st.st_size, "sha1": sha1, "digest": spec['digest']}
+    if same_rules and cached["sha1"] == sha1:
+        return dict(entry, project=cached["project"]), False
+
+    return dict(entry, project=parse_source(raw.decode('utf-8'), spec)), True
+
+def scan_sources(sources, state, workers=8):
+    """모든 소스를 병렬로 확인 - stat은 전부, 읽기/파싱은 바뀐 README만"""
+    cached = state["sources"]
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(sources)))) as pool:
+        results = list(pool.map(lambda spec: check_source(spec, cached.get(spec['key'])), sources))
+
+    parsed, changed = [], []
+    fresh = {}
+    for spec, (entry, was_changed) in zip(sources, results):
+        if entry is not None:
+            fresh[spec['key']] = entry
+            parsed.append((spec['company'], entry["project"]))
+        if was_changed:
+            changed.append(spec['readme'])
+    state["sources"] = fresh
+    return parsed, sorted(set(changed))
+
+# ===== Apply =====
+
+def apply_project(ontology, company_key, project):
+    """companies.<key>.current_projects에서 같은 id를 갱신 (없으면 추가)"""
+    company = ontology.setdefault('companies', {}).setdefault(company_key, {})
+    projects = company.setdefault('current_projects', [])
+    for proj in projects:
+        if proj.get('id') == project['id']:
+            proj.update(project)
+            # A resolved blocker disappears from the README, so drop it here too
+            for key in ('blocker', 'next_action'):
+                if key not in project:
+                    proj.pop(key, None)
+            return
+    projects.append(dict(project))
+
+def recount(ontology):
+    """Count active projects and blockers"""
     all_projects = []
-    all_projects.extend(ontology['companies']['roturn']['current_projects'])
-    all_projects.extend(ontology['companies']['koreacryo']['current_projects'])
-    
+    for company in (ontology.get('companies') or {}).values():
+        all_projects.extend((company or {}).get('current_projects') or [])
+
     active_count = len([p for p in all_projects if p.get('status') not in ['completed', 'paused']])
     blocked_count = len([p for p in all_projects if 'blocker' in p])
-    
-    ontology['active_projects']['count'] = active_count
-    ontology['active_projects']['blockers']['count'] = blocked_count
-    
-    # Save updated ontology
-    with open(ONTOLOGY_FILE, 'w', encoding='utf-8') as f:
+
+    active = ontology.setdefault('active_projects', {})
+    active['count'] = active_count
+    active.setdefault('blockers', {})['count'] = blocked_count
+    return active_count, blocked_count
+
+def write_ontology(ontology):
+    """임시 파일 + rename: 읽는 쪽은 항상 완전한 파일만 본다"""
+    tmp = ONTOLOGY_FILE.with_suffix('.yml.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
         yaml.dump(ontology, f, allow_unicode=True, default_flow_style=False, sort_keys=False)
-    
+    os.replace(tmp, ONTOLOGY_FILE)
+
+def emit_event(event):
+    """변경 이벤트를 JSONL로 추가 (대시보드/Jarvis가 tail)"""
+    EVENTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(EVENTS_FILE, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+
+def update_ontology(dry_run=False, force=False):
+    """
+    CHRIS-ONTOLOGY.yml 업데이트
+    Returns the change event (None when nothing changed).
+    """
+    state = load_state()
+    sources = load_registry()
+
+    # Only re-parse READMEs whose content (or rules) changed
+    parsed, changed_sources = scan_sources(sources, state)
+
+    if not changed_sources and not force:
+        save_state(state)
+        print("✅ Ontology up to date (no README changes)")
+        return None
+
+    # Current ontology from the compiled snapshot (no YAML parse if unchanged)
+    current = load_model().data
+    ontology = copy.deepcopy(current)
+
+    for company_key, project in parsed:
+        apply_project(ontology, company_key, project)
+    active_count, blocked_count = recount(ontology)
+
+    changes = diff_documents(current, ontology, ignore=VOLATILE_FIELDS)
+    if not changes:
+        save_state(state)
+        print(f"✅ Ontology unchanged ({len(changed_sources)} README(s) re-parsed, same result)")
+        return None
+
+    timestamp = datetime.now().strftime('%Y-%m-%dT%H:%M:%S+09:00')
+    event = {
+        "type": "ontology_changed",
+        "timestamp": timestamp,
+        "file": str(ONTOLOGY_FILE.relative_to(WORKSPACE)),
+        "sources": changed_sources,
+        "changes": changes,
+    }
+
+    if dry_run:
+        print(json.dumps(event, ensure_ascii=False, indent=2, default=str))
+        return event
+
+    # Update timestamp
+    ontology['last_updated'] = timestamp
+
+    # Save updated ontology
+    write_ontology(ontology)
+    store_model(ontology)
+    save_state(state)
+    emit_event(event)
+
     print(f"✅ Ontology updated: {active_count} active, {blocked_count} blockers")
+    shown = ', '.join(changed_sources[:5])
+    more = f" (+{len(changed_sources) - 5} more)" if len(changed_sources) > 5 else ""
+    print(f"   {len(changes)} change(s) from {shown}{more}")
     print(f"   Timestamp: {ontology['last_updated']}")
+    return event
 
 if __name__ == '__main__':
-    update_ontology()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sync CHRIS-ONTOLOGY.yml from project READMEs")
+    parser.add_argument("--dry-run", action="store_true", help="Print the change event without writing")
+    parser.add_argument("--force", action="store_true", help="Re-apply all sources even if no README changed")
+    args = parser.parse_args()
+
+    update_ontology(dry_run=args.dry_run, force=args.force)
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+QMB Benchmark - Synthetic bilingual corpus + per-engine build/query metrics
+Generates Korean/English markdown notes with planted, labeled facts, then
+measures index build time, p50/p95 query latency, peak RSS, index size and
+recall@k for each engine. Each engine runs in its own process so peak RSS
+is per engine. Results are written as JSON for regression tracking.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import List, Dict, Callable, Tuple
+
+SKILL_DIR = Path(__file__).parent
+sys.path.insert(0, str(SKILL_DIR))
+
+ENGINES = ["index", "bm25", "tfidf", "semantic", "hybrid"]
+
+# ----------------------------------------------------------------------
+# Synthetic corpus
+# ----------------------------------------------------------------------
+
+FILLER_EN = (
+    "meeting schedule update review draft weekly report budget plan team call "
+    "follow up shipment invoice order status check note idea summary task "
+    "progress issue owner deadline agenda context result market price"
+).split()
+FILLER_KO = (
+    "회의 일정 검토 초안 주간 보고 예산 계획 팀 통화 후속 조치 출하 송장 "
+    "주문 상태 확인 메모 아이디어 요약 작업 진행 이슈 담당자 마감 안건 결과 시장 가격"
+).split()
+
+# Partners and topics also appear alone as distractors; only planted facts
+# mention both, so ground truth is exactly the planted notes
+PARTNERS = [
+    "Luxfer", "Chart", "Linde", "Cryofab", "Worthington", "Taylor-Wharton",
+    "Roturn", "Praxair", "Messer", "Nikkiso", "현대모비스", "한국가스공사",
+    "대성산업가스", "효성중공업", "SK가스", "롯데케미칼",
+]
+TOPICS = [
+    ("valve leak", "밸브 누설"), ("helium shortage", "헬륨 수급"),
+    ("cylinder recall", "실린더 리콜"), ("price increase", "단가 인상"),
+    ("LNG dispenser", "LNG 충전기"), ("dewar inspection", "듀어 검사"),
+    ("tenbagger screening", "텐배거 스크리닝"), ("certificate renewal", "인증 갱신"),
+    ("export license", "수출 허가"), ("warranty claim", "보증 청구"),
+    ("pressure test", "내압 시험"), ("hydrogen tank", "수소 탱크"),
+]
+DIRS = ["memory", "memory/decisions", "business/koreacryo", "business/roturn", "personal/investment"]
+
+def _sentence(rng: random.Random, words: int = 12) -> str:
+    vocab = FILLER_KO if rng.random() < 0.5 else FILLER_EN
+    return " ".join(rng.choice(vocab) for _ in range(words)) + "."
+
+def generate_corpus(root: Path, n_notes: int = 1000, n_queries: int = 50,
+                    relevant_per_query: int = 3, distractors: float = 0.2,
+                    seed: int = 42) -> List[Dict]:
+    """
+    Write n_notes markdown files under root and return the labeled query set:
+    [{"query": ..., "relevant": [relative paths]}].
+    `distractors` is the share of notes mentioning a partner or topic alone.
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+
+    # Unique (partner, topic, language) per query
+    pairs = [(p, t, lang) for p in PARTNERS for t in TOPICS for lang in (0, 1)]
+    rng.shuffle(pairs)
+    pairs = pairs[:n_queries]
+
+    notes: List[List[str]] = []
+    paths: List[str] = []
+    for i in range(n_notes):
+        day = f"2026-{1 + i % 12:02d}-{1 + i % 28:02d}"
+        directory = DIRS[i % len(DIRS)]
+        paths.append(f"{directory}/{day}_{i:06d}.md")
+        lines = [f"# {day} {rng.choice(FILLER_KO)} {rng.choice(FILLER_EN)}", ""]
+        for section in range(rng.randint(2, 4)):
+            lines += [f"## {rng.choice(FILLER_EN).title()} {section + 1}", ""]
+            lines += [_sentence(rng, rng.randint(8, 20)) for _ in range(rng.randint(1, 3))]
+            lines += [f"- {_sentence(rng, 6)}" for _ in range(rng.randint(0, 3))]
+            lines.append("")
+        roll = rng.random()
+        if roll < distractors / 2:
+            lines.insert(2, f"{rng.choice(PARTNERS)} {_sentence(rng, 6)}")
+        elif roll < distractors:
+            lines.insert(2, f"{rng.choice(rng.choice(TOPICS))} {_sentence(rng, 6)}")
+        notes.append(lines)
+
+    queries = []
+    for partner, (topic_en, topic_ko), lang in pairs:
+        topic = topic_ko if lang else topic_en
+        relevant = rng.sample(range(n_notes), min(relevant_per_query, n_notes))
+        for idx in relevant:
+            fact = (f"{partner} 관련 {topic} 건으로 추가 확인 필요." if lang
+                    else f"{partner} reported a {topic} that needs follow up.")
+            notes[idx].insert(rng.randint(2, len(notes[idx])), fact)
+        queries.append({"query": f"{partner} {topic}", "relevant": sorted(paths[i] for i in relevant)})
+
+    for rel, lines in zip(paths, notes):
+        target = root / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    (root / "queries.json").write_text(json.dumps(queries, ensure_ascii=False, indent=2), encoding="utf-8")
+    return queries
+
+# ----------------------------------------------------------------------
+# Engines: build() -> search(query, k) -> [relative paths]
+# ----------------------------------------------------------------------
+
+def _engine_index(root: Path, index_dir: Path) -> Callable:
+    from index import InvertedIndex
+    idx = InvertedIndex(root, index_dir / "inverted.pkl")
+    idx.refresh()
+    return lambda q, k: [str(p.relative_to(root)) for p in idx.candidate_files(q, limit=k)]
+
+def _engine_bm25(root: Path, index_dir: Path) -> Callable:
+    from bm25 import BM25Index
+    idx = BM25Index(root, index_dir / "bm25.pkl")
+    idx.refresh()
+    return lambda q, k: [r["path"] for r in idx.search(q, top_k=k)]
+
+def _engine_tfidf(root: Path, index_dir: Path) -> Callable:
+    from semantic_lite import QMBPhase2Lite
+    qmb = QMBPhase2Lite(index_dir)
+    qmb.build(root, full=True)
+    return lambda q, k: [str(Path(r["file"]).relative_to(root))
+                         for r in qmb._search_index(q, k, root)]
+
+def _semantic_engine(root: Path, index_dir: Path):
+    import semantic
+    semantic.WORKSPACE = root
+    semantic.INDEX_DIR = index_dir
+    semantic.MANIFEST_FILE = index_dir / "semantic_manifest.json"
+    qmb = semantic.QMBPhase2(backend="numpy")
+    if not qmb.init():
+        raise ImportError("sentence-transformers not available")
+    qmb.index_workspace()
+    return qmb
+
+def _engine_semantic(root: Path, index_dir: Path) -> Callable:
+    qmb = _semantic_engine(root, index_dir)
+    return lambda q, k: [str(Path(r["file"]).relative_to(root)) for r in qmb.search(q, k)]
+
+def _engine_hybrid(root: Path, index_dir: Path) -> Callable:
+    import hybrid
+    import bm25
+    idx = bm25.BM25Index(root, index_dir / "bm25.pkl")
+    idx.refresh()
+    bm25._bm25_cache[str(root)] = idx
+    hybrid.WORKSPACE = root
+    hybrid.AUTO_REFRESH = False
+    try:
+        hybrid._semantic_engine = _semantic_engine(root, index_dir)
+    except ImportError:
+        hybrid._semantic_engine = False
+    return lambda q, k: [r["path"] for r in
+                         hybrid.hybrid_search(q, top_k=k, verbose=False, use_cache=False)]
+
+BUILDERS = {
+    "index": _engine_index,
+    "bm25": _engine_bm25,
+    "tfidf": _engine_tfidf,
+    "semantic": _engine_semantic,
+    "hybrid": _engine_hybrid,
+}
+
+# ----------------------------------------------------------------------
+# Measurement
+# ----------------------------------------------------------------------
+
+def _peak_rss_mb() -> float:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+def _dir_size_mb(path: Path) -> float:
+    total = sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+    return round(total / (1024 * 1024), 3)
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    pos = (len(ordered) - 1) * pct / 100
+    lo, hi = int(pos), min(int(pos) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+def run_engine(engine: str, root: str, index_dir: str, queries: List[Dict],
+               k: int = 10, repeat: int = 3) -> Dict:
+    """Build one engine and run the query workload (meant for a fresh process)"""
+    sys.path.insert(0, str(SKILL_DIR))
+    root, index_dir = Path(root), Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    try:
+        search = BUILDERS[engine](root, index_dir)
+    except ImportError as e:
+        return {"engine": engine, "skipped": str(e)}
+    build_s = time.perf_counter() - start
+
+    latencies, recalls = [], []
+    for q in queries:
+        search(q["query"], k)  # warm-up
+        for _ in range(repeat):
+            t = time.perf_counter()
+            found = search(q["query"], k)
+            latencies.append((time.perf_counter() - t) * 1000)
+        # Engines rank chunks; recall is over the distinct files they hit
+        found = list(dict.fromkeys(found))[:k]
+        relevant = set(q["relevant"])
+        recalls.append(len(relevant & set(found)) / len(relevant))
+
+    return {
+        "engine": engine,
+        "build_s": round(build_s, 3),
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+        f"recall@{k}": round(sum(recalls) / len(recalls), 4) if recalls else 0.0,
+        "index_mb": _dir_size_mb(index_dir),
+        "peak_rss_mb": _peak_rss_mb(),
+        "queries": len(queries),
+    }
+
+def run_benchmark(sizes: List[int], engines: List[str], n_queries: int = 50,
+                  k: int = 10, repeat: int = 3, seed: int = 42,
+                  keep: bool = False) -> Dict:
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "k": k,
+        "seed": seed,
+        "runs": [],
+    }
+
+    for size in sizes:
+        work = Path(tempfile.mkdtemp(prefix=f"qmb-bench-{size}-"))
+        corpus = work / "corpus"
+        print(f"📝 Generating {size} notes...")
+        queries = generate_corpus(corpus, size, n_queries, seed=seed)
+
+        for engine in engines:
+            print(f"  ⏱️ {engine}...", end=" ", flush=True)
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                result = pool.submit(run_engine, engine, str(corpus), str(work / f"idx-{engine}"),
+                                     queries, k, repeat).result()
+            result["notes"] = size
+            report["runs"].append(result)
+            if "skipped" in result:
+                print(f"skipped ({result['skipped']})")
+            else:
+                print(f"build {result['build_s']}s, p50 {result['p50_ms']}ms, "
+                      f"p95 {result['p95_ms']}ms, recall@{k} {result[f'recall@{k}']}")
+
+        if keep:
+            print(f"  📁 Kept {work}")
+        else:
+            shutil.rmtree(work, ignore_errors=True)
+
+    return report
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="QMB benchmark suite")
+    parser.add_argument("--sizes", default="1000", help="Comma-separated note counts (e.g. 1000,10000,100000)")
+    parser.add_argument("--engines", default=",".join(ENGINES), help=f"Subset of {','.join(ENGINES)}")
+    parser.add_argument("--queries", type=int, default=50, help="Labeled queries per corpus")
+    parser.add_argument("-k", type=int, default=10, help="Cutoff for recall@k")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per query")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="Write the JSON report here")
+    parser.add_argument("--keep", action="store_true", help="Keep generated corpora")
+    parser.add_argument("--generate", metavar="DIR", help="Only generate a corpus into DIR")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    if args.generate:
+        queries = generate_corpus(Path(args.generate), sizes[0], args.queries, seed=args.seed)
+        print(f"✅ {sizes[0]} notes, {len(queries)} labeled queries in {args.generate}")
+        sys.exit(0)
+
+    engines = [e for e in args.engines.split(",") if e]
+    unknown = [e for e in engines if e not in BUILDERS]
+    if unknown:
+        parser.error(f"unknown engines: {', '.join(unknown)}")
+
+    report = run_benchmark(sizes, engines, args.queries, args.k, args.repeat, args.seed, args.keep)
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).write_text(output, encoding="utf-8")
+        print(f"✅ Report written to {args.out}")
+    else:
+        print(output)
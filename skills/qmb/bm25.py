@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+QMB BM25 - Okapi BM25 ranking over heading-aware chunks (chunker.py)
+Document frequencies and length norms are precomputed and persisted;
+top-k is selected with a heap across all files.
+"""
+
+import os
+import sys
+import math
+import heapq
+import pickle
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Set, Tuple
+
+from index import INDEX_DIR, tokenize, scan_workspace, diff_scan
+from chunker import CHUNKER_VERSION, iter_chunks, breadcrumb
+
+WORKSPACE = Path.home() / ".openclaw/workspace"
+BM25_FILE = INDEX_DIR / "bm25.pkl"
+BM25_VERSION = 1
+
+class BM25Index:
+    """
+    Chunk-level BM25 index.
+    postings: term → {path: [(chunk_no, tf), ...]}
+    Chunk lengths, document frequencies and per-chunk length norms are kept
+    up to date incrementally as files change.
+    """
+
+    def __init__(self, root: Path = WORKSPACE, index_file: Path = BM25_FILE,
+                 k1: float = 1.5, b: float = 0.75):
+        self.root = Path(root)
+        self.index_file = Path(index_file)
+        self.k1 = k1
+        self.b = b
+        self.files: Dict[str, Tuple[float, int]] = {}
+        self.file_terms: Dict[str, List[str]] = {}
+        self.chunk_lens: Dict[str, List[int]] = {}
+        self.norms: Dict[str, List[float]] = {}
+        self.postings: Dict[str, Dict[str, List[Tuple[int, int]]]] = {}
+        self.df: Counter = Counter()
+        self.total_chunks = 0
+        self.total_len = 0
+        self.generation = 0
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def load(self) -> bool:
+        """Load index from disk. Returns False if missing or stale format."""
+        try:
+            with open(self.index_file, "rb") as f:
+                data = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False
+
+        if (data.get("version") != BM25_VERSION or data.get("root") != str(self.root)
+                or data.get("chunker") != CHUNKER_VERSION):
+            return False
+
+        for key in ("files", "file_terms", "chunk_lens", "norms", "postings",
+                    "df", "total_chunks", "total_len", "generation"):
+            setattr(self, key, data[key])
+        return True
+
+    def save(self):
+        """Write index atomically (temp file + rename)"""
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_file.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump({
+                "version": BM25_VERSION,
+                "chunker": CHUNKER_VERSION,
+                "root": str(self.root),
+                "files": self.files,
+                "file_terms": self.file_terms,
+                "chunk_lens": self.chunk_lens,
+                "norms": self.norms,
+                "postings": self.postings,
+                "df": self.df,
+                "total_chunks": self.total_chunks,
+                "total_len": self.total_len,
+                "generation": self.generation,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.index_file)
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def _remove(self, path: str):
+        for term in self.file_terms.pop(path, ()):
+            plist = self.postings.get(term)
+            if plist is None:
+                continue
+            self.df[term] -= len(plist.pop(path, ()))
+            if not plist:
+                del self.postings[term]
+                del self.df[term]
+
+        lens = self.chunk_lens.pop(path, [])
+        self.total_chunks -= len(lens)
+        self.total_len -= sum(lens)
+        self.norms.pop(path, None)
+        self.files.pop(path, None)
+
+    def _add(self, path: str, sig: Tuple[float, int]):
+        file_postings: Dict[str, List[Tuple[int, int]]] = {}
+        lens = []
+        try:
+            with open(self.root / path, encoding="utf-8") as f:
+                for chunk_no, chunk in enumerate(iter_chunks(f)):
+                    counts = Counter(tokenize(chunk["text"]))
+                    lens.append(sum(counts.values()))
+                    for term, tf in counts.items():
+                        file_postings.setdefault(term, []).append((chunk_no, tf))
+        except (OSError, UnicodeDecodeError):
+            return
+
+        for term, plist in file_postings.items():
+            self.postings.setdefault(term, {})[path] = plist
+            self.df[term] += len(plist)
+
+        self.file_terms[path] = list(file_postings)
+        self.chunk_lens[path] = lens
+        self.total_chunks += len(lens)
+        self.total_len += sum(lens)
+        self.files[path] = sig
+
+    def _compute_norms(self):
+        """Precompute k1 * (1 - b + b * len / avgdl) for every chunk"""
+        avgdl = self.total_len / self.total_chunks if self.total_chunks else 1.0
+        k1, b = self.k1, self.b
+        self.norms = {
+            path: [k1 * (1 - b + b * n / avgdl) for n in lens]
+            for path, lens in self.chunk_lens.items()
+        }
+
+    def refresh(self, verbose: bool = False) -> Tuple[int, int]:
+        """
+        Bring the index up to date with the workspace.
+        Returns (updated, removed) file counts.
+        """
+        current = scan_workspace(self.root)
+        changed, deleted = diff_scan(self.files, current)
+
+        for path in deleted:
+            self._remove(path)
+        for path in changed:
+            if verbose:
+                print(f"  📄 {path}")
+            self._remove(path)
+            self._add(path, current[path])
+
+        if changed or deleted:
+            self._compute_norms()
+            self.generation += 1
+            self.save()
+        return len(changed), len(deleted)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def idf(self, term: str) -> float:
+        """BM25 idf with the usual +1 smoothing (never negative)"""
+        df = self.df.get(term, 0)
+        return math.log(1 + (self.total_chunks - df + 0.5) / (df + 0.5))
+
+    def score(self, query: str, path: str = "",
+              files: Set[str] = None) -> Dict[Tuple[str, int], float]:
+        """
+        BM25 score of every chunk containing at least one query term.
+        `files` (relative paths, e.g. from metadata.py) prunes postings before
+        scoring; when it is the smaller side, only those files are visited.
+        """
+        prefix = path.rstrip("/") + "/" if path else ""
+        k1 = self.k1
+        scores: Dict[Tuple[str, int], float] = {}
+
+        for term, qtf in Counter(tokenize(query)).items():
+            plists = self.postings.get(term)
+            if not plists:
+                continue
+            weight = self.idf(term) * qtf * (k1 + 1)
+            if files is None:
+                entries = plists.items()
+            elif len(files) < len(plists):
+                entries = ((f, plists[f]) for f in files if f in plists)
+            else:
+                entries = ((f, p) for f, p in plists.items() if f in files)
+            for file_path, plist in entries:
+                if prefix and not file_path.startswith(prefix):
+                    continue
+                norms = self.norms[file_path]
+                for chunk_no, tf in plist:
+                    key = (file_path, chunk_no)
+                    scores[key] = scores.get(key, 0.0) + weight * tf / (tf + norms[chunk_no])
+        return scores
+
+    def search(self, query: str, top_k: int = 10, path: str = "",
+               files: Set[str] = None) -> List[Dict]:
+        """Top-k chunks by BM25; only the files returned are read from disk"""
+        scores = self.score(query, path, files)
+        top = heapq.nlargest(top_k, scores.items(), key=lambda kv: kv[1])
+
+        file_chunks: Dict[str, List[Dict]] = {}
+        results = []
+        for (file_path, chunk_no), score in top:
+            if file_path not in file_chunks:
+                try:
+                    with open(self.root / file_path, encoding="utf-8") as f:
+                        file_chunks[file_path] = list(iter_chunks(f))
+                except (OSError, UnicodeDecodeError):
+                    file_chunks[file_path] = []
+            chunks = file_chunks[file_path]
+            if chunk_no >= len(chunks):
+                continue  # file changed since last refresh
+
+            chunk = chunks[chunk_no]
+            results.append({
+                "file": Path(file_path).name,
+                "path": file_path,
+                "chunk": chunk_no,
+                "line": chunk["start_line"],
+                "headings": breadcrumb(chunk),
+                "text": chunk["text"],
+                "score": score,
+            })
+        return results
+
+_bm25_cache: Dict[str, BM25Index] = {}
+
+def load_bm25(root: Path = WORKSPACE, refresh: bool = True) -> BM25Index:
+    """Load (and by default refresh) the BM25 index for root, cached per process"""
+    key = str(root)
+    index = _bm25_cache.get(key)
+    if index is None:
+        index = BM25Index(root)
+        index.load()
+        _bm25_cache[key] = index
+    if refresh:
+        index.refresh()
+    return index
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python3 bm25.py --index")
+        print("       python3 bm25.py 'query' [path]")
+        sys.exit(1)
+
+    if sys.argv[1] == "--index":
+        index = BM25Index()
+        index.load()
+        updated, removed = index.refresh(verbose=True)
+        print(f"✅ {index.total_chunks} chunks in {len(index.files)} files "
+              f"({updated} updated, {removed} removed)")
+    else:
+        path = sys.argv[2] if len(sys.argv) > 2 else ""
+        for r in load_bm25().search(sys.argv[1], path=path):
+            print(f"\n📄 {r['path']} (line {r['line']}, score: {r['score']:.2f})")
+            print(f"   {r['text'][:200].replace(chr(10), ' ')}...")
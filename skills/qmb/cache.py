@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+QMB Query Cache - LRU + TTL result cache keyed by index generation
+Repeat lookups ("Luxfer valve", "텐배거") skip ranking entirely; any index
+change bumps the generation and drops every cached result.
+"""
+
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+
+def normalize_query(query: str) -> str:
+    """NFC, lowercase, collapsed whitespace"""
+    return " ".join(unicodedata.normalize("NFC", query).lower().split())
+
+def normalize_path(path: str) -> str:
+    return path.strip().strip("/")
+
+class QueryCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds"""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _check_generation(self, generation: Hashable):
+        if generation != self.generation:
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+            self.generation = generation
+
+    def get(self, key: Hashable, generation: Hashable = None) -> Any:
+        """Cached value or None. A new generation invalidates everything."""
+        with self._lock:
+            self._check_generation(generation)
+            entry = self._data.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any, generation: Hashable = None):
+        with self._lock:
+            self._check_generation(generation)
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "invalidations": self.invalidations,
+            "generation": self.generation,
+        }
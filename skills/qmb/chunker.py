@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+QMB Chunker - Shared structure-aware markdown chunker
+Splits on headings (keeping the heading breadcrumb as metadata), packs
+paragraphs up to a hard token/character cap, and carries a configurable
+token overlap between chunks of the same section.
+"""
+
+import re
+import sys
+from typing import List, Dict, Iterable, Iterator, Union
+
+# Bump when chunk boundaries change so indexes rebuild their chunks
+CHUNKER_VERSION = 2
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+FENCE_RE = re.compile(r"^\s*(```|~~~)")
+TOKEN_RE = re.compile(r"\S+")
+
+MAX_TOKENS = 128
+MAX_CHARS = 800
+OVERLAP = 16
+MIN_CHARS = 50
+
+def count_tokens(text: str) -> int:
+    """Whitespace tokens: model-agnostic and cheap"""
+    return len(TOKEN_RE.findall(text))
+
+class _Builder:
+    """Accumulates units (paragraphs/lines) for the section being chunked"""
+
+    def __init__(self, max_tokens: int, max_chars: int, overlap: int):
+        self.max_tokens = max_tokens
+        self.max_chars = max_chars
+        self.overlap = overlap
+        self.parts: List[str] = []
+        self.tokens = 0
+        self.chars = 0
+        self.start_line = 0
+        self.end_line = 0
+        self.headings: List[str] = []
+        self.carry_only = False
+
+    def empty(self) -> bool:
+        return not self.parts
+
+    def drop_carry(self):
+        """Overlap never crosses a section boundary or the end of the file"""
+        if self.carry_only:
+            self.parts, self.tokens, self.chars = [], 0, 0
+            self.carry_only = False
+
+    def fits(self, text: str, tokens: int) -> bool:
+        sep = 2 if self.parts else 0
+        return (self.tokens + tokens <= self.max_tokens and
+                self.chars + sep + len(text) <= self.max_chars)
+
+    def add(self, text: str, tokens: int, start_line: int, end_line: int, headings: List[str]):
+        if not self.parts:
+            self.start_line = start_line
+        # Small sections merge into the following one, so the chunk belongs to the latest section
+        self.headings = list(headings)
+        self.chars += (2 if self.parts else 0) + len(text)
+        self.parts.append(text)
+        self.tokens += tokens
+        self.end_line = end_line
+        self.carry_only = False
+
+    def flush(self, carry: bool = False) -> Dict:
+        """Emit the chunk; with carry=True the next chunk starts with the overlap tail"""
+        chunk = {
+            "text": "\n\n".join(self.parts),
+            "headings": self.headings,
+            "start_line": self.start_line,
+            "end_line": self.end_line,
+        }
+        tail = TOKEN_RE.findall(chunk["text"])[-self.overlap:] if carry and self.overlap else []
+        self.parts, self.tokens, self.chars = [], 0, 0
+        if tail:
+            text = " ".join(tail)
+            self.add(text, len(tail), self.end_line, self.end_line, self.headings)
+            self.carry_only = True
+        return chunk
+
+def _split_long(text: str, max_tokens: int, max_chars: int, overlap: int) -> List[str]:
+    """Hard-split one oversized line into overlapping token windows"""
+    words = TOKEN_RE.findall(text)
+    pieces = []
+    step = max(1, max_tokens - overlap)
+    # Character overlap for single words longer than max_chars, proportional to the token overlap
+    char_step = max(1, max_chars - max_chars * overlap // max_tokens)
+    i = 0
+    while i < len(words):
+        window = words[i:i + max_tokens]
+        piece = " ".join(window)
+        # Long unbroken words (e.g. Korean runs, URLs) can still blow max_chars
+        while len(piece) > max_chars and len(window) > 1:
+            window = window[:len(window) // 2]
+            piece = " ".join(window)
+        if len(piece) > max_chars:
+            start = 0
+            while True:
+                pieces.append(piece[start:start + max_chars])
+                if start + max_chars >= len(piece):
+                    break
+                start += char_step
+        else:
+            pieces.append(piece)
+        if i + len(window) >= len(words):
+            break
+        i += max(1, min(step, len(window) - overlap))
+    return pieces
+
+def iter_chunks(source: Union[str, Iterable[str]], max_tokens: int = MAX_TOKENS,
+                max_chars: int = MAX_CHARS, overlap: int = OVERLAP,
+                min_chars: int = MIN_CHARS) -> Iterator[Dict]:
+    """
+    Stream chunks from markdown text or an iterable of lines (e.g. an open file).
+    Yields {"text", "headings", "start_line", "end_line"}; lines are 1-based.
+    Heading lines travel with the first paragraph of their section, so a heading
+    never ends a chunk. Sections shorter than min_chars are merged into the
+    following section instead of becoming tiny chunks of their own.
+    """
+    lines = source.splitlines() if isinstance(source, str) else source
+    overlap = min(overlap, max_tokens // 2)
+    builder = _Builder(max_tokens, max_chars, overlap)
+    stack: List[tuple] = []  # (level, title)
+    pending: List[str] = []  # heading lines waiting for their first paragraph
+    pending_start = 0
+    para: List[str] = []
+    para_start = 0
+    in_fence = False
+
+    def emit_unit(text: str, start: int, end: int, lead: str = ""):
+        headings = [title for _, title in stack]
+        full = f"{lead}\n\n{text}" if lead and text else lead or text
+        unit_start = pending_start if lead else start
+        tokens = count_tokens(full)
+        if builder.fits(full, tokens):
+            builder.add(full, tokens, unit_start, end, headings)
+            return
+        if not builder.empty():
+            # The overlap tail of the previous section must not lead the new one
+            yield builder.flush(carry=not lead)
+            if builder.fits(full, tokens):
+                builder.add(full, tokens, unit_start, end, headings)
+                return
+        # Still too big: break the paragraph into lines (the heading stays on the first),
+        # then token windows
+        sub_lines = [(offset, line) for offset, line in enumerate(text.split("\n")) if line.strip()]
+        if len(sub_lines) > 1:
+            for n, (offset, line) in enumerate(sub_lines):
+                yield from emit_unit(line, start + offset, start + offset, lead if n == 0 else "")
+            return
+        builder.drop_carry()  # the windows overlap each other already
+        for piece in _split_long(full, max_tokens, max_chars, overlap):
+            if not builder.empty() and not builder.fits(piece, count_tokens(piece)):
+                yield builder.flush(carry=False)
+            builder.add(piece, count_tokens(piece), unit_start, end, headings)
+
+    def end_paragraph(lineno: int):
+        nonlocal para, pending
+        if para:
+            lead = "\n\n".join(pending)
+            pending = []
+            yield from emit_unit("\n".join(para), para_start, lineno - 1, lead)
+            para = []
+
+    lineno = 0
+    for lineno, line in enumerate(lines, 1):
+        line = line.rstrip("\n")
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        # "# comment" inside a code block is not a heading
+        heading = None if in_fence else HEADING_RE.match(line)
+
+        if heading:
+            yield from end_paragraph(lineno)
+            builder.drop_carry()
+            # New section: close the chunk unless it is too small to stand alone
+            if not builder.empty() and builder.chars >= min_chars:
+                yield builder.flush()
+            level = len(heading.group(1))
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            stack.append((level, heading.group(2)))
+            if not pending:
+                pending_start = lineno
+            pending.append(line)
+        elif not line.strip():
+            yield from end_paragraph(lineno)
+        else:
+            if not para:
+                para_start = lineno
+            para.append(line)
+
+    yield from end_paragraph(lineno + 1)
+    if pending:
+        # Trailing headings without a body
+        builder.drop_carry()
+        yield from emit_unit("", lineno, lineno, "\n\n".join(pending))
+    builder.drop_carry()
+    if not builder.empty():
+        yield builder.flush()
+
+def chunk_text(text: str, **kwargs) -> List[str]:
+    """Chunk texts only (see iter_chunks for options)"""
+    return [c["text"] for c in iter_chunks(text, **kwargs)]
+
+def breadcrumb(chunk: Dict) -> str:
+    """'Heading > Sub heading' for display and metadata"""
+    return " > ".join(chunk["headings"])
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python3 chunker.py FILE.md [max_tokens] [overlap]")
+        sys.exit(1)
+
+    kwargs = {}
+    if len(sys.argv) > 2:
+        kwargs["max_tokens"] = int(sys.argv[2])
+    if len(sys.argv) > 3:
+        kwargs["overlap"] = int(sys.argv[3])
+
+    with open(sys.argv[1], encoding="utf-8") as f:
+        for i, chunk in enumerate(iter_chunks(f, **kwargs)):
+            print(f"--- [{i}] lines {chunk['start_line']}-{chunk['end_line']} "
+                  f"({count_tokens(chunk['text'])} tokens) {breadcrumb(chunk)}")
+            print(chunk["text"][:200])
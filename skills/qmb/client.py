@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+QMB Client - Thin client for the serve.py daemon
+Falls back to an in-process search when the daemon is not running.
+"""
+
+import os
+import sys
+import json
+import urllib.request
+import urllib.error
+from pathlib import Path
+from typing import List, Dict
+from urllib.parse import urlencode
+
+SKILL_DIR = Path(__file__).parent
+HOST = "127.0.0.1"
+PORT = int(os.environ.get("QMB_PORT", "8765"))
+
+def _url(endpoint: str, params: Dict = None) -> str:
+    query = f"?{urlencode(params)}" if params else ""
+    return f"http://{HOST}:{PORT}{endpoint}{query}"
+
+def health(timeout: float = 0.5) -> Dict:
+    """Daemon status, or None if it is not reachable"""
+    try:
+        with urllib.request.urlopen(_url("/health"), timeout=timeout) as resp:
+            return json.loads(resp.read())
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
+
+def search(query: str, path: str = "", top_k: int = 10, engine: str = "hybrid",
+           fusion: str = "rrf", timeout: float = 5.0, fallback: bool = True,
+           filters: Dict = None, recent: bool = False) -> List[Dict]:
+    """
+    Search through the daemon.
+    `filters` takes since / until / category / partner (see metadata.py).
+    With fallback=True a missing daemon means a (slower) local search instead.
+    """
+    filters = {k: v for k, v in (filters or {}).items() if v}
+    params = {"q": query, "path": path, "k": top_k, "engine": engine, "fusion": fusion}
+    params.update({("in" if k == "category" else k): v for k, v in filters.items()})
+    if recent:
+        params["recent"] = 1
+    try:
+        with urllib.request.urlopen(_url("/search", params), timeout=timeout) as resp:
+            return json.loads(resp.read())["results"]
+    except urllib.error.HTTPError:
+        raise  # the daemon is up and rejected/failed the query: not a reason to search locally
+    except (urllib.error.URLError, OSError) as e:
+        if not fallback:
+            raise ConnectionError(f"QMB daemon not reachable: {e}")
+
+    sys.path.insert(0, str(SKILL_DIR))
+    if engine not in ("hybrid", "bm25", "tfidf"):
+        raise ValueError(f"Unknown engine: {engine}")
+    if engine == "tfidf":
+        from bm25 import load_bm25
+        from hybrid import AUTO_REFRESH, WORKSPACE, select_files, scope_files, sort_by_recency
+        from semantic_lite import QMBPhase2Lite
+        allowed = select_files(filters, path)
+        if allowed is None and path:
+            allowed = scope_files(path, load_bm25(WORKSPACE, refresh=AUTO_REFRESH))
+        files = [WORKSPACE / p for p in allowed] if allowed is not None else None
+        results = QMBPhase2Lite().search_index(query, top_k, WORKSPACE, files)
+        for r in results:
+            r["path"] = str(Path(r["file"]).relative_to(WORKSPACE))
+        return sort_by_recency(results) if recent else results
+    if engine == "bm25":
+        from bm25 import load_bm25
+        from hybrid import select_files, sort_by_recency
+        results = load_bm25().search(query, top_k=top_k, path=path,
+                                     files=select_files(filters, path))
+        return sort_by_recency(results) if recent else results
+    from hybrid import hybrid_search
+    return hybrid_search(query, path, top_k, fusion, verbose=False,
+                         filters=filters, recent=recent)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="QMB daemon client")
+    parser.add_argument("query", nargs="?", help="Search query")
+    parser.add_argument("--path", default="", help="Subdirectory to search")
+    parser.add_argument("-n", "--top-k", type=int, default=10, help="Number of results")
+    parser.add_argument("--engine", choices=["hybrid", "bm25", "tfidf"], default="hybrid")
+    parser.add_argument("--since", help="Only files dated on/after YYYY-MM-DD")
+    parser.add_argument("--until", help="Only files dated on/before YYYY-MM-DD")
+    parser.add_argument("--in", dest="category", help="Directory category (business, decisions, ...)")
+    parser.add_argument("--partner", help="Only files mentioning a partner (e.g. luxfer)")
+    parser.add_argument("--recent", action="store_true", help="Order results newest first")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--health", action="store_true", help="Show daemon status")
+    args = parser.parse_args()
+
+    if args.health or not args.query:
+        status = health()
+        print(json.dumps(status, ensure_ascii=False, indent=2) if status else "❌ Daemon not running")
+        sys.exit(0 if status else 1)
+
+    filters = {"since": args.since, "until": args.until,
+               "category": args.category, "partner": args.partner}
+    results = search(args.query, args.path, args.top_k, args.engine,
+                     filters=filters, recent=args.recent)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        for r in results:
+            print(f"\n📄 {r.get('path', r.get('file'))} (score: {r['score']:.4f})")
+            print(f"   {r['text'][:200].replace(chr(10), ' ')}...")
@@ -4,128 +4,321 @@ QMB Hybrid Search - Combines Phase 1 (keyword/BM25) + Phase 2 (semantic/vector)
 Best of both worlds: exact matching + meaning matching
 """
 
-import os
 import sys
-import subprocess
+import time
+import threading
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Set, Optional
 
 WORKSPACE = Path.home() / ".openclaw/workspace"
 SKILL_DIR = Path(__file__).parent
+sys.path.insert(0, str(SKILL_DIR))
 
-def keyword_search(query: str, path: str = "", context: int = 2) -> List[Dict]:
-    """Phase 1: Fast keyword search using ripgrep"""
-    
-    search_path = WORKSPACE / path if path else WORKSPACE
-    
-    cmd = [
-        "rg", "-i", "--type", "md",
-        "-C", str(context),
-        "-n", "--color", "never",
-        query, str(search_path)
-    ]
+from cache import QueryCache, normalize_query, normalize_path
+
+# Re-stat the workspace before each keyword query. The serve.py daemon turns
+# this off and refreshes from its own file watcher instead.
+AUTO_REFRESH = True
+
+def keyword_chunks(query: str, path: str = "", top_k: int = 20,
+                   files: Set[str] = None, index=None) -> List[Dict]:
+    """Phase 1 (ranked): BM25 over the same chunks the semantic index uses (`index`: already refreshed)"""
     
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-        
-        results = []
-        current_file = None
-        current_matches = []
-        
-        for line in result.stdout.split('\n'):
-            if line.startswith(search_path.parent.name) or line.startswith('/'):
-                # New file
-                if current_file and current_matches:
-                    results.append({
-                        "file": current_file,
-                        "matches": current_matches,
-                        "type": "keyword"
-                    })
-                current_file = line.strip()
-                current_matches = []
-            elif ':' in line:
-                current_matches.append(line)
-        
-        # Add last file
-        if current_file and current_matches:
-            results.append({
-                "file": current_file,
-                "matches": current_matches,
-                "type": "keyword"
-            })
-            
+        if index is None:
+            sys.path.insert(0, str(SKILL_DIR))
+            from bm25 import load_bm25
+            index = load_bm25(WORKSPACE, refresh=AUTO_REFRESH)
+        results = index.search(query, top_k=top_k, path=path, files=files)
+        for r in results:
+            r["file"] = str(WORKSPACE / r["path"])
         return results
         
     except Exception as e:
         print(f"Keyword search error: {e}")
         return []
 
-def semantic_search(query: str, top_k: int = 5) -> List[Dict]:
-    """Phase 2: Semantic/meaning-based search"""
+_result_cache = QueryCache(maxsize=256, ttl=600)
+
+def _mtime(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return 0
+
+def index_generation(bm25=None) -> tuple:
+    """
+    Generation of every index behind a cached result: the BM25 generation plus
+    the semantic manifest and TF-IDF meta mtimes (both rewritten on each reindex)
+    Never refreshes: pass the BM25 index the caller already refreshed.
+    """
+    sys.path.insert(0, str(SKILL_DIR))
+    from bm25 import load_bm25
+    from index import INDEX_DIR
+    
+    semantic = _semantic_engine.manifest_file if _semantic_engine else None
+    return (
+        (bm25 or load_bm25(WORKSPACE, refresh=False)).generation,
+        _mtime(semantic) if semantic else 0,
+        _mtime(INDEX_DIR / "tfidf_meta.json"),
+    )
+
+def cache_stats() -> Dict:
+    """Hit/miss counters of the hybrid result cache"""
+    return _result_cache.stats()
+
+_semantic_engine = None
+_semantic_lock = threading.Lock()
+
+def get_semantic_engine():
+    """
+    Module-level QMBPhase2 (model + store) shared by every call.
+    Returns None when dependencies are missing; the failure is cached too.
+    """
+    global _semantic_engine
+    with _semantic_lock:
+        if _semantic_engine is None:
+            sys.path.insert(0, str(SKILL_DIR))
+            from semantic import QMBPhase2
+            
+            qmb = QMBPhase2()
+            _semantic_engine = qmb if qmb.init() else False
+        return _semantic_engine or None
+
+def semantic_search(query: str, top_k: int = 5, files: Set[str] = None) -> List[Dict]:
+    """Phase 2: Semantic/meaning-based search (`files`: relative paths to search)"""
     
     try:
-        # Import and run semantic search
-        sys.path.insert(0, str(SKILL_DIR))
-        from semantic import QMBPhase2
-        
-        qmb = QMBPhase2()
-        if not qmb.init():
+        qmb = get_semantic_engine()
+        if qmb is None:
             return []
-            
+        
+        if files is not None:
+            return qmb.search(query, top_k, [str(WORKSPACE / p) for p in files])
         return qmb.search(query, top_k)
         
     except Exception as e:
         print(f"Semantic search not available: {e}")
         return []
 
-def hybrid_search(query: str, path: str = "", top_k: int = 10) -> None:
+FILTER_KEYS = ("since", "until", "category", "partner")
+
+def select_files(filters: Dict = None, path: str = "") -> Optional[Set[str]]:
+    """
+    Metadata pre-filter (see metadata.py): relative paths passing every filter,
+    or None when no filter is set and engines should search everything.
+    """
+    filters = {k: v for k, v in (filters or {}).items() if k in FILTER_KEYS and v}
+    if not filters:
+        return None
+    sys.path.insert(0, str(SKILL_DIR))
+    from metadata import load_metadata
+    return load_metadata(WORKSPACE, refresh=AUTO_REFRESH).select(path=path, **filters)
+
+def scope_files(path: str, bm25=None) -> Set[str]:
+    """Relative paths of indexed files under a subdirectory (same prefix rule as BM25)"""
+    if bm25 is None:
+        sys.path.insert(0, str(SKILL_DIR))
+        from bm25 import load_bm25
+        bm25 = load_bm25(WORKSPACE, refresh=False)
+    prefix = path.rstrip("/") + "/"
+    return {p for p in bm25.files if p.startswith(prefix)}
+
+def sort_by_recency(results: List[Dict]) -> List[Dict]:
+    """Newest file date first (dated file names), score breaking ties"""
+    sys.path.insert(0, str(SKILL_DIR))
+    from metadata import load_metadata
+    meta = load_metadata(WORKSPACE, refresh=False)
+    return sorted(results, key=lambda r: (meta.date_of(r["path"]), r["score"]), reverse=True)
+
+def _relative(file: str) -> str:
+    try:
+        return str(Path(file).relative_to(WORKSPACE))
+    except ValueError:
+        return file
+
+def _min_max(scores: List[float]) -> List[float]:
+    if not scores:
+        return []
+    lo, hi = min(scores), max(scores)
+    if hi == lo:
+        return [1.0] * len(scores)
+    return [(s - lo) / (hi - lo) for s in scores]
+
+def fuse_results(ranked_lists: Dict[str, List[Dict]], method: str = "rrf",
+                 k: int = 60, weights: Dict[str, float] = None,
+                 top_k: int = 10) -> List[Dict]:
     """
-    Hybrid search: Run both keyword + semantic, merge and rank
+    Merge ranked result lists into one, deduplicated by (file, chunk).
+    
+    method="rrf":      score = sum(w / (k + rank))      (reciprocal rank fusion)
+    method="weighted": score = sum(w * min-max(score))  (normalized scores)
     """
-    print(f"🔍 Hybrid search: '{query}'\n")
+    weights = weights or {}
+    fused: Dict[tuple, Dict] = {}
     
-    # Phase 1: Keyword search (fast)
-    print("Phase 1: Keyword search...")
-    keyword_results = keyword_search(query, path)
-    print(f"  Found {len(keyword_results)} files via keywords\n")
+    for source, results in ranked_lists.items():
+        w = weights.get(source, 1.0)
+        norm = _min_max([r["score"] for r in results]) if method == "weighted" else None
+        
+        seen = set()
+        for rank, r in enumerate(results, 1):
+            key = (r["file"], r.get("chunk"))
+            if key in seen:
+                continue
+            seen.add(key)
+            
+            contribution = w / (k + rank) if method == "rrf" else w * norm[rank - 1]
+            entry = fused.setdefault(key, {
+                "file": r["file"],
+                "path": r.get("path") or _relative(r["file"]),
+                "chunk": r.get("chunk"),
+                "line": r.get("line"),
+                "text": r["text"],
+                "score": 0.0,
+                "sources": {},
+            })
+            entry["score"] += contribution
+            entry["sources"][source] = {"rank": rank, "score": r["score"]}
+            if entry["line"] is None:
+                entry["line"] = r.get("line")
+    
+    ranked = sorted(fused.values(), key=lambda e: e["score"], reverse=True)
+    return ranked[:top_k]
+
+def hybrid_search(query: str, path: str = "", top_k: int = 10,
+                  method: str = "rrf", verbose: bool = True,
+                  deadline: float = 5.0, use_cache: bool = True,
+                  filters: Dict = None, recent: bool = False) -> List[Dict]:
+    """
+    Hybrid search: Run keyword + semantic concurrently, fuse into one ranked list.
     
-    # Phase 2: Semantic search (if available)
-    print("Phase 2: Semantic search...")
-    semantic_results = semantic_search(query, top_k)
-    print(f"  Found {len(semantic_results)} results via meaning\n")
+    Both phases share one overall `deadline` (seconds). If the semantic phase
+    (e.g. a cold model load) misses it, keyword-only results are returned;
+    the load keeps going in the background and later calls reuse it.
     
-    # Display results
+    `filters` ({"since", "until", "category", "partner"}) selects files from
+    the metadata index first; both phases only score chunks of those files.
+    With `recent`, the fused top-k is ordered newest file first.
+    
+    Complete results are cached per (query, path, top_k, method, filters)
+    until the index generation changes or the TTL expires.
+    """
+    log = print if verbose else (lambda *a, **kw: None)
+    log(f"🔍 Hybrid search: '{query}'\n")
+    start = time.perf_counter()
+    
+    # One workspace refresh per query (none under serve.py): the cache key,
+    # the path scope and phase 1 all use this index
+    sys.path.insert(0, str(SKILL_DIR))
+    from bm25 import load_bm25
+    keywords = load_bm25(WORKSPACE, refresh=AUTO_REFRESH)
+    generation = index_generation(keywords)
+    filter_key = tuple(sorted((k, str(v).lower()) for k, v in (filters or {}).items() if v))
+    cache_key = (normalize_query(query), normalize_path(path), top_k, method, filter_key, recent)
+    if use_cache:
+        cached = _result_cache.get(cache_key, generation)
+        if cached is not None:
+            log(f"⚡ Cache hit ({(time.perf_counter() - start) * 1000:.1f} ms)\n")
+            return [dict(r) for r in cached]
+    
+    # Metadata pre-filter: prune candidate files before anything is scored
+    allowed = select_files(filters, path)
+    if allowed is not None:
+        log(f"Filter: {len(allowed)} files match {dict(filter_key)}")
+        if not allowed:
+            return []
+    # A path scope is applied inside the semantic search too, not after its global top-k
+    semantic_files = allowed if allowed is not None or not path else scope_files(path, keywords)
+    
+    # Phase 2: Semantic search in the background (if available)
+    semantic_box: Dict[str, List[Dict]] = {}
+    semantic_done = threading.Event()
+    
+    def run_semantic():
+        try:
+            semantic_box["results"] = semantic_search(query, top_k * 2, semantic_files)
+        finally:
+            semantic_done.set()
+    
+    threading.Thread(target=run_semantic, daemon=True).start()
+    
+    # Phase 1: Keyword search (fast) in this thread meanwhile
+    keyword_results = keyword_chunks(query, path, top_k * 2, allowed, keywords)
+    log(f"Phase 1: Found {len(keyword_results)} chunks via keywords")
+    
+    remaining = max(0.0, deadline - (time.perf_counter() - start))
+    complete = semantic_done.wait(remaining)
+    if complete:
+        semantic_results = semantic_box.get("results", [])
+        log(f"Phase 2: Found {len(semantic_results)} results via meaning")
+    else:
+        semantic_results = []
+        log(f"Phase 2: ⏱️ missed {deadline:.1f}s deadline, keyword results only")
+    
+    log(f"  ({(time.perf_counter() - start) * 1000:.0f} ms)\n")
+    
+    results = fuse_results(
+        {"keyword": keyword_results, "semantic": semantic_results},
+        method=method,
+        top_k=top_k
+    )
+    if recent:
+        results = sort_by_recency(results)
+    # Degraded (keyword-only) answers are not cached
+    if use_cache and complete:
+        _result_cache.put(cache_key, [dict(r) for r in results], generation)
+    return results
+
+def print_results(results: List[Dict]):
+    """Display a fused result list"""
     print("=" * 50)
     print("📊 COMBINED RESULTS")
     print("=" * 50)
     
-    # Show keyword results
-    if keyword_results:
-        print("\n🎯 Exact Matches (Keywords):")
-        for r in keyword_results[:3]:
-            print(f"\n  📄 {r['file']}")
-            for m in r['matches'][:5]:
-                print(f"    {m}")
-    
-    # Show semantic results
-    if semantic_results:
-        print("\n🧠 Semantic Matches (Meaning):")
-        for r in semantic_results[:5]:
-            print(f"\n  📄 {r['file']} (relevance: {r['score']:.2f})")
-            preview = r['text'][:200].replace('\n', ' ')
-            print(f"    {preview}...")
-    
-    if not keyword_results and not semantic_results:
+    if not results:
         print("\n❌ No results found")
+        return
+    
+    icons = {"keyword": "🎯", "semantic": "🧠"}
+    for r in results:
+        via = " ".join(icons.get(s, s) for s in r["sources"])
+        where = f"line {r['line']}" if r.get("line") else f"chunk {r['chunk']}"
+        print(f"\n  📄 {r['path']} ({where}, score: {r['score']:.4f}) {via}")
+        preview = r['text'][:200].replace('\n', ' ')
+        print(f"    {preview}...")
 
 if __name__ == "__main__":
+    import json
     import argparse
+    from contextlib import redirect_stdout
     
     parser = argparse.ArgumentParser(description="QMB Hybrid Search")
     parser.add_argument("query", help="Search query")
     parser.add_argument("--path", default="", help="Subdirectory to search")
-    parser.add_argument("-n", "--top-k", type=int, default=10, help="Number of semantic results")
+    parser.add_argument("-n", "--top-k", type=int, default=10, help="Number of results")
+    parser.add_argument("--fusion", choices=["rrf", "weighted"], default="rrf",
+                        help="Rank fusion method")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--deadline", type=float, default=30.0,
+                        help="Overall time budget in seconds (includes model load)")
+    parser.add_argument("--since", help="Only files dated on/after YYYY-MM-DD")
+    parser.add_argument("--until", help="Only files dated on/before YYYY-MM-DD")
+    parser.add_argument("--in", dest="category", help="Directory category (business, personal, decisions, ...)")
+    parser.add_argument("--partner", help="Only files mentioning a partner (e.g. luxfer)")
+    parser.add_argument("--recent", action="store_true", help="Order results newest first")
     
     args = parser.parse_args()
+    filters = {k: getattr(args, k) for k in FILTER_KEYS}
     
-    hybrid_search(args.query, args.path, args.top_k)
+    if args.json:
+        # Keep stdout clean for consumers; progress goes to stderr
+        with redirect_stdout(sys.stderr):
+            results = hybrid_search(args.query, args.path, args.top_k, args.fusion,
+                                    verbose=False, deadline=args.deadline,
+                                    filters=filters, recent=args.recent)
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print_results(hybrid_search(args.query, args.path, args.top_k, args.fusion,
+                                    deadline=args.deadline, filters=filters,
+                                    recent=args.recent))
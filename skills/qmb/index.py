@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+QMB Inverted Index - Persistent term → file/line postings
+Replaces a ripgrep pass per query with an incremental on-disk index
+"""
+
+import os
+import re
+import sys
+import pickle
+from pathlib import Path
+from typing import List, Dict, Tuple, Iterable
+
+WORKSPACE = Path.home() / ".openclaw/workspace"
+INDEX_DIR = Path(__file__).parent / ".qmb_index"
+INDEX_FILE = INDEX_DIR / "inverted.pkl"
+INDEX_VERSION = 1
+
+# Latin/digit words, or runs of Hangul syllables
+TOKEN_RE = re.compile(r"[0-9a-z_]+|[가-힣]+")
+
+def tokenize(text: str) -> List[str]:
+    """
+    Korean-aware tokenizer.
+    Latin words are kept whole; Hangul runs are split into character bigrams
+    so that "텐배거는" and "텐배거를" still match "텐배거".
+    """
+    tokens = []
+    for word in TOKEN_RE.findall(text.lower()):
+        if word[0] < "가" or len(word) == 1:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+def scan_workspace(root: Path = WORKSPACE) -> Dict[str, Tuple[float, int]]:
+    """Stat every markdown file under root (hidden paths skipped, like rg)"""
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for name in filenames:
+            if name.startswith(".") or not name.endswith(".md"):
+                continue
+            full = os.path.join(dirpath, name)
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            files[os.path.relpath(full, root)] = (st.st_mtime, st.st_size)
+    return files
+
+def diff_scan(known: Dict[str, Tuple[float, int]],
+              current: Dict[str, Tuple[float, int]]) -> Tuple[List[str], List[str]]:
+    """Return (changed_or_new, deleted) paths between two scans"""
+    changed = [p for p, sig in current.items() if known.get(p) != sig]
+    deleted = [p for p in known if p not in current]
+    return changed, deleted
+
+class InvertedIndex:
+    """
+    term → {path: [line, ...]} postings, persisted with pickle.
+    Files are re-tokenized only when their mtime or size changes.
+    """
+
+    def __init__(self, root: Path = WORKSPACE, index_file: Path = INDEX_FILE):
+        self.root = Path(root)
+        self.index_file = Path(index_file)
+        self.files: Dict[str, Tuple[float, int]] = {}
+        self.file_terms: Dict[str, List[str]] = {}
+        self.postings: Dict[str, Dict[str, List[int]]] = {}
+        self.generation = 0
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def load(self) -> bool:
+        """Load index from disk. Returns False if missing or stale format."""
+        try:
+            with open(self.index_file, "rb") as f:
+                data = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False
+
+        if data.get("version") != INDEX_VERSION or data.get("root") != str(self.root):
+            return False
+
+        self.files = data["files"]
+        self.file_terms = data["file_terms"]
+        self.postings = data["postings"]
+        self.generation = data.get("generation", 0)
+        return True
+
+    def save(self):
+        """Write index atomically (temp file + rename)"""
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_file.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump({
+                "version": INDEX_VERSION,
+                "root": str(self.root),
+                "generation": self.generation,
+                "files": self.files,
+                "file_terms": self.file_terms,
+                "postings": self.postings,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.index_file)
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def _remove(self, path: str):
+        for term in self.file_terms.pop(path, ()):
+            plist = self.postings.get(term)
+            if plist is not None:
+                plist.pop(path, None)
+                if not plist:
+                    del self.postings[term]
+        self.files.pop(path, None)
+
+    def _add(self, path: str, sig: Tuple[float, int]):
+        try:
+            content = (self.root / path).read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            return
+
+        file_postings: Dict[str, List[int]] = {}
+        for lineno, line in enumerate(content.split("\n"), 1):
+            for term in set(tokenize(line)):
+                file_postings.setdefault(term, []).append(lineno)
+
+        for term, lines in file_postings.items():
+            self.postings.setdefault(term, {})[path] = lines
+        self.file_terms[path] = list(file_postings)
+        self.files[path] = sig
+
+    def refresh(self, verbose: bool = False) -> Tuple[int, int]:
+        """
+        Bring the index up to date with the workspace.
+        Returns (updated, removed) file counts.
+        """
+        current = scan_workspace(self.root)
+        changed, deleted = diff_scan(self.files, current)
+
+        for path in deleted:
+            self._remove(path)
+        for path in changed:
+            if verbose:
+                print(f"  📄 {path}")
+            self._remove(path)
+            self._add(path, current[path])
+
+        if changed or deleted:
+            self.generation += 1
+            self.save()
+        return len(changed), len(deleted)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def lookup(self, query: str, path: str = "") -> Dict[str, List[int]]:
+        """
+        Files containing every query term, with the lines that hit.
+        `path` restricts results to a workspace-relative prefix.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return {}
+
+        # Intersect starting from the rarest term
+        plists = sorted((self.postings.get(t, {}) for t in terms), key=len)
+        if not plists[0]:
+            return {}
+
+        prefix = path.rstrip("/") + "/" if path else ""
+        results = {}
+        for file_path, lines in plists[0].items():
+            if prefix and not file_path.startswith(prefix):
+                continue
+            if not all(file_path in p for p in plists[1:]):
+                continue
+
+            # Prefer lines containing every term; fall back to any term
+            line_sets = [set(p[file_path]) for p in plists]
+            hits = set.intersection(*line_sets) or set.union(*line_sets)
+            results[file_path] = sorted(hits)
+        return results
+
+    def candidate_files(self, query: str, path: str = "", limit: int = 0) -> List[Path]:
+        """Absolute paths of matching files, most line hits first"""
+        hits = self.lookup(query, path)
+        ranked = sorted(hits, key=lambda p: len(hits[p]), reverse=True)
+        if limit:
+            ranked = ranked[:limit]
+        return [self.root / p for p in ranked]
+
+    def read_lines(self, path: str, lines: Iterable[int], context: int = 2) -> List[Tuple[int, str]]:
+        """Read only the requested lines (plus context) of one file"""
+        wanted = set()
+        for n in lines:
+            wanted.update(range(max(1, n - context), n + context + 1))
+        last = max(wanted, default=0)
+        out = []
+        try:
+            with open(self.root / path, encoding="utf-8") as f:
+                for lineno, line in enumerate(f, 1):
+                    if lineno > last:
+                        break
+                    if lineno in wanted:
+                        out.append((lineno, line.rstrip("\n")))
+        except (OSError, UnicodeDecodeError):
+            pass
+        return out
+
+_index_cache: Dict[str, InvertedIndex] = {}
+
+def load_index(root: Path = WORKSPACE, refresh: bool = True) -> InvertedIndex:
+    """Load (and by default refresh) the index for root, cached per process"""
+    key = str(root)
+    index = _index_cache.get(key)
+    if index is None:
+        index = InvertedIndex(root)
+        index.load()
+        _index_cache[key] = index
+    if refresh:
+        index.refresh()
+    return index
+
+if __name__ == "__main__":
+    index = InvertedIndex()
+    if len(sys.argv) > 1 and sys.argv[1] == "--rebuild":
+        print("🔨 Rebuilding inverted index...")
+    elif not index.load():
+        print("📚 Building inverted index...")
+    else:
+        print("🔄 Refreshing inverted index...")
+
+    updated, removed = index.refresh(verbose=True)
+    print(f"✅ {len(index.files)} files, {len(index.postings)} terms "
+          f"({updated} updated, {removed} removed)")
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+QMB Metadata - Indexed file date / category / partner fields for pre-filtering
+`--since 2026-02-01 --in decisions --partner luxfer` resolves to a set of
+files before any engine scores a chunk, so filtered queries never rank the
+whole corpus.
+"""
+
+import os
+import re
+import sys
+import bisect
+import pickle
+import hashlib
+from pathlib import Path
+from typing import List, Dict, Set, Tuple, Optional
+
+from index import INDEX_DIR, scan_workspace, diff_scan, load_index
+
+WORKSPACE = Path.home() / ".openclaw/workspace"
+METADATA_FILE = INDEX_DIR / "metadata.pkl"
+METADATA_VERSION = 1
+ONTOLOGY_FILE = "CHRIS-ONTOLOGY.yml"
+
+# memory/2026-02-13.md, memory/decisions/2020-09-26_174c5e03_....md
+DATE_RE = re.compile(r"(?<!\d)(\d{4}-\d{2}-\d{2})(?!\d)")
+
+def file_date(path: str) -> Optional[str]:
+    """ISO date embedded in the file name, if any"""
+    match = DATE_RE.search(Path(path).name)
+    return match.group(1) if match else None
+
+def file_categories(path: str) -> Set[str]:
+    """
+    Every directory name and directory prefix of a path:
+    memory/decisions/x.md → {"memory", "decisions", "memory/decisions"}
+    """
+    parts = [p.lower() for p in Path(path).parent.parts]
+    categories = set(parts)
+    categories.update("/".join(parts[:i]) for i in range(1, len(parts) + 1))
+    return categories
+
+def load_partner_aliases(root: Path = WORKSPACE) -> Dict[str, List[str]]:
+    """
+    partner key → lowercase aliases (key, name, legal name, contact, domain stem)
+    from the ontology's `partners:` section. Empty without PyYAML or the file.
+    """
+    try:
+        import yaml
+    except ImportError:
+        return {}
+    try:
+        with open(Path(root) / ONTOLOGY_FILE, encoding="utf-8") as f:
+            partners = (yaml.safe_load(f) or {}).get("partners") or {}
+    except (OSError, yaml.YAMLError):
+        return {}
+
+    aliases = {}
+    for key, info in partners.items():
+        info = info if isinstance(info, dict) else {}
+        names = {key.lower(), key.replace("_", " ").lower()}
+        for field in ("name", "legal_name", "contact"):
+            value = info.get(field)
+            if isinstance(value, str):
+                names.update(v.strip().lower() for v in value.split("/"))
+        for domain in str(info.get("domain", "")).split("/"):
+            stem = domain.strip().split(".")[0].lower()
+            if stem:
+                names.add(stem)
+        aliases[key.lower()] = sorted(n for n in names if len(n) >= 2)
+    return aliases
+
+def _alias_pattern(aliases: List[str]) -> re.Pattern:
+    """Latin aliases match on word boundaries; Hangul ones as substrings"""
+    parts = []
+    for alias in sorted(aliases, key=len, reverse=True):
+        escaped = re.escape(alias)
+        if re.search(r"[a-z0-9]", alias[:1] + alias[-1:]):
+            escaped = rf"(?<![a-z0-9]){escaped}(?![a-z0-9])"
+        parts.append(escaped)
+    return re.compile("|".join(parts))
+
+class MetadataIndex:
+    """
+    Per-file metadata plus secondary indexes for pre-filtering:
+      dates        sorted [(date, path)] for bisect range queries
+      categories   category → {path}
+      partners     partner key → {path}
+    Files are re-read only when their mtime or size changes; a change in the
+    ontology's partner aliases rebuilds the partner field for every file.
+    """
+
+    def __init__(self, root: Path = WORKSPACE, index_file: Path = METADATA_FILE):
+        self.root = Path(root)
+        self.index_file = Path(index_file)
+        self.files: Dict[str, Tuple[float, int]] = {}
+        self.meta: Dict[str, Dict] = {}
+        self.aliases: Dict[str, List[str]] = {}
+        self.alias_digest = ""
+        self.ontology_sig = None
+        self.generation = 0
+        self._patterns: Dict[str, re.Pattern] = {}
+        self._dates: List[Tuple[str, str]] = []
+        self._categories: Dict[str, Set[str]] = {}
+        self._partners: Dict[str, Set[str]] = {}
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def load(self) -> bool:
+        """Load index from disk. Returns False if missing or stale format."""
+        try:
+            with open(self.index_file, "rb") as f:
+                data = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False
+
+        if data.get("version") != METADATA_VERSION or data.get("root") != str(self.root):
+            return False
+
+        for key in ("files", "meta", "aliases", "alias_digest", "ontology_sig", "generation"):
+            setattr(self, key, data[key])
+        self._compile()
+        self._rebuild_secondary()
+        return True
+
+    def save(self):
+        """Write index atomically (temp file + rename)"""
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_file.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump({
+                "version": METADATA_VERSION,
+                "root": str(self.root),
+                "files": self.files,
+                "meta": self.meta,
+                "aliases": self.aliases,
+                "alias_digest": self.alias_digest,
+                "ontology_sig": self.ontology_sig,
+                "generation": self.generation,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.index_file)
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def _compile(self):
+        self._patterns = {key: _alias_pattern(names) for key, names in self.aliases.items() if names}
+
+    def _rebuild_secondary(self):
+        self._dates = sorted((m["date"], p) for p, m in self.meta.items() if m["date"])
+        self._categories = {}
+        self._partners = {}
+        for path, m in self.meta.items():
+            for cat in m["categories"]:
+                self._categories.setdefault(cat, set()).add(path)
+            for partner in m["partners"]:
+                self._partners.setdefault(partner, set()).add(path)
+
+    def _extract(self, path: str) -> Dict:
+        try:
+            text = (self.root / path).read_text(encoding="utf-8").lower()
+        except (OSError, UnicodeDecodeError):
+            text = ""
+        return {
+            "date": file_date(path),
+            "categories": sorted(file_categories(path)),
+            "partners": sorted(key for key, pattern in self._patterns.items() if pattern.search(text)),
+        }
+
+    def refresh(self, verbose: bool = False) -> Tuple[int, int]:
+        """
+        Bring the index up to date with the workspace (and ontology aliases).
+        Returns (updated, removed) file counts.
+        """
+        try:
+            st = os.stat(self.root / ONTOLOGY_FILE)
+            ontology_sig = (st.st_mtime, st.st_size)
+        except OSError:
+            ontology_sig = None
+        ontology_changed = ontology_sig != self.ontology_sig
+        if ontology_changed:
+            # Only re-parse the YAML when the ontology file itself changed
+            aliases = load_partner_aliases(self.root)
+            digest = hashlib.sha1(repr(sorted(aliases.items())).encode("utf-8")).hexdigest()
+            self.ontology_sig = ontology_sig
+            if digest != self.alias_digest:
+                # Partner list changed: every file needs its partner field again
+                self.aliases, self.alias_digest = aliases, digest
+                self._compile()
+                self.files, self.meta = {}, {}
+
+        current = scan_workspace(self.root)
+        changed, deleted = diff_scan(self.files, current)
+
+        for path in deleted:
+            self.meta.pop(path, None)
+            self.files.pop(path, None)
+        for path in changed:
+            if verbose:
+                print(f"  📄 {path}")
+            self.meta[path] = self._extract(path)
+            self.files[path] = current[path]
+
+        if changed or deleted:
+            self._rebuild_secondary()
+            self.generation += 1
+        if changed or deleted or ontology_changed:
+            self.save()
+        return len(changed), len(deleted)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def resolve_partner(self, name: str) -> List[str]:
+        """Partner keys whose key or aliases contain `name` (case-insensitive)"""
+        needle = name.strip().lower()
+        if needle in self.aliases:
+            return [needle]
+        return [key for key, names in self.aliases.items()
+                if any(needle in alias for alias in names)]
+
+    def select(self, since: str = None, until: str = None, category: str = None,
+               partner: str = None, path: str = "") -> Optional[Set[str]]:
+        """
+        Relative paths matching every given filter, or None when no filter is set.
+        Dates are inclusive ISO strings (YYYY-MM-DD); files without a date in
+        their name never match a date filter. An unknown partner falls back to
+        files mentioning the name (inverted index lookup).
+        """
+        selected: Optional[Set[str]] = None
+
+        def narrow(paths: Set[str]):
+            nonlocal selected
+            selected = set(paths) if selected is None else selected & paths
+
+        if category:
+            narrow(self._categories.get(category.strip("/").lower(), set()))
+        if partner:
+            keys = self.resolve_partner(partner)
+            if keys:
+                narrow(set().union(*(self._partners.get(k, set()) for k in keys)))
+            else:
+                narrow(set(load_index(self.root, refresh=False).lookup(partner)))
+        if since or until:
+            lo = bisect.bisect_left(self._dates, (since or "",))
+            hi = bisect.bisect_right(self._dates, ((until or "9999-12-31") + "\uffff",))
+            narrow({p for _, p in self._dates[lo:hi]})
+        if path:
+            prefix = path.strip("/") + "/"
+            candidates = selected if selected is not None else self.meta
+            selected = {p for p in candidates if p.startswith(prefix)}
+        return selected
+
+    def date_of(self, path: str) -> str:
+        """File date for recency sorting ("" when the name has none)"""
+        meta = self.meta.get(path)
+        return (meta and meta["date"]) or ""
+
+_metadata_cache: Dict[str, MetadataIndex] = {}
+
+def load_metadata(root: Path = WORKSPACE, refresh: bool = True) -> MetadataIndex:
+    """Load (and by default refresh) the metadata index for root, cached per process"""
+    key = str(root)
+    index = _metadata_cache.get(key)
+    if index is None:
+        index = MetadataIndex(root)
+        index.load()
+        _metadata_cache[key] = index
+    if refresh:
+        index.refresh()
+    return index
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="QMB metadata index")
+    parser.add_argument("--since", help="Files dated on/after YYYY-MM-DD")
+    parser.add_argument("--until", help="Files dated on/before YYYY-MM-DD")
+    parser.add_argument("--in", dest="category", help="Directory category (e.g. decisions, business)")
+    parser.add_argument("--partner", help="Partner key or alias (e.g. luxfer)")
+    parser.add_argument("--partners", action="store_true", help="List known partners and file counts")
+    args = parser.parse_args()
+
+    index = MetadataIndex()
+    index.load()
+    updated, removed = index.refresh()
+    print(f"✅ {len(index.meta)} files ({updated} updated, {removed} removed)")
+
+    if args.partners:
+        for key in sorted(index.aliases):
+            print(f"  🤝 {key}: {len(index._partners.get(key, ()))} files ({', '.join(index.aliases[key])})")
+        sys.exit(0)
+
+    selected = index.select(args.since, args.until, args.category, args.partner)
+    if selected is not None:
+        for path in sorted(selected, key=index.date_of, reverse=True):
+            print(f"  📄 {index.date_of(path) or '----------'}  {path}")
+        print(f"\n{len(selected)} files match")
@@ -22,6 +22,7 @@ show_help() {
     echo "QMB - Quick Markdown Search"
     echo ""
     echo "Usage: $0 <query> [options]"
+    echo "       $0 serve [--port N] [--interval S]   (resident search daemon)"
     echo ""
     echo "Options:"
     echo "  --context N        Number of context lines (default: 2)"
@@ -43,6 +44,12 @@ if [ $# -eq 0 ]; then
     exit 1
 fi
 
+# Resident daemon: ./search.sh serve [serve.py options]
+if [ "$1" = "serve" ]; then
+    shift
+    exec python3 "$(dirname "$0")/serve.py" "$@"
+fi
+
 QUERY="$1"
 shift
 
@@ -2,169 +2,416 @@
 """
 QMB Phase 2 - Semantic Search with Hybrid BM25 + Vector Search
 Uses all-MiniLM-L6-v2 for embeddings (local, free, Korean support)
+Vectors live in chromadb or a local memory-mapped numpy store (store.py)
 """
 
 import os
 import sys
 import json
+import time
+import queue
 import hashlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Iterable
 
 # Will be imported after installation
 # from sentence_transformers import SentenceTransformer
-# import chromadb
+# import chromadb  (only for the "chroma" backend)
 
 WORKSPACE = Path.home() / ".openclaw/workspace"
 INDEX_DIR = Path(__file__).parent / ".qmb_index"
+MANIFEST_FILE = INDEX_DIR / "semantic_manifest.json"
+
+sys.path.insert(0, str(Path(__file__).parent))
+from chunker import CHUNKER_VERSION, iter_chunks, breadcrumb
+
+def store_options(backend: str, nlist: int = None, nprobe: int = None) -> Dict:
+    """Backend kwargs for open_store; IVF settings default to $QMB_NLIST / $QMB_NPROBE"""
+    if backend != "numpy":
+        return {}
+    options = {}
+    nlist = nlist if nlist is not None else os.environ.get("QMB_NLIST")
+    nprobe = nprobe if nprobe is not None else os.environ.get("QMB_NPROBE")
+    if nlist is not None:
+        options["nlist"] = int(nlist)
+    if nprobe is not None:
+        options["nprobe"] = int(nprobe)
+    return options
 
 class QMBPhase2:
-    def __init__(self):
+    def __init__(self, backend: str = None, nlist: int = None, nprobe: int = None):
         self.model = None
-        self.client = None
-        self.collection = None
+        self.store = None
+        self.backend = backend or os.environ.get("QMB_BACKEND", "chroma")
+        self.store_options = store_options(self.backend, nlist, nprobe)
         self.initialized = False
         
     def init(self):
-        """Initialize embedding model and vector DB"""
+        """Initialize embedding model and vector store"""
         try:
             from sentence_transformers import SentenceTransformer
-            import chromadb
+            from store import open_store
             
             # Load lightweight embedding model (384 dimensions)
             print("🔧 Loading embedding model...")
             self.model = SentenceTransformer('all-MiniLM-L6-v2')
             
-            # Initialize ChromaDB
+            # Open vector store (chromadb or local numpy backend)
             INDEX_DIR.mkdir(exist_ok=True)
-            self.client = chromadb.PersistentClient(path=str(INDEX_DIR))
-            
-            # Get or create collection
-            self.collection = self.client.get_or_create_collection(
-                name="qmb_documents",
-                metadata={"hnsw:space": "cosine"}
-            )
+            self.store = open_store(self.backend, INDEX_DIR, **self.store_options)
             
             self.initialized = True
-            print("✅ Phase 2 ready!")
+            print(f"✅ Phase 2 ready! ({self.backend})")
             return True
             
         except ImportError as e:
             print(f"❌ Dependencies not installed: {e}")
-            print("Run: pip install sentence-transformers chromadb")
+            if self.backend == "chroma":
+                print("Run: pip install sentence-transformers chromadb")
+                print("  or set QMB_BACKEND=numpy to skip chromadb")
+            else:
+                print("Run: pip install sentence-transformers")
             return False
     
-    def index_file(self, file_path: Path) -> bool:
-        """Index a single markdown file"""
+    def fork(self) -> "QMBPhase2":
+        """
+        Same loaded model, store reopened from disk: update the copy while this
+        instance keeps answering queries, then swap (see serve.py)
+        """
+        twin = QMBPhase2(self.backend)
+        twin.store_options = dict(self.store_options)
+        if self.initialized:
+            from store import open_store
+            twin.model = self.model
+            twin.store = open_store(self.backend, INDEX_DIR, **self.store_options)
+            twin.initialized = True
+        return twin
+    
+    @property
+    def manifest_file(self) -> Path:
+        """One manifest per backend: it records what that store holds"""
+        if self.backend == "chroma":
+            return MANIFEST_FILE
+        return MANIFEST_FILE.with_name(f"semantic_manifest_{self.backend}.json")
+    
+    def _load_manifest(self) -> Dict:
+        """Per-file content hash and chunk IDs from the last indexing run"""
+        if self.store is not None and self.store.needs_rebuild:
+            return {}  # the store dropped unreadable data: every file is reindexed
+        try:
+            return json.loads(self.manifest_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_manifest(self, manifest: Dict):
+        INDEX_DIR.mkdir(exist_ok=True)
+        self.store.persist()
+        tmp = self.manifest_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(manifest, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp, self.manifest_file)
+    
+    def _chunk_ids(self, file_path: Path, chunks: List[str]) -> List[str]:
+        """Content-addressed chunk IDs: unchanged chunks keep their ID when they move"""
+        doc_id = hashlib.md5(str(file_path).encode()).hexdigest()[:8]
+        seen = {}
+        ids = []
+        for chunk in chunks:
+            h = hashlib.sha1(chunk.encode('utf-8')).hexdigest()[:16]
+            n = seen.get(h, 0)
+            seen[h] = n + 1
+            ids.append(f"{doc_id}_{h}_{n}")
+        return ids
+    
+    def _plan_file(self, file_path: Path, manifest: Dict) -> Dict:
+        """
+        Work out what has to change for one file (no model or DB access).
+        Returns None when the file is unchanged since the last run.
+        """
+        raw = file_path.read_bytes()
+        # Chunker version is part of the hash so a new chunker rechunks everything
+        file_hash = f"{CHUNKER_VERSION}:{hashlib.sha1(raw).hexdigest()}"
+        key = str(file_path)
+        
+        entry = manifest.get(key)
+        if entry and entry["hash"] == file_hash:
+            return None
+        
+        # Split into heading-aware chunks
+        chunks = self._chunk_text(raw.decode('utf-8'))
+        ids = self._chunk_ids(file_path, [c["text"] for c in chunks])
+        metas = [{"file": key, "chunk": i, "headings": breadcrumb(c)} for i, c in enumerate(chunks)]
+        old_pos = {cid: i for i, cid in enumerate(entry["chunks"])} if entry else {}
+        current = set(ids)
+        
+        return {
+            "key": key,
+            "hash": file_hash,
+            "ids": ids,
+            # Unknown to the manifest: clear anything left by older runs
+            "legacy": entry is None,
+            "stale": [cid for cid in old_pos if cid not in current],
+            "new": [(meta, cid, chunk["text"]) for meta, cid, chunk in zip(metas, ids, chunks)
+                    if cid not in old_pos],
+            "moved": [(meta, cid) for meta, cid in zip(metas, ids)
+                      if cid in old_pos and old_pos[cid] != meta["chunk"]],
+        }
+    
+    def _apply_deletes(self, plan: Dict):
+        """Remove legacy and stale chunks and fix positions of moved ones"""
+        if plan["legacy"]:
+            self.store.delete(where={"file": plan["key"]})
+        if plan["stale"]:
+            self.store.delete(ids=plan["stale"])
+        if plan["moved"]:
+            self.store.update(
+                ids=[cid for _, cid in plan["moved"]],
+                metadatas=[meta for meta, _ in plan["moved"]]
+            )
+    
+    def _upsert(self, batch: List[Tuple[Dict, str, str]], embeddings):
+        """Bulk upsert (metadata, id, text) rows with their embeddings"""
+        self.store.upsert(
+            ids=[cid for _, cid, _ in batch],
+            embeddings=embeddings,
+            documents=[text for _, _, text in batch],
+            metadatas=[meta for meta, _, _ in batch]
+        )
+    
+    def index_file(self, file_path: Path, manifest: Dict = None) -> bool:
+        """
+        Index a single markdown file.
+        Only chunks whose content is new are embedded; chunks that disappeared
+        are deleted. `manifest` is updated in place when given.
+        """
         if not self.initialized:
             return False
             
         try:
-            content = file_path.read_text(encoding='utf-8')
-            
-            # Split into chunks (paragraphs)
-            chunks = self._chunk_text(content)
-            
-            # Generate embeddings
-            embeddings = self.model.encode(chunks).tolist()
+            plan = self._plan_file(file_path, manifest if manifest is not None else {})
+            if plan is None:
+                return True
             
-            # Create IDs
-            doc_id = hashlib.md5(str(file_path).encode()).hexdigest()[:8]
-            ids = [f"{doc_id}_{i}" for i in range(len(chunks))]
-            
-            # Add to collection
-            self.collection.add(
-                embeddings=embeddings,
-                documents=chunks,
-                ids=ids,
-                metadatas=[{"file": str(file_path), "chunk": i} for i in range(len(chunks))]
-            )
+            self._apply_deletes(plan)
+            if plan["new"]:
+                # Generate embeddings for new chunks only
+                batch = plan["new"]
+                self._upsert(batch, self.model.encode([text for _, _, text in batch]).tolist())
             
+            if manifest is not None:
+                manifest[plan["key"]] = {"hash": plan["hash"], "chunks": plan["ids"]}
+            else:
+                self.store.persist()
             return True
             
         except Exception as e:
             print(f"⚠️ Error indexing {file_path}: {e}")
             return False
     
-    def _chunk_text(self, text: str, chunk_size: int = 500) -> List[str]:
-        """Split text into overlapping chunks"""
-        paragraphs = text.split('\n\n')
-        chunks = []
-        current_chunk = ""
+    def remove_file(self, key: str, manifest: Dict):
+        """Drop every chunk of a file that no longer exists"""
+        entry = manifest.pop(key, None)
+        if entry and entry["chunks"]:
+            self.store.delete(ids=entry["chunks"])
+    
+    def update_files(self, changed: List[Path], removed: List[Path]) -> int:
+        """
+        Re-index just these files (e.g. from a file watcher).
+        Returns the number of files whose content actually changed.
+        """
+        if not self.initialized:
+            return 0
+        if self.store.needs_rebuild:
+            self.index_workspace()
+            return len(self._load_manifest())
         
-        for para in paragraphs:
-            if len(current_chunk) + len(para) < chunk_size:
-                current_chunk += para + "\n\n"
-            else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = para + "\n\n"
+        manifest = self._load_manifest()
+        for file_path in removed:
+            self.remove_file(str(file_path), manifest)
         
-        if current_chunk:
-            chunks.append(current_chunk.strip())
-            
-        return chunks if chunks else [text[:chunk_size]]
+        updated = 0
+        for file_path in changed:
+            before = manifest.get(str(file_path), {}).get("hash")
+            self.index_file(file_path, manifest)
+            if manifest.get(str(file_path), {}).get("hash") != before:
+                updated += 1
+        
+        self._save_manifest(manifest)
+        return updated
     
-    def search(self, query: str, top_k: int = 5) -> List[Dict]:
-        """Semantic search"""
+    def _chunk_text(self, text: str) -> List[Dict]:
+        """Split text into heading-aware, size-capped chunks (see chunker.py)"""
+        return list(iter_chunks(text))
+    
+    def search(self, query: str, top_k: int = 5, files: Iterable[str] = None) -> List[Dict]:
+        """Semantic search (optionally only over `files`, absolute path strings)"""
         if not self.initialized:
             return []
             
         # Encode query
-        query_embedding = self.model.encode([query]).tolist()
+        query_embedding = self.model.encode([query])[0].tolist()
         
         # Search
-        results = self.collection.query(
-            query_embeddings=query_embedding,
-            n_results=top_k,
-            include=["documents", "metadatas", "distances"]
-        )
-        
         return [
             {
-                "text": doc,
-                "file": meta["file"],
-                "score": 1 - dist  # Convert distance to similarity
+                "text": hit["text"],
+                "file": hit["metadata"]["file"],
+                "chunk": hit["metadata"].get("chunk"),
+                "headings": hit["metadata"].get("headings", ""),
+                "score": hit["score"]
             }
-            for doc, meta, dist in zip(
-                results["documents"][0],
-                results["metadatas"][0],
-                results["distances"][0]
-            )
+            for hit in self.store.query(query_embedding, top_k, files)
         ]
     
-    def index_workspace(self):
-        """Index all markdown files in workspace"""
+    def index_workspace(self, batch_size: int = 64, threads: int = 0, readers: int = 4):
+        """
+        Index all markdown files in workspace.
+        Idempotent: unchanged files are skipped by content hash and deleted
+        files have their chunks removed.
+        
+        Streaming pipeline: a pool of `readers` hashes and chunks files (at
+        most 2 * `readers` files planned ahead of the encoder), the calling thread encodes fixed-size cross-file batches of `batch_size`
+        chunks (using `threads` CPU threads, 0 = library default), and a
+        writer thread bulk-upserts them into the collection.
+        """
         if not self.initialized:
             print("❌ Not initialized")
             return
+        
+        if threads:
+            try:
+                import torch
+                torch.set_num_threads(threads)
+            except ImportError:
+                pass
             
         print("📚 Indexing workspace...")
-        md_files = list(WORKSPACE.rglob("*.md"))
+        md_files = [p for p in WORKSPACE.rglob("*.md") if not p.name.startswith(".")]
+        manifest = self._load_manifest()
         
-        for i, file_path in enumerate(md_files, 1):
-            if file_path.name.startswith("."):
-                continue
-            print(f"  [{i}/{len(md_files)}] {file_path.name}")
-            self.index_file(file_path)
-            
-        print(f"✅ Indexed {len(md_files)} files")
+        present = {str(p) for p in md_files}
+        removed = [key for key in manifest if key not in present]
+        for key in removed:
+            self.remove_file(key, manifest)
+        
+        # Writer: the only thread that touches the collection from here on
+        write_queue: "queue.Queue" = queue.Queue(maxsize=8)
+        write_errors = []
+        
+        def writer():
+            while True:
+                item = write_queue.get()
+                if item is None:
+                    return
+                try:
+                    if isinstance(item, dict):
+                        self._apply_deletes(item)
+                    else:
+                        self._upsert(*item)
+                except Exception as e:
+                    write_errors.append(e)
+        
+        writer_thread = threading.Thread(target=writer, daemon=True)
+        writer_thread.start()
+        
+        def plan(file_path):
+            try:
+                return file_path, self._plan_file(file_path, manifest)
+            except Exception as e:
+                print(f"⚠️ Error indexing {file_path}: {e}")
+                return file_path, None
+        
+        start = time.perf_counter()
+        pending: List[Tuple[Dict, str, str]] = []
+        updated = 0
+        encoded = 0
+        
+        def flush(rows):
+            nonlocal encoded
+            embeddings = self.model.encode(
+                [text for _, _, text in rows], batch_size=batch_size
+            ).tolist()
+            write_queue.put((rows, embeddings))
+            encoded += len(rows)
+            rate = encoded / max(time.perf_counter() - start, 1e-9)
+            print(f"  ⚡ {encoded} chunks embedded ({rate:.1f} chunks/sec)")
+        
+        def planned(pool):
+            # Bounded window instead of pool.map: chunk plans never pile up in memory
+            window = deque()
+            for file_path in md_files:
+                window.append(pool.submit(plan, file_path))
+                if len(window) >= 2 * readers:
+                    yield window.popleft().result()
+            while window:
+                yield window.popleft().result()
+        
+        with ThreadPoolExecutor(max_workers=readers) as pool:
+            for i, (file_path, file_plan) in enumerate(planned(pool), 1):
+                if file_plan is None:
+                    continue
+                updated += 1
+                print(f"  [{i}/{len(md_files)}] {file_path.name}")
+                
+                write_queue.put(file_plan)
+                pending.extend(file_plan["new"])
+                manifest[file_plan["key"]] = {"hash": file_plan["hash"], "chunks": file_plan["ids"]}
+                
+                while len(pending) >= batch_size:
+                    flush(pending[:batch_size])
+                    pending = pending[batch_size:]
+        
+        if pending:
+            flush(pending)
+        
+        write_queue.put(None)
+        writer_thread.join()
+        
+        if write_errors:
+            # Keep the old manifest so the next run retries these files
+            print(f"⚠️ {len(write_errors)} write errors, first: {write_errors[0]}")
+            return
+        
+        self._save_manifest(manifest)
+        elapsed = time.perf_counter() - start
+        print(f"✅ Indexed {len(md_files)} files ({updated} updated, {len(removed)} removed)")
+        if encoded:
+            print(f"⏱️ {encoded} chunks in {elapsed:.1f}s ({encoded / elapsed:.1f} chunks/sec)")
 
 if __name__ == "__main__":
-    qmb = QMBPhase2()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="QMB Phase 2 semantic search")
+    parser.add_argument("--index", action="store_true", help="Index the workspace")
+    parser.add_argument("--search", nargs="?", const="", help="Search query")
+    parser.add_argument("--batch-size", type=int, default=64, help="Chunks per encoder batch")
+    parser.add_argument("--threads", type=int, default=0, help="CPU threads for the encoder")
+    parser.add_argument("--readers", type=int, default=4, help="File reader threads")
+    parser.add_argument("--backend", choices=["chroma", "numpy"], default=None,
+                        help="Vector store (default: $QMB_BACKEND or chroma)")
+    parser.add_argument("--nlist", type=int, default=None,
+                        help="numpy backend: IVF clusters, 0 = brute force (default: $QMB_NLIST)")
+    parser.add_argument("--nprobe", type=int, default=None,
+                        help="numpy backend: clusters scanned per query (default: $QMB_NPROBE or 8)")
+    args = parser.parse_args()
+    
+    if not args.index and args.search is None:
+        print("Usage: python3 semantic.py --index [--batch-size N] [--threads N]")
+        print("       python3 semantic.py --search 'your query'")
+        sys.exit(0)
+    
+    qmb = QMBPhase2(args.backend, args.nlist, args.nprobe)
     
     if not qmb.init():
         sys.exit(1)
     
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "--index":
-            qmb.index_workspace()
-        elif sys.argv[1] == "--search":
-            query = sys.argv[2] if len(sys.argv) > 2 else input("Query: ")
-            results = qmb.search(query)
-            for r in results:
-                print(f"\n📄 {r['file']} (score: {r['score']:.2f})")
-                print(r['text'][:300] + "...")
+    if args.index:
+        qmb.index_workspace(args.batch_size, args.threads, args.readers)
     else:
-        print("Usage: python3 semantic.py --index")
-        print("       python3 semantic.py --search 'your query'")
+        query = args.search or input("Query: ")
+        results = qmb.search(query)
+        for r in results:
+            print(f"\n📄 {r['file']} (score: {r['score']:.2f})")
+            print(r['text'][:300] + "...")
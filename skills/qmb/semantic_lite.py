@@ -7,21 +7,63 @@ No torch required, uses onnxruntime for embeddings
 import os
 import sys
 import json
+import zlib
 import hashlib
+import unicodedata
 import numpy as np
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Tuple
+
+from cache import QueryCache, normalize_query
+from chunker import CHUNKER_VERSION, chunk_text
 
 WORKSPACE = Path.home() / ".openclaw/workspace"
 INDEX_DIR = Path(__file__).parent / ".qmb_index"
+TFIDF_VERSION = 1
+
+# Separate caches: each tracks its own generation
+_texts_cache = QueryCache(maxsize=64, ttl=600)
+_index_cache = QueryCache(maxsize=256, ttl=600)
+
+def cache_stats() -> Dict:
+    """Hit/miss counters of the TF-IDF result caches"""
+    return {"texts": _texts_cache.stats(), "index": _index_cache.stats()}
+
+def texts_digest(texts: List[str]) -> str:
+    """Fingerprint of a text list (cache key for per-call corpora)"""
+    digest = hashlib.sha1()
+    for text in texts:
+        digest.update(text.encode('utf-8'))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def char_ngrams(text: str, sizes: Tuple[int, ...] = (2, 3)) -> List[str]:
+    """Character n-grams per space-padded word; works for Hangul without a tokenizer"""
+    grams = []
+    for word in unicodedata.normalize("NFC", text).lower().split():
+        padded = f" {word} "
+        for n in sizes:
+            grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return grams
+
+def split_chunks(content: str) -> List[str]:
+    """Heading-aware chunks shared with the other qmb engines"""
+    return chunk_text(content)
 
 class QMBPhase2Lite:
     """Lightweight semantic search with sklearn TF-IDF"""
     
-    def __init__(self):
+    def __init__(self, index_dir: Path = INDEX_DIR):
         self.vectorizer = None
         self.initialized = False
-        self.embedding_dim = 384
+        self.hash_dim = 2048
+        self._fallback_key = None
+        self._fallback_matrix = None
+        self.index_dir = Path(index_dir)
+        self.matrix = None
+        self.rows: List[List] = []
+        self.files: Dict[str, List] = {}
+        self.generation = 0
         
     def init(self):
         """Initialize TF-IDF vectorizer"""
@@ -57,17 +99,47 @@ class QMBPhase2Lite:
             return None
         return self.vectorizer.transform([text])
     
+    def hash_embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Batch feature-hashing embedding (fallback when TF-IDF fails).
+        Character 2/3-grams of each word are hashed with crc32, which unlike
+        the builtin hash() is stable across processes, into signed buckets.
+        Returns an L2-normalized (len(texts), hash_dim) float32 matrix.
+        """
+        dim = self.hash_dim
+        rows, hashes = [], []
+        for row, text in enumerate(texts):
+            grams = char_ngrams(text)
+            rows.extend([row] * len(grams))
+            hashes.extend(zlib.crc32(g.encode('utf-8')) for g in grams)
+        
+        hashes = np.asarray(hashes, dtype=np.uint32)
+        flat = np.asarray(rows, dtype=np.int64) * dim + (hashes % dim)
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        
+        mat = np.bincount(flat, weights=signs, minlength=len(texts) * dim)
+        mat = mat.reshape(len(texts), dim).astype(np.float32)
+        return mat / (np.linalg.norm(mat, axis=1, keepdims=True) + 1e-8)
+    
     def simple_embed(self, text: str) -> np.ndarray:
-        """Simple hash-based embedding fallback"""
-        words = text.lower().split()
-        vec = np.zeros(self.embedding_dim)
-        for i, word in enumerate(words[:self.embedding_dim]):
-            vec[i % self.embedding_dim] = hash(word) % 1000 / 1000.0
-        return vec / (np.linalg.norm(vec) + 1e-8)
+        """Simple hash-based embedding fallback (single text)"""
+        return self.hash_embed([text])[0]
     
     def search_tfidf(self, query: str, texts: List[str], top_k: int = 5) -> List[Dict]:
-        """Semantic search using TF-IDF + cosine similarity"""
+        """Semantic search using TF-IDF + cosine similarity (cached per text set)"""
+        if not self.initialized or not texts:
+            return []
+        
+        generation = ("texts", texts_digest(texts))
+        key = ("tfidf", normalize_query(query), top_k)
         
+        cached = _texts_cache.get(key, generation)
+        if cached is None:
+            cached = self._search_tfidf(query, texts, top_k)
+            _texts_cache.put(key, cached, generation)
+        return [dict(r) for r in cached]
+    
+    def _search_tfidf(self, query: str, texts: List[str], top_k: int = 5) -> List[Dict]:
         if not self.initialized or not texts:
             return []
         
@@ -99,35 +171,231 @@ class QMBPhase2Lite:
             return self.search_fallback(query, texts, top_k)
     
     def search_fallback(self, query: str, texts: List[str], top_k: int = 5) -> List[Dict]:
-        """Fallback hash-based search"""
-        query_vec = self.simple_embed(query)
+        """Fallback hash-based search: one matrix product per query"""
+        if not texts:
+            return []
+        
+        # Document vectors are cached per text set
+        digest = texts_digest(texts)
+        if self._fallback_key != digest:
+            self._fallback_matrix = self.hash_embed(texts)
+            self._fallback_key = digest
+        
+        similarities = self._fallback_matrix @ self.simple_embed(query)
         
+        k = min(top_k, len(texts))
+        top_indices = np.argpartition(-similarities, k - 1)[:k]
+        # Stable tie-break on index so rankings are reproducible
+        top_indices = top_indices[np.lexsort((top_indices, -similarities[top_indices]))]
+        
+        return [
+            {
+                "index": int(i),
+                "text": texts[i][:300],
+                "score": float(similarities[i])
+            }
+            for i in top_indices
+        ]
+
+    # ------------------------------------------------------------------
+    # Persisted model: fit once, memory-map at query time
+    # ------------------------------------------------------------------
+
+    def _paths(self) -> Dict[str, Path]:
+        return {
+            "meta": self.index_dir / "tfidf_meta.json",
+            "vectorizer": self.index_dir / "tfidf_vectorizer.pkl",
+            "data": self.index_dir / "tfidf_data.npy",
+            "indices": self.index_dir / "tfidf_indices.npy",
+            "indptr": self.index_dir / "tfidf_indptr.npy",
+        }
+
+    def load_index(self, workspace: Path = WORKSPACE) -> bool:
+        """
+        Load the fitted vectorizer and memory-map the CSR matrix.
+        False when missing, stale or unreadable (corrupt pickle, other sklearn
+        version, no scipy): callers rebuild instead.
+        """
+        import pickle
+
+        paths = self._paths()
+        try:
+            from scipy.sparse import csr_matrix
+
+            meta = json.loads(paths["meta"].read_text(encoding='utf-8'))
+            if (meta.get("version") != TFIDF_VERSION or meta.get("root") != str(workspace)
+                    or meta.get("chunker") != CHUNKER_VERSION):
+                return False
+            with open(paths["vectorizer"], "rb") as f:
+                vectorizer = pickle.load(f)
+            arrays = [np.load(paths[k], mmap_mode='r') for k in ("data", "indices", "indptr")]
+            matrix = csr_matrix(tuple(arrays), shape=tuple(meta["shape"]), copy=False)
+            rows, files = meta["rows"], meta["files"]
+        except (OSError, ValueError, KeyError, EOFError, AttributeError, ImportError,
+                pickle.UnpicklingError) as e:
+            if paths["meta"].exists():
+                print(f"⚠️ TF-IDF index unreadable ({type(e).__name__}), rebuilding")
+            return False
+
+        self.vectorizer = vectorizer
+        self.matrix = matrix
+        self.rows = rows
+        self.files = files
+        self.generation = meta.get("generation", 0)
+        self.initialized = True
+        return True
+
+    def _save_index(self, workspace: Path):
+        import pickle
+
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        paths = self._paths()
+
+        def replace(key, write):
+            tmp = paths[key].with_name(paths[key].name + ".tmp")
+            with open(tmp, "wb") as f:
+                write(f)
+            os.replace(tmp, paths[key])
+
+        replace("vectorizer", lambda f: pickle.dump(self.vectorizer, f, protocol=pickle.HIGHEST_PROTOCOL))
+        for key in ("data", "indices", "indptr"):
+            replace(key, lambda f, key=key: np.save(f, getattr(self.matrix, key)))
+        # Meta last: it is what marks the index as complete
+        replace("meta", lambda f: f.write(json.dumps({
+            "version": TFIDF_VERSION,
+            "chunker": CHUNKER_VERSION,
+            "root": str(workspace),
+            "shape": list(self.matrix.shape),
+            "rows": self.rows,
+            "files": self.files,
+            "generation": self.generation,
+        }, ensure_ascii=False).encode('utf-8')))
+
+    def build(self, workspace: Path = WORKSPACE, full: bool = False,
+              refit_ratio: float = 0.2) -> Tuple[int, int]:
+        """
+        Fit over all workspace chunks once, then keep the index fresh.
+        Only chunks of changed files are re-transformed with the existing
+        vocabulary; a full refit happens on demand or when more than
+        refit_ratio of the files changed. Returns (updated, removed) counts.
+        """
+        from scipy.sparse import vstack
+        from index import scan_workspace, diff_scan
+
+        if not full and self.matrix is None:
+            full = not self.load_index(workspace)
+        if not self.initialized and not self.init():
+            return 0, 0
+
+        current = {p: list(sig) for p, sig in scan_workspace(workspace).items()}
+        changed, deleted = diff_scan(self.files, current)
+        if not full and not changed and not deleted:
+            return 0, 0
+        if len(changed) + len(deleted) > refit_ratio * max(len(current), 1):
+            full = True
+
+        targets = list(current) if full else changed
+        new_rows, new_texts = [], []
+        for path in targets:
+            try:
+                content = (workspace / path).read_text(encoding='utf-8')
+            except (OSError, UnicodeDecodeError):
+                continue
+            for chunk_no, chunk in enumerate(split_chunks(content)):
+                new_rows.append([path, chunk_no])
+                new_texts.append(chunk)
+
+        if full:
+            if not new_texts:
+                return 0, len(deleted)
+            self.matrix = self.vectorizer.fit_transform(new_texts).tocsr()
+            self.rows = new_rows
+        else:
+            stale = set(changed) | set(deleted)
+            keep = [i for i, (path, _) in enumerate(self.rows) if path not in stale]
+            parts = [self.matrix[keep]]
+            if new_texts:
+                parts.append(self.vectorizer.transform(new_texts))
+            self.matrix = vstack(parts, format='csr')
+            self.rows = [self.rows[i] for i in keep] + new_rows
+
+        self.files = current
+        self.generation += 1
+        self._save_index(workspace)
+        return len(targets), len(deleted)
+
+    def search_index(self, query: str, top_k: int = 5, workspace: Path = WORKSPACE,
+                     files: List[Path] = None) -> List[Dict]:
+        """
+        Query the persisted model: one sparse mat-vec over all chunks.
+        `files` optionally restricts results to those files.
+        Results are cached until the index generation changes.
+        """
+        if self.matrix is None and not self.load_index(workspace):
+            self.build(workspace, full=True)
+            if self.matrix is None:
+                return []
+        
+        generation = ("index", str(workspace), self.generation)
+        scope = tuple(sorted(str(f) for f in files)) if files is not None else None
+        key = ("index", normalize_query(query), top_k, scope)
+        
+        cached = _index_cache.get(key, generation)
+        if cached is None:
+            cached = self._search_index(query, top_k, workspace, files)
+            _index_cache.put(key, cached, generation)
+        return [dict(r) for r in cached]
+    
+    def _search_index(self, query: str, top_k: int, workspace: Path,
+                      files: List[Path] = None) -> List[Dict]:
+        if self.matrix.shape[0] == 0:
+            return []
+
+        # Rows are L2-normalized, so the dot product is the cosine similarity
+        query_vec = self.vectorizer.transform([query])
+        similarities = np.asarray((self.matrix @ query_vec.T).todense()).ravel()
+
+        if files is not None:
+            allowed = {str(Path(f).relative_to(workspace)) for f in files}
+            mask = np.fromiter((path in allowed for path, _ in self.rows), dtype=bool,
+                               count=len(self.rows))
+            similarities = np.where(mask, similarities, 0.0)
+
+        k = min(top_k, len(similarities))
+        top_indices = np.argpartition(-similarities, k - 1)[:k]
+        top_indices = top_indices[np.argsort(-similarities[top_indices])]
+
         results = []
-        for i, text in enumerate(texts):
-            text_vec = self.simple_embed(text)
-            similarity = np.dot(query_vec, text_vec)
+        chunk_cache: Dict[str, List[str]] = {}
+        for idx in top_indices:
+            if similarities[idx] <= 0:
+                break
+            path, chunk_no = self.rows[idx]
+            if path not in chunk_cache:
+                try:
+                    chunk_cache[path] = split_chunks((workspace / path).read_text(encoding='utf-8'))
+                except (OSError, UnicodeDecodeError):
+                    chunk_cache[path] = []
+            chunks = chunk_cache[path]
             results.append({
-                "index": i,
-                "text": text[:300],
-                "score": float(similarity)
+                "index": int(idx),
+                "file": str(workspace / path),
+                "text": chunks[chunk_no][:300] if chunk_no < len(chunks) else "",
+                "score": float(similarities[idx])
             })
-        
-        results.sort(key=lambda x: x["score"], reverse=True)
-        return results[:top_k]
+
+        return results
 
 def hybrid_search_files(query: str, workspace: Path = WORKSPACE):
     """
-    Hybrid search: ripgrep for files + simple semantic ranking
+    Hybrid search: inverted index for files + simple semantic ranking
     """
-    import subprocess
+    from index import load_index
     
     print(f"🔍 Hybrid search: '{query}'\n")
     
-    # Step 1: Find candidate files with ripgrep
-    cmd = ["rg", "-l", "-i", "--type", "md", query, str(workspace)]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    
-    files = [Path(p) for p in result.stdout.strip().split('\n') if p]
+    # Step 1: Find candidate files from the inverted index
+    files = load_index(workspace).candidate_files(query)
     
     if not files:
         print("❌ No files found")
@@ -135,26 +403,12 @@ def hybrid_search_files(query: str, workspace: Path = WORKSPACE):
     
     print(f"📁 Found {len(files)} candidate files\n")
     
-    # Step 2: Semantic ranking
+    # Step 2: Semantic ranking against the persisted TF-IDF model
     qmb = QMBPhase2Lite()
-    qmb.init()
-    
-    all_chunks = []
-    file_map = []
+    qmb.build(workspace)
     
-    for file_path in files[:20]:  # Limit to top 20 files
-        try:
-            content = file_path.read_text(encoding='utf-8')
-            chunks = content.split('\n\n')
-            for chunk in chunks:
-                if len(chunk) > 50:  # Meaningful chunks only
-                    all_chunks.append(chunk)
-                    file_map.append(file_path)
-        except:
-            pass
-    
-    # Rank chunks
-    results = qmb.search_tfidf(query, all_chunks, top_k=10)
+    # Rank chunks (one sparse mat-vec), limited to the top 20 files
+    results = qmb.search_index(query, top_k=10, workspace=workspace, files=files[:20])
     
     # Display
     print("=" * 60)
@@ -163,7 +417,7 @@ def hybrid_search_files(query: str, workspace: Path = WORKSPACE):
     
     seen_files = set()
     for r in results:
-        file_path = file_map[r["index"]]
+        file_path = Path(r["file"])
         if file_path not in seen_files:
             seen_files.add(file_path)
             print(f"\n📄 {file_path.name}")
@@ -174,8 +428,15 @@ def hybrid_search_files(query: str, workspace: Path = WORKSPACE):
     return results
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
+    if len(sys.argv) > 1 and sys.argv[1] == "--build":
+        qmb = QMBPhase2Lite()
+        full = "--full" in sys.argv
+        print("📚 Building TF-IDF index...")
+        updated, removed = qmb.build(full=full)
+        print(f"✅ {len(qmb.rows)} chunks ({updated} files updated, {removed} removed)")
+    elif len(sys.argv) > 1:
         query = sys.argv[1]
         hybrid_search_files(query)
     else:
         print("Usage: python3 semantic_lite.py 'your search query'")
+        print("       python3 semantic_lite.py --build [--full]")
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+QMB Search Daemon - One warm search engine shared over localhost HTTP
+Holds the indexes and embedding model in memory; a file watcher keeps
+them fresh so queries never pay Python startup or model load.
+
+Endpoints (JSON):
+  GET  /search?q=...&path=...&k=10&engine=hybrid|bm25|tfidf&fusion=rrf
+              [&since=YYYY-MM-DD&until=YYYY-MM-DD&in=decisions&partner=luxfer&recent=1]
+  GET  /health
+  POST /refresh
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from typing import List, Dict
+from urllib.parse import urlparse, parse_qs
+
+SKILL_DIR = Path(__file__).parent
+sys.path.insert(0, str(SKILL_DIR))
+
+import hybrid
+import index as index_module
+import bm25 as bm25_module
+import metadata as metadata_module
+from index import InvertedIndex, load_index, scan_workspace, diff_scan
+from bm25 import BM25Index, load_bm25
+from metadata import MetadataIndex, load_metadata
+
+WORKSPACE = Path.home() / ".openclaw/workspace"
+HOST = "127.0.0.1"
+PORT = int(os.environ.get("QMB_PORT", "8765"))
+
+class SearchEngine:
+    """
+    Warm indexes plus a polling file watcher.
+    Queries run concurrently on whatever index objects are current. A refresh
+    builds updated copies off to the side and publishes them in one swap, so
+    the lock is only ever held for a few reference assignments.
+    """
+
+    def __init__(self, workspace: Path = WORKSPACE, semantic: bool = True,
+                 tfidf: bool = True, interval: float = 5.0):
+        self.workspace = Path(workspace)
+        self.interval = interval
+        self.lock = threading.Lock()              # guards the published references
+        self.refresh_lock = threading.Lock()      # one refresh at a time (watcher + POST)
+        self.started = time.time()
+        self.generation = 0
+        self.queries = 0
+        self._stop = threading.Event()
+
+        # The watcher refreshes; queries must not re-stat the workspace
+        hybrid.AUTO_REFRESH = False
+
+        print("📚 Loading keyword indexes...")
+        self.index = load_index(self.workspace)
+        self.bm25 = load_bm25(self.workspace)
+        self.metadata = load_metadata(self.workspace)
+        self.snapshot = scan_workspace(self.workspace)
+
+        self.tfidf = None
+        if tfidf:
+            try:
+                from semantic_lite import QMBPhase2Lite
+                self.tfidf = QMBPhase2Lite()
+                self.tfidf.build(self.workspace)
+            except ImportError as e:
+                print(f"⚠️ TF-IDF engine unavailable: {e}")
+                self.tfidf = None
+
+        self.semantic = hybrid.get_semantic_engine() if semantic else None
+        if self.semantic is None:
+            # Don't let hybrid_search try to load it per query either
+            hybrid._semantic_engine = False
+
+    # ------------------------------------------------------------------
+    # Watcher
+    # ------------------------------------------------------------------
+
+    def refresh(self) -> Dict:
+        """Apply workspace changes to fresh copies of every index, then swap them in"""
+        with self.refresh_lock:
+            current = scan_workspace(self.workspace)
+            changed, deleted = diff_scan(self.snapshot, current)
+            if not changed and not deleted:
+                return {"changed": 0, "deleted": 0, "generation": self.generation}
+
+            # Rebuild from the persisted state; queries keep using the old objects meanwhile
+            index = InvertedIndex(self.workspace)
+            index.load()
+            index.refresh()
+            bm25 = BM25Index(self.workspace)
+            bm25.load()
+            bm25.refresh()
+            metadata = MetadataIndex(self.workspace)
+            metadata.load()
+            metadata.refresh()
+
+            tfidf = None
+            if self.tfidf is not None:
+                from semantic_lite import QMBPhase2Lite
+                tfidf = QMBPhase2Lite()
+                tfidf.build(self.workspace)
+
+            semantic = None
+            if self.semantic is not None:
+                semantic = self.semantic.fork()
+                semantic.update_files(
+                    [self.workspace / p for p in changed],
+                    [self.workspace / p for p in deleted]
+                )
+
+            self._publish(index, bm25, metadata, tfidf, semantic, current)
+
+        print(f"🔄 Refreshed: {len(changed)} changed, {len(deleted)} deleted "
+              f"(generation {self.generation})")
+        return {"changed": len(changed), "deleted": len(deleted), "generation": self.generation}
+
+    def _publish(self, index, bm25, metadata, tfidf, semantic, snapshot):
+        """Swap in a refreshed set of indexes (hybrid.py reads them via the module caches)"""
+        key = str(self.workspace)
+        with self.lock:
+            self.index, self.bm25, self.metadata = index, bm25, metadata
+            index_module._index_cache[key] = index
+            bm25_module._bm25_cache[key] = bm25
+            metadata_module._metadata_cache[key] = metadata
+            if tfidf is not None:
+                self.tfidf = tfidf
+            if semantic is not None:
+                self.semantic = hybrid._semantic_engine = semantic
+            self.snapshot = snapshot
+            self.generation += 1
+
+    def watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️ Refresh failed: {e}")
+
+    def start_watcher(self):
+        threading.Thread(target=self.watch, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def search(self, query: str, path: str = "", top_k: int = 10,
+               engine: str = "hybrid", fusion: str = "rrf",
+               filters: Dict = None, recent: bool = False) -> List[Dict]:
+        # Only the reference snapshot is taken under the lock; the search itself runs unlocked
+        with self.lock:
+            self.queries += 1
+            bm25, tfidf = self.bm25, self.tfidf
+
+        if engine == "hybrid":
+            return hybrid.hybrid_search(query, path, top_k, fusion, verbose=False,
+                                        filters=filters, recent=recent)
+        if engine not in ("bm25", "tfidf"):
+            raise ValueError(f"Unknown engine: {engine}")
+
+        allowed = hybrid.select_files(filters, path)
+        if engine == "bm25":
+            results = bm25.search(query, top_k=top_k, path=path, files=allowed)
+        else:
+            if tfidf is None:
+                raise ValueError("TF-IDF engine not loaded")
+            if allowed is None and path:
+                allowed = hybrid.scope_files(path)
+            files = [self.workspace / p for p in allowed] if allowed is not None else None
+            results = tfidf.search_index(query, top_k, self.workspace, files)
+            for r in results:
+                r["path"] = str(Path(r["file"]).relative_to(self.workspace))
+        return hybrid.sort_by_recency(results) if recent else results
+
+    def health(self) -> Dict:
+        return {
+            "status": "ok",
+            "workspace": str(self.workspace),
+            "generation": self.generation,
+            "files": len(self.bm25.files),
+            "chunks": self.bm25.total_chunks,
+            "semantic": self.semantic is not None,
+            "tfidf": self.tfidf is not None,
+            "queries": self.queries,
+            "cache": {
+                "hybrid": hybrid.cache_stats(),
+                "tfidf": sys.modules["semantic_lite"].cache_stats() if self.tfidf is not None else None,
+            },
+            "uptime": round(time.time() - self.started, 1),
+        }
+
+def make_handler(engine: SearchEngine):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+            if url.path == "/health":
+                return self._send(200, engine.health())
+            if url.path != "/search":
+                return self._send(404, {"error": "not found"})
+            if not params.get("q"):
+                return self._send(400, {"error": "missing q"})
+
+            start = time.perf_counter()
+            try:
+                results = engine.search(
+                    params["q"],
+                    path=params.get("path", ""),
+                    top_k=int(params.get("k", 10)),
+                    engine=params.get("engine", "hybrid"),
+                    fusion=params.get("fusion", "rrf"),
+                    filters={
+                        "since": params.get("since"),
+                        "until": params.get("until"),
+                        "category": params.get("in"),
+                        "partner": params.get("partner"),
+                    },
+                    recent=params.get("recent", "") not in ("", "0", "false"),
+                )
+            except ValueError as e:
+                return self._send(400, {"error": str(e)})
+            except Exception as e:
+                print(f"⚠️ Search failed: {e!r}")
+                return self._send(500, {"error": f"{type(e).__name__}: {e}"})
+            self._send(200, {
+                "query": params["q"],
+                "results": results,
+                "took_ms": round((time.perf_counter() - start) * 1000, 2),
+                "generation": engine.generation,
+            })
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/refresh":
+                return self._send(404, {"error": "not found"})
+            try:
+                self._send(200, engine.refresh())
+            except Exception as e:
+                print(f"⚠️ Refresh failed: {e!r}")
+                self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+        def log_message(self, format, *args):
+            pass  # Keep the daemon log to refreshes and errors
+
+    return Handler
+
+def serve(host: str = HOST, port: int = PORT, **engine_kwargs):
+    """Run the daemon until interrupted"""
+    engine = SearchEngine(**engine_kwargs)
+    engine.start_watcher()
+
+    server = ThreadingHTTPServer((host, port), make_handler(engine))
+    print(f"✅ QMB daemon listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down")
+    finally:
+        engine.stop()
+        server.server_close()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="QMB search daemon")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--interval", type=float, default=5.0, help="File watcher poll interval (s)")
+    parser.add_argument("--no-semantic", action="store_true", help="Skip the embedding model")
+    parser.add_argument("--no-tfidf", action="store_true", help="Skip the TF-IDF engine")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, semantic=not args.no_semantic,
+          tfidf=not args.no_tfidf, interval=args.interval)
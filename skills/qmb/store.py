@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+QMB Vector Stores - Pluggable embedding storage for QMBPhase2
+ChromaStore wraps chromadb; NumpyStore is a dependency-free local backend
+(memory-mapped .npy matrix + JSON sidecar, optional IVF cluster index).
+"""
+
+import os
+import json
+from abc import ABC, abstractmethod
+
+import numpy as np
+from pathlib import Path
+from typing import List, Dict, Iterable
+
+# Rows upcast to float32 per matmul when scoring (float16 storage, float32 math)
+SCORE_BLOCK = 8192
+
+class VectorStore(ABC):
+    """Interface shared by all QMBPhase2 backends"""
+
+    # Set when the persisted data could not be trusted and was dropped: reindex everything
+    needs_rebuild = False
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def upsert(self, ids: List[str], embeddings: List[List[float]],
+               documents: List[str], metadatas: List[Dict]):
+        ...
+
+    @abstractmethod
+    def delete(self, ids: List[str] = None, where: Dict = None):
+        ...
+
+    @abstractmethod
+    def update(self, ids: List[str], metadatas: List[Dict]):
+        ...
+
+    @abstractmethod
+    def query(self, embedding: List[float], top_k: int = 5, files: Iterable[str] = None) -> List[Dict]:
+        """
+        Nearest chunks as {"id", "text", "metadata", "score"} (cosine similarity).
+        `files` restricts the search to chunks whose metadata "file" is listed.
+        """
+
+    def persist(self):
+        """Flush pending writes (no-op for backends that write through)"""
+
+class ChromaStore(VectorStore):
+    """chromadb persistent collection"""
+
+    def __init__(self, path: Path, name: str = "qmb_documents"):
+        import chromadb
+
+        Path(path).mkdir(parents=True, exist_ok=True)
+        self.client = chromadb.PersistentClient(path=str(path))
+        self.collection = self.client.get_or_create_collection(
+            name=name,
+            metadata={"hnsw:space": "cosine"}
+        )
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.collection.upsert(ids=ids, embeddings=embeddings,
+                               documents=documents, metadatas=metadatas)
+
+    def delete(self, ids=None, where=None):
+        self.collection.delete(ids=ids, where=where)
+
+    def update(self, ids, metadatas):
+        self.collection.update(ids=ids, metadatas=metadatas)
+
+    def query(self, embedding, top_k=5, files=None):
+        where = None
+        if files is not None:
+            files = list(files)
+            if not files:
+                return []
+            where = {"file": files[0]} if len(files) == 1 else {"file": {"$in": files}}
+        results = self.collection.query(
+            query_embeddings=[list(embedding)],
+            n_results=top_k,
+            where=where,
+            include=["documents", "metadatas", "distances"]
+        )
+        return [
+            {
+                "id": cid,
+                "text": doc,
+                "metadata": meta,
+                "score": 1 - dist  # Convert distance to similarity
+            }
+            for cid, doc, meta, dist in zip(
+                results["ids"][0],
+                results["documents"][0],
+                results["metadatas"][0],
+                results["distances"][0]
+            )
+        ]
+
+class NumpyStore(VectorStore):
+    """
+    Brute-force cosine search over a memory-mapped, L2-normalized matrix.
+
+    Layout in `path`:
+      vectors.<gen>.npy      (n, dim) float16/float32 embeddings
+      vectors_ivf.<gen>.npz  optional cluster centroids + row offsets
+      vectors_meta.json      ids, documents, metadatas (row-aligned) and the
+                             names of the generation's matrix / IVF files
+
+    persist() writes a new generation's files first and then swaps the
+    sidecar, so a crash leaves either the old or the new store, never a mix.
+
+    Writes are buffered in memory and compacted to disk by persist(); until
+    then upserted rows live in separate segments next to the memory map.
+    Scoring upcasts blocks of rows to float32, so float16 storage only halves
+    the footprint and never the precision or speed of the matmul.
+    With nlist > 0 and enough rows, rows are grouped by nearest centroid so
+    a query only scans the nprobe closest clusters.
+    """
+
+    def __init__(self, path: Path, dtype: str = "float32", nlist: int = 0,
+                 nprobe: int = 8, min_ivf_rows: int = 20000):
+        self.path = Path(path)
+        self.dtype = np.dtype(dtype)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_ivf_rows = min_ivf_rows
+
+        self.vectors = None
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict] = []
+        self.alive = np.zeros(0, dtype=bool)
+        self.pos: Dict[str, int] = {}
+        self.centroids = None
+        self.offsets = None
+        self._tail: List[np.ndarray] = []
+        self._file_rows = None
+        self.dirty = False
+        self.generation = 0
+        self._load()
+
+    @property
+    def _meta_file(self) -> Path:
+        return self.path / "vectors_meta.json"
+
+    def _load(self):
+        meta_file = self._meta_file
+        if not meta_file.exists():
+            return
+        try:
+            meta = json.loads(meta_file.read_text(encoding='utf-8'))
+            # Stores written before generations used fixed file names
+            vectors = np.load(self.path / meta.get("vectors", "vectors.npy"), mmap_mode='r')
+            ivf_name = meta.get("ivf", "vectors_ivf.npz" if "vectors" not in meta else None)
+            centroids = offsets = None
+            if ivf_name and (self.path / ivf_name).exists():
+                with np.load(self.path / ivf_name) as ivf:
+                    centroids, offsets = ivf["centroids"], ivf["offsets"]
+            ids, documents, metadatas = meta["ids"], meta["documents"], meta["metadatas"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Vector store unreadable ({e}), rebuilding")
+            self.needs_rebuild = True
+            return
+
+        rows = len(vectors)
+        if not (rows == len(ids) == len(documents) == len(metadatas)) or \
+                (offsets is not None and int(offsets[-1]) > rows):
+            print(f"⚠️ Vector store rows do not match its sidecar ({rows} vs {len(ids)}), rebuilding")
+            self.needs_rebuild = True
+            return
+
+        self.vectors = vectors
+        self.generation = meta.get("generation", 0)
+        self.ids, self.documents, self.metadatas = ids, documents, metadatas
+        self.alive = np.ones(len(self.ids), dtype=bool)
+        self.pos = {cid: i for i, cid in enumerate(self.ids)}
+        self.centroids, self.offsets = centroids, offsets
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def count(self) -> int:
+        return int(self.alive.sum())
+
+    @staticmethod
+    def _normalize(mat: np.ndarray) -> np.ndarray:
+        return mat / (np.linalg.norm(mat, axis=1, keepdims=True) + 1e-8)
+
+    def _kill(self, rows: List[int]):
+        if rows:
+            self.alive[rows] = False
+            self.dirty = True
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        vecs = self._normalize(np.asarray(embeddings, dtype=np.float32)).astype(self.dtype)
+        self._kill([self.pos[cid] for cid in ids if cid in self.pos])
+
+        start = len(self.ids)
+        self._tail.append(vecs)
+        self.ids.extend(ids)
+        self.documents.extend(documents)
+        self.metadatas.extend(metadatas)
+        self.alive = np.concatenate([self.alive, np.ones(len(ids), dtype=bool)])
+        self.pos.update((cid, start + i) for i, cid in enumerate(ids))
+        self._file_rows = None
+        self.dirty = True
+
+    def delete(self, ids=None, where=None):
+        rows = [self.pos.pop(cid) for cid in (ids or []) if cid in self.pos]
+        if where:
+            matched = [i for i, meta in enumerate(self.metadatas)
+                       if self.alive[i] and all(meta.get(k) == v for k, v in where.items())]
+            for i in matched:
+                self.pos.pop(self.ids[i], None)
+            rows.extend(matched)
+        self._kill(rows)
+
+    def update(self, ids, metadatas):
+        for cid, meta in zip(ids, metadatas):
+            if cid in self.pos:
+                self.metadatas[self.pos[cid]] = meta
+                self._file_rows = None
+                self.dirty = True
+
+    def _segments(self) -> List[tuple]:
+        """(first row, array) pairs: the memory-mapped base, then unpersisted upserts"""
+        segments, start = [], 0
+        for seg in ([self.vectors] if self.vectors is not None else []) + self._tail:
+            segments.append((start, seg))
+            start += len(seg)
+        return segments
+
+    def _take(self, rows: np.ndarray) -> np.ndarray:
+        """Gather rows (any order) across segments without concatenating them"""
+        segments = self._segments()
+        dim = segments[0][1].shape[1] if segments else 0
+        out = np.empty((len(rows), dim), dtype=self.dtype)
+        for start, seg in segments:
+            mask = (rows >= start) & (rows < start + len(seg))
+            if mask.any():
+                out[mask] = seg[rows[mask] - start]
+        return out
+
+    def _score(self, query: np.ndarray, rows: np.ndarray = None) -> np.ndarray:
+        """Cosine scores in float32, SCORE_BLOCK rows at a time (rows: sorted subset)"""
+        parts = []
+        for start, seg in self._segments():
+            if rows is None:
+                for i in range(0, len(seg), SCORE_BLOCK):
+                    parts.append(np.asarray(seg[i:i + SCORE_BLOCK], dtype=np.float32) @ query)
+                continue
+            lo, hi = np.searchsorted(rows, [start, start + len(seg)])
+            local = rows[lo:hi] - start
+            for i in range(0, len(local), SCORE_BLOCK):
+                parts.append(np.asarray(seg[local[i:i + SCORE_BLOCK]], dtype=np.float32) @ query)
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+
+    def _build_ivf(self, mat: np.ndarray, n_iter: int = 10):
+        """Spherical k-means; returns (row order grouped by cluster, centroids, offsets)"""
+        rng = np.random.default_rng(0)
+        sample = mat[rng.choice(len(mat), min(len(mat), 50 * self.nlist), replace=False)]
+        sample = sample.astype(np.float32)
+        centroids = sample[rng.choice(len(sample), self.nlist, replace=False)]
+
+        for _ in range(n_iter):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(self.nlist):
+                members = sample[labels == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = self._normalize(centroids)
+
+        labels = np.concatenate([
+            np.argmax(mat[i:i + 8192].astype(np.float32) @ centroids.T, axis=1)
+            for i in range(0, len(mat), 8192)
+        ])
+        order = np.argsort(labels, kind="stable")
+        offsets = np.searchsorted(labels[order], np.arange(self.nlist + 1))
+        return order, centroids, offsets
+
+    def persist(self):
+        """Compact deleted rows; write a new generation's matrix/IVF, then swap the sidecar"""
+        if not self.dirty:
+            return
+
+        keep = np.flatnonzero(self.alive)
+        mat = self._take(keep)
+        centroids = offsets = None
+        if self.nlist and len(keep) >= max(self.min_ivf_rows, self.nlist):
+            grouped, centroids, offsets = self._build_ivf(mat)
+            keep, mat = keep[grouped], mat[grouped]
+        order = keep
+        self.ids = [self.ids[i] for i in order]
+        self.documents = [self.documents[i] for i in order]
+        self.metadatas = [self.metadatas[i] for i in order]
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        # Never reuse a name on disk: another process may still have it memory-mapped
+        on_disk = [int(p.name.split(".")[1]) for p in self.path.glob("vectors.*.npy")
+                   if p.name.split(".")[1].isdigit()]
+        generation = max([self.generation] + on_disk) + 1
+        vectors_name = f"vectors.{generation}.npy"
+        np.save(self.path / vectors_name, mat)
+        ivf_name = None
+        if centroids is not None:
+            ivf_name = f"vectors_ivf.{generation}.npz"
+            np.savez(self.path / ivf_name, centroids=centroids, offsets=offsets)
+
+        # Sidecar last: swapping it commits the new generation's files at once
+        meta_file = self._meta_file
+        tmp = meta_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "generation": generation,
+            "vectors": vectors_name,
+            "ivf": ivf_name,
+            "ids": self.ids,
+            "documents": self.documents,
+            "metadatas": self.metadatas,
+        }, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp, meta_file)
+        self._remove_stale({vectors_name, ivf_name})
+
+        self.generation = generation
+        self.centroids, self.offsets = centroids, offsets
+        self.vectors = np.load(self.path / vectors_name, mmap_mode='r')
+        self._tail = []
+        self.alive = np.ones(len(self.ids), dtype=bool)
+        self.pos = {cid: i for i, cid in enumerate(self.ids)}
+        self._file_rows = None
+        self.dirty = False
+        self.needs_rebuild = False
+
+    def _remove_stale(self, current: set):
+        """Older generations (and files of an interrupted persist); open mmaps keep working"""
+        for stale in list(self.path.glob("vectors*.npy")) + list(self.path.glob("vectors_ivf*.npz")):
+            if stale.name not in current:
+                try:
+                    stale.unlink()
+                except OSError:
+                    pass
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _candidates(self, query: np.ndarray, n: int) -> np.ndarray:
+        """Rows to scan: probed IVF clusters plus rows appended since persist"""
+        if self.centroids is None:
+            return None
+        probes = np.argsort(-(self.centroids @ query))[:self.nprobe]
+        indexed = int(self.offsets[-1])
+        rows = [np.arange(self.offsets[c], self.offsets[c + 1]) for c in probes]
+        rows.append(np.arange(indexed, n))
+        return np.concatenate(rows)
+
+    def _rows_for(self, files: Iterable[str]) -> np.ndarray:
+        """Row numbers of the given files' chunks (file → rows map built lazily)"""
+        if self._file_rows is None:
+            by_file: Dict[str, List[int]] = {}
+            for i, meta in enumerate(self.metadatas):
+                by_file.setdefault(meta.get("file"), []).append(i)
+            self._file_rows = by_file
+        rows = [r for f in files for r in self._file_rows.get(f, ())]
+        return np.asarray(sorted(rows), dtype=np.int64)
+
+    def query(self, embedding, top_k=5, files=None):
+        n = len(self.ids)
+        if not n:
+            return []
+
+        query = self._normalize(np.asarray([embedding], dtype=np.float32))[0]
+        if files is not None:
+            # Pre-filtered: score only the selected files' rows (IVF not needed)
+            rows = self._rows_for(files)
+            if not len(rows):
+                return []
+        else:
+            rows = self._candidates(query, n)
+            if rows is not None:
+                rows = np.sort(rows)
+
+        if rows is None:
+            scores = np.where(self.alive, self._score(query), -np.inf)
+            rows = np.arange(n)
+        else:
+            scores = np.where(self.alive[rows], self._score(query, rows), -np.inf)
+
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            {
+                "id": self.ids[rows[i]],
+                "text": self.documents[rows[i]],
+                "metadata": self.metadatas[rows[i]],
+                "score": float(scores[i])
+            }
+            for i in top if np.isfinite(scores[i])
+        ]
+
+BACKENDS = {
+    "chroma": ChromaStore,
+    "numpy": NumpyStore,
+}
+
+def open_store(backend: str, path: Path, **kwargs) -> VectorStore:
+    """Instantiate a backend by name ("chroma" or "numpy")"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown vector store backend: {backend}")
+    return BACKENDS[backend](path, **kwargs)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+QMB Chunker tests (python3 -m pytest skills/qmb/test_chunker.py)
+"""
+
+import random
+import string
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from chunker import MAX_CHARS, HEADING_RE, iter_chunks, chunk_text
+
+def _unique_word(n: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return "".join(rng.choice(string.ascii_letters + string.digits) for _ in range(n))
+
+def _covered(text: str, chunks) -> bool:
+    """Every character of every input token appears in some chunk"""
+    pieces = [token for chunk in chunks for token in chunk.split()]
+    for token in text.split():
+        mask = [False] * len(token)
+        for piece in pieces:
+            at = token.find(piece)
+            if at >= 0:
+                mask[at:at + len(piece)] = [True] * len(piece)
+        if not all(mask):
+            return False
+    return True
+
+def test_long_word_is_split_not_truncated():
+    text = "https://example.com/" + _unique_word(1500) + " UNIQUETAIL"
+    chunks = chunk_text(text)
+    assert all(len(c) <= MAX_CHARS for c in chunks)
+    assert any("UNIQUETAIL" in c for c in chunks)
+    assert _covered(text, chunks)
+
+def test_long_korean_run_keeps_tail():
+    text = "헬륨" * 600 + " 루프트한자"
+    chunks = chunk_text(text)
+    assert all(len(c) <= MAX_CHARS for c in chunks)
+    assert sum(len(c) for c in chunks) >= len(text) - 1
+    assert any("루프트한자" in c for c in chunks)
+
+def test_every_character_lands_in_a_chunk():
+    rng = random.Random(1)
+    words = [_unique_word(rng.choice([3, 8, 40, 900, 2000]), seed=i) for i in range(60)]
+    text = "\n".join(" ".join(words[i:i + 6]) for i in range(0, len(words), 6))
+    chunks = chunk_text(text, max_tokens=32, max_chars=300, overlap=4)
+    assert all(len(c) <= 300 for c in chunks)
+    assert _covered(text, chunks)
+
+def test_heading_travels_with_its_first_paragraph():
+    text = ("# Title\n\nshort\n\n## Sec A\n\n" + "alpha beta gamma delta. " * 40 +
+            "\n\n## Sec B\n\n### Sub\n\n" + "body text here ok. " * 30 + "\n\n# Note\n\nclosing words")
+    headings = {l for l in text.split("\n") if HEADING_RE.match(l)}
+    chunks = list(iter_chunks(text, max_tokens=64, max_chars=400))
+    for chunk in chunks:
+        lines = [l for l in chunk["text"].split("\n") if l.strip()]
+        # A heading is never the tail of a chunk and never a chunk on its own
+        assert lines[-1] not in headings, chunk["text"]
+    sec_a = next(c for c in chunks if "## Sec A" in c["text"])
+    assert "alpha beta" in sec_a["text"]
+    assert sec_a["headings"] == ["Title", "Sec A"]
+    sub = next(c for c in chunks if "### Sub" in c["text"])
+    assert "## Sec B" in sub["text"] and "body text" in sub["text"]
+    assert sub["headings"] == ["Title", "Sec B", "Sub"]
+    note = next(c for c in chunks if "# Note" in c["text"])
+    assert "closing words" in note["text"] and note["headings"] == ["Note"]
+
+def test_chunks_stay_within_section():
+    text = "# A\n\n" + "first section words. " * 20 + "\n\n# B\n\n" + "second section words. " * 20
+    chunks = list(iter_chunks(text, max_tokens=200, max_chars=2000))
+    assert [c["headings"] for c in chunks] == [["A"], ["B"]]
+    assert "second" not in chunks[0]["text"] and "first" not in chunks[1]["text"]
+
+def test_oversized_section_with_heading():
+    text = "## Long\n" + "\n".join(_unique_word(120, seed=i) for i in range(20))
+    chunks = list(iter_chunks(text, max_tokens=64, max_chars=300))
+    assert chunks[0]["text"].startswith("## Long\n\n")
+    assert all(len(c["text"]) <= 300 for c in chunks)
+    assert all(c["headings"] == ["Long"] for c in chunks)
+    assert _covered(text, [c["text"] for c in chunks])